@@ -2,12 +2,15 @@
 Preliminary helpers for PETSIRD data
 """
 
-#  Copyright (C) 2024 - 2025 University College London
+#  Copyright (C) 2024 - 2026 University College London
 #
 #  SPDX-License-Identifier: Apache-2.0
 
 import typing
 
+import numpy
+import numpy.typing as npt
+
 import petsird
 
 
@@ -95,6 +98,67 @@ def make_detection_bin(
                                [expanded_detection_bin])[0]
 
 
+def expand_detection_bins_as_arrays(
+    scanner: petsird.ScannerInformation, type_of_module: petsird.TypeOfModule,
+    detection_bins: npt.ArrayLike
+) -> tuple[npt.NDArray[numpy.uint32], npt.NDArray[numpy.uint32],
+           npt.NDArray[numpy.uint32]]:
+    """Vectorized version of expand_detection_bins
+
+    Returns a tuple of arrays with module_index, element_index and energy_index.
+    """
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    num_el_per_module = len(rep_module.object.detecting_elements.transforms)
+    energy_bin_edges = scanner.event_energy_bin_edges[type_of_module]
+    num_en = energy_bin_edges.number_of_bins()
+
+    detection_bins = numpy.asarray(detection_bins, dtype=numpy.uint32)
+    return (detection_bins // (num_el_per_module * num_en),
+            (detection_bins // num_en) % num_el_per_module,
+            detection_bins % num_en)
+
+
+def make_detection_bins_from_arrays(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule, module_index: npt.ArrayLike,
+        element_index: npt.ArrayLike,
+        energy_index: npt.ArrayLike) -> npt.NDArray[numpy.uint32]:
+    """Vectorized version of make_detection_bins"""
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    num_el_per_module = len(rep_module.object.detecting_elements.transforms)
+    energy_bin_edges = scanner.event_energy_bin_edges[type_of_module]
+    num_en = energy_bin_edges.number_of_bins()
+
+    module_index = numpy.asarray(module_index, dtype=numpy.uint32)
+    return (numpy.asarray(energy_index, dtype=numpy.uint32) +
+            (numpy.asarray(element_index, dtype=numpy.uint32) +
+             module_index * num_el_per_module) * num_en)
+
+
+def get_module_pair_sgid_lut_as_array(
+        scanner: petsird.ScannerInformation,
+        type_of_module_pair: petsird.TypeOfModulePair
+) -> npt.NDArray[numpy.int64]:
+    """Return the (lower-triangular) ModulePairSGIDLUT as a full 2D array
+
+    The array is indexed by the module indices of both detection bins. For
+    module-pairs of the same type, the LUT is made symmetric.
+    """
+    mtype0, mtype1 = type_of_module_pair
+    lut = scanner.detection_efficiencies.module_pair_sgidlut[mtype0][mtype1]
+    rep_modules = scanner.scanner_geometry.replicated_modules
+    num_modules0 = len(rep_modules[mtype0].transforms)
+    full = numpy.full((num_modules0, len(rep_modules[mtype1].transforms)),
+                      -1,
+                      dtype=numpy.int64)
+    for mod0, row in enumerate(lut):
+        full[mod0, :len(row)] = row
+    if mtype0 == mtype1:
+        lower = numpy.tril_indices(num_modules0)
+        full.T[lower] = full[lower]
+    return full
+
+
 @typing.overload
 def get_detection_efficiency(scanner: petsird.ScannerInformation,
                              type_of_module_pair: petsird.TypeOfModulePair,
@@ -4,7 +4,10 @@
 #  SPDX-License-Identifier: Apache-2.0
 
 import argparse
+import json
+import os
 import sys
+import typing
 
 import numpy as np
 
@@ -12,6 +15,10 @@ import petsird
 import petsird.helpers.geometry
 from petsird.helpers import (expand_detection_bin, get_detection_efficiency,
                              get_num_det_els)
+from petsird.helpers.columnar import load_columnar
+from petsird.helpers.follow import (FollowStream, RateMonitor, follow,
+                                    open_reader)
+from petsird.helpers.summary import summarise, summarise_columnar
 
 
 def parserCreator():
@@ -25,13 +32,94 @@ def parserCreator():
         "--input",
         type=str,
         default=None,
-        help="File to read from, or stdin if omitted",
+        help="File (or columnar export) to read from, or stdin if omitted",
     )
+    parser.add_argument('-s',
+                        '--summary',
+                        action='store_true',
+                        help="Write a (fast) summary as JSON")
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="JSON file for --summary or --follow (or stdout)")
+    parser.add_argument('-f',
+                        '--follow',
+                        action='store_true',
+                        help="Monitor rates while the input is being written")
+    parser.add_argument('--interval',
+                        type=float,
+                        default=1.0,
+                        help="Seconds between statistics for --follow")
+    parser.add_argument('--window',
+                        type=int,
+                        default=1000,
+                        help="Sliding window (in ms) for --follow")
+    parser.add_argument('--timeout',
+                        type=float,
+                        default=10.0,
+                        help="Seconds without new data to stop --follow")
     return parser.parse_args()
 
 
+def write_summary(input: typing.Optional[str],
+                  output: typing.Optional[str]) -> None:
+    if input is not None and os.path.isdir(input):
+        summary = summarise_columnar(load_columnar(input))
+    else:
+        file = sys.stdin.buffer if input is None else input
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            summary = summarise(reader)
+    if output is None:
+        json.dump(summary.to_dict(), sys.stdout, indent=1)
+        print()
+    else:
+        with open(output, "w") as f:
+            json.dump(summary.to_dict(), f, indent=1)
+
+
+def write_follow(input: typing.Optional[str], output: typing.Optional[str],
+                 interval: float, window: int, timeout: float) -> None:
+    """Write statistics of a growing file or pipe as JSON lines"""
+    out = sys.stdout if output is None else open(output, "w")
+
+    def emit(statistics: dict) -> None:
+        out.write(json.dumps(statistics) + "\n")
+        out.flush()
+
+    stream = FollowStream(sys.stdin.buffer if input is None else input,
+                          timeout=timeout)
+    reader = None
+    try:
+        # a truncated stream is reported by follow(), or here if it ends
+        # within the header
+        opened = open_reader(stream)
+        if opened is None:
+            emit({"num_time_blocks": 0, "truncated": True})
+            return
+        reader, header = opened
+        monitor = RateMonitor(header.scanner, window)
+        try:
+            follow(reader, monitor, emit, interval, stream)
+        except KeyboardInterrupt:
+            emit(monitor.get_statistics())
+    finally:
+        if reader is not None:
+            reader.close()
+        stream.close()
+        if output is not None:
+            out.close()
+
+
 if __name__ == "__main__":
     args = parserCreator()
+    if args.summary:
+        write_summary(args.input, args.output)
+        sys.exit(0)
+    if args.follow:
+        write_follow(args.input, args.output, args.interval, args.window,
+                     args.timeout)
+        sys.exit(0)
     file = None
     if args.input is None:
         file = sys.stdin.buffer
@@ -158,7 +246,7 @@ if __name__ == "__main__":
                                 box_shape0 = petsird.helpers.geometry.get_detecting_box(
                                     scanner, mtype0, expanded_det_bin0)
                                 box_shape1 = petsird.helpers.geometry.get_detecting_box(
-                                    scanner, mtype0, expanded_det_bin1)
+                                    scanner, mtype1, expanded_det_bin1)
 
                                 # print some info
                                 # (but not complete box, as it's a bit overwhelming)
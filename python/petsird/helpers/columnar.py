@@ -0,0 +1,653 @@
+"""
+Preliminary helpers for columnar (NumPy) access to PETSIRD list-mode data
+
+Events in an `EventTimeBlock` are stored as lists of yardl records. The helpers in
+this module convert these into NumPy arrays ("columns"), and can export a whole
+PETSIRD stream to a directory of `.npy` files that can be memory-mapped for
+zero-copy random access. The directory contains
+- `header.petsird`: a PETSIRD stream with the header and all time blocks that are
+  not an `EventTimeBlock`
+- `blocks.npy`: time interval and position in the original stream of every
+  `EventTimeBlock`
+- `<kind>_<type_of_module0>_<type_of_module1>_<column>.npy` with `kind` either
+  `prompts` or `delayeds` and columns `det_bin0`, `det_bin1`, `tof_idx` and `block`
+- `singles_<type_of_module>_<column>.npy` with columns `det_bin`, `time_offset`
+  and `block`
+where `block` is the index into `blocks.npy` of the time block of every event.
+With the `packed` option, the event columns of every `kind` and key are instead
+stored as fixed-width records in `<kind>_<key>_packed.npy` (see
+`petsird.helpers.packed`), next to the `block` column.
+
+Usage:
+    python -m petsird.helpers.columnar export -i test.petsird -o test_columns
+    python -m petsird.helpers.columnar export --packed -i test.petsird -o test_packed
+    python -m petsird.helpers.columnar import -i test_columns -o copy.petsird
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import itertools
+import os
+import sys
+import typing
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.packed import (columns_to_records, get_coincidence_dtype,
+                                    get_single_dtype)
+
+HEADER_FILENAME = "header.petsird"
+BLOCKS_FILENAME = "blocks.npy"
+COINCIDENCE_KINDS = ("prompts", "delayeds")
+COINCIDENCE_COLUMNS = ("det_bin0", "det_bin1", "tof_idx", "block")
+SINGLES_COLUMNS = ("det_bin", "time_offset", "block")
+PACKED_COLUMN = "packed"
+BLOCK_DTYPE = numpy.dtype([("start", numpy.uint32), ("stop", numpy.uint32),
+                           ("stream_index", numpy.uint64)])
+
+
+def get_module_type_pairs(num_module_types: int) -> list[tuple[int, int]]:
+    """Return all module-type pairs (type_of_module0 >= type_of_module1)
+
+    The order is the same as the nested lists in the `EventTimeBlock`.
+    """
+    return [(mtype0, mtype1) for mtype0 in range(num_module_types)
+            for mtype1 in range(mtype0 + 1)]
+
+
+def _block_slice(block: npt.NDArray[numpy.uint32], block_index: int) -> slice:
+    """Find the range of events in a (sorted) block column"""
+    start, stop = numpy.searchsorted(block, [block_index, block_index + 1])
+    return slice(int(start), int(stop))
+
+
+@dataclass
+class CoincidenceArrays:
+    """Columnar representation of a list of `CoincidenceEvent`s
+
+    `block` is optional and, if present, gives the index of the `EventTimeBlock`
+    of every event (see `ColumnarPETSIRD.blocks`).
+    """
+    det_bin0: npt.NDArray[numpy.uint32]
+    det_bin1: npt.NDArray[numpy.uint32]
+    tof_idx: npt.NDArray[numpy.uint32]
+    block: typing.Optional[npt.NDArray[numpy.uint32]] = None
+
+    def __len__(self) -> int:
+        return len(self.tof_idx)
+
+    def __getitem__(self, index) -> "CoincidenceArrays":
+        """Select events with a slice, boolean mask or index array"""
+        return CoincidenceArrays(
+            det_bin0=self.det_bin0[index],
+            det_bin1=self.det_bin1[index],
+            tof_idx=self.tof_idx[index],
+            block=None if self.block is None else self.block[index])
+
+    def get_block(self, block_index: int) -> "CoincidenceArrays":
+        """Return the events of one time block (as views)"""
+        assert self.block is not None, "block column is not present"
+        return self[_block_slice(self.block, block_index)]
+
+
+@dataclass
+class SingleArrays:
+    """Columnar representation of a list of `SingleEvent`s
+
+    `block` is optional, see `CoincidenceArrays`.
+    """
+    det_bin: npt.NDArray[numpy.uint32]
+    time_offset: npt.NDArray[numpy.uint32]
+    block: typing.Optional[npt.NDArray[numpy.uint32]] = None
+
+    def __len__(self) -> int:
+        return len(self.det_bin)
+
+    def __getitem__(self, index) -> "SingleArrays":
+        """Select events with a slice, boolean mask or index array"""
+        return SingleArrays(
+            det_bin=self.det_bin[index],
+            time_offset=self.time_offset[index],
+            block=None if self.block is None else self.block[index])
+
+    def get_block(self, block_index: int) -> "SingleArrays":
+        """Return the events of one time block (as views)"""
+        assert self.block is not None, "block column is not present"
+        return self[_block_slice(self.block, block_index)]
+
+
+@dataclass
+class MultipleArrays:
+    """Columnar representation of a list of `TripleEvent`s or `QuadrupleEvent`s
+
+    `det_bins` has shape (num_events, num_detections) and `tof_indices` shape
+    (num_events, num_detections - 1). `block` is optional, see `CoincidenceArrays`.
+    """
+    det_bins: npt.NDArray[numpy.uint32]
+    tof_indices: npt.NDArray[numpy.uint32]
+    block: typing.Optional[npt.NDArray[numpy.uint32]] = None
+
+    def __len__(self) -> int:
+        return len(self.det_bins)
+
+    @property
+    def num_detections(self) -> int:
+        return self.det_bins.shape[1]
+
+    def __getitem__(self, index) -> "MultipleArrays":
+        """Select events with a slice, boolean mask or index array"""
+        return MultipleArrays(
+            det_bins=self.det_bins[index],
+            tof_indices=self.tof_indices[index],
+            block=None if self.block is None else self.block[index])
+
+    def get_block(self, block_index: int) -> "MultipleArrays":
+        """Return the events of one time block (as views)"""
+        assert self.block is not None, "block column is not present"
+        return self[_block_slice(self.block, block_index)]
+
+
+def coincidence_events_to_arrays(
+        events: petsird.ListOfCoincidenceEvents) -> CoincidenceArrays:
+    """Convert a list of `CoincidenceEvent`s to columns"""
+    num_events = len(events)
+    det_bins = numpy.fromiter(itertools.chain.from_iterable(e.detection_bins
+                                                            for e in events),
+                              dtype=numpy.uint32,
+                              count=2 * num_events).reshape(num_events, 2)
+    tof_idx = numpy.fromiter((e.tof_idx for e in events),
+                             dtype=numpy.uint32,
+                             count=num_events)
+    return CoincidenceArrays(det_bin0=det_bins[:, 0],
+                             det_bin1=det_bins[:, 1],
+                             tof_idx=tof_idx)
+
+
+def arrays_to_coincidence_events(
+        arrays: CoincidenceArrays) -> list[petsird.CoincidenceEvent]:
+    """Convert columns to a list of `CoincidenceEvent`s"""
+    return [
+        petsird.CoincidenceEvent(detection_bins=[bin0, bin1], tof_idx=tof_idx)
+        for bin0, bin1, tof_idx in zip(arrays.det_bin0.tolist(
+        ), arrays.det_bin1.tolist(), arrays.tof_idx.tolist())
+    ]
+
+
+def single_events_to_arrays(
+        events: petsird.ListOfSingleEvents) -> SingleArrays:
+    """Convert a list of `SingleEvent`s to columns"""
+    num_events = len(events)
+    return SingleArrays(det_bin=numpy.fromiter(
+        (e.detection_bin for e in events),
+        dtype=numpy.uint32,
+        count=num_events),
+                        time_offset=numpy.fromiter(
+                            (e.time_offset_in_time_block for e in events),
+                            dtype=numpy.uint32,
+                            count=num_events))
+
+
+def arrays_to_single_events(arrays: SingleArrays) -> list[petsird.SingleEvent]:
+    """Convert columns to a list of `SingleEvent`s"""
+    return [
+        petsird.SingleEvent(detection_bin=det_bin,
+                            time_offset_in_time_block=time_offset)
+        for det_bin, time_offset in zip(arrays.det_bin.tolist(),
+                                        arrays.time_offset.tolist())
+    ]
+
+
+def multiple_events_to_arrays(events: typing.Union[
+    petsird.ListOfTripleEvents, petsird.ListOfQuadrupleEvents],
+                              num_detections: int) -> MultipleArrays:
+    """Convert a list of `TripleEvent`s (3) or `QuadrupleEvent`s (4) to columns"""
+    num_events = len(events)
+    det_bins = numpy.fromiter(itertools.chain.from_iterable(e.detection_bins
+                                                            for e in events),
+                              dtype=numpy.uint32,
+                              count=num_detections * num_events)
+    tof_indices = numpy.fromiter(itertools.chain.from_iterable(
+        e.tof_indices for e in events),
+                                 dtype=numpy.uint32,
+                                 count=(num_detections - 1) * num_events)
+    return MultipleArrays(det_bins=det_bins.reshape(num_events,
+                                                    num_detections),
+                          tof_indices=tof_indices.reshape(
+                              num_events, num_detections - 1))
+
+
+def arrays_to_multiple_events(
+    arrays: MultipleArrays
+) -> typing.Union[list[petsird.TripleEvent], list[petsird.QuadrupleEvent]]:
+    """Convert columns to a list of `TripleEvent`s or `QuadrupleEvent`s"""
+    event_type = (petsird.TripleEvent
+                  if arrays.num_detections == 3 else petsird.QuadrupleEvent)
+    return [
+        event_type(detection_bins=det_bins, tof_indices=tof_indices)
+        for det_bins, tof_indices in zip(arrays.det_bins.tolist(),
+                                         arrays.tof_indices.tolist())
+    ]
+
+
+def get_coincidence_arrays(
+        scanner: petsird.ScannerInformation,
+        event_time_block: petsird.EventTimeBlock,
+        kind: str = "prompts") -> dict[tuple[int, int], CoincidenceArrays]:
+    """Convert the prompts or delayeds of a time block to columns
+
+    Returns a dictionary indexed by module-type pair. It is empty if the
+    corresponding `CoincidencePolicy` is `NONE`.
+    """
+    if kind == "prompts":
+        policy = scanner.prompt_event_policy
+        events = event_time_block.prompt_events
+    elif kind == "delayeds":
+        policy = scanner.delayed_event_policy
+        events = event_time_block.delayed_events
+    else:
+        raise ValueError(f"Unknown kind of coincidences: {kind}")
+    if policy == petsird.CoincidencePolicy.NONE:
+        return {}
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    return {
+        (mtype0, mtype1): coincidence_events_to_arrays(events[mtype0][mtype1])
+        for mtype0, mtype1 in get_module_type_pairs(num_module_types)
+    }
+
+
+def get_single_arrays(
+        scanner: petsird.ScannerInformation,
+        event_time_block: petsird.EventTimeBlock) -> dict[int, SingleArrays]:
+    """Convert the singles of a time block to columns (indexed by module-type)"""
+    if scanner.single_event_policy == petsird.SingleEventPolicy.NONE:
+        return {}
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    return {
+        mtype: single_events_to_arrays(event_time_block.single_events[mtype])
+        for mtype in range(num_module_types)
+    }
+
+
+def get_multiple_arrays(
+        scanner: petsird.ScannerInformation,
+        event_time_block: petsird.EventTimeBlock,
+        kind: str = "triples") -> dict[tuple[int, ...], MultipleArrays]:
+    """Convert the triples or quadruples of a time block to columns
+
+    Returns a dictionary indexed by module-type triple or quadruple (in
+    non-increasing order). It is empty if the corresponding policy is `NONE`.
+    """
+    if kind == "triples":
+        stored = scanner.triple_event_policy != petsird.TripleEventPolicy.NONE
+        events = event_time_block.triple_events
+        num_detections = 3
+    elif kind == "quadruples":
+        stored = (scanner.quadruple_event_policy
+                  != petsird.QuadrupleEventPolicy.NONE)
+        events = event_time_block.quadruple_events
+        num_detections = 4
+    else:
+        raise ValueError(f"Unknown kind of multiples: {kind}")
+    if not stored:
+        return {}
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    result = {}
+    for types in itertools.combinations_with_replacement(
+            reversed(range(num_module_types)), num_detections):
+        nested = events
+        for mtype in types:
+            nested = nested[mtype]
+        result[types] = multiple_events_to_arrays(nested, num_detections)
+    return result
+
+
+def nest_by_module_types(
+        num_module_types: int, num_detections: int,
+        get_events: Callable[[tuple[int, ...]], list]) -> list:
+    """Build the nested lists of events of an `EventTimeBlock`
+
+    `get_events` returns the list of events for module-types in non-increasing
+    order, i.e. a key of `get_coincidence_arrays` or `get_multiple_arrays`.
+    """
+
+    def nest(types: tuple[int, ...]) -> list:
+        if len(types) == num_detections:
+            return get_events(types)
+        num_types = types[-1] + 1 if types else num_module_types
+        return [nest(types + (mtype, )) for mtype in range(num_types)]
+
+    return nest(())
+
+
+def get_column_filename(directory: str, kind: str,
+                        key: typing.Union[int, tuple], column: str) -> str:
+    """Return the name of the `.npy` file for a column"""
+    key_str = "_".join(
+        str(k) for k in (key if isinstance(key, tuple) else (key, )))
+    return os.path.join(directory, f"{kind}_{key_str}_{column}.npy")
+
+
+class _NpyColumnWriter:
+    """Append-only writer for a 1D `.npy` file of (as yet) unknown length"""
+
+    def __init__(self, filename: str, dtype: npt.DTypeLike):
+        self._file = open(filename, "wb")
+        self.dtype = numpy.dtype(dtype)
+        self._size = 0
+        self._write_header()
+        self._data_offset = self._file.tell()
+
+    def _write_header(self) -> None:
+        numpy.lib.format.write_array_header_1_0(
+            self._file, {
+                "descr": numpy.lib.format.dtype_to_descr(self.dtype),
+                "fortran_order": False,
+                "shape": (self._size, )
+            })
+
+    def append(self, values: npt.ArrayLike) -> None:
+        values = numpy.ascontiguousarray(values, dtype=self.dtype)
+        values.tofile(self._file)
+        self._size += len(values)
+
+    def close(self) -> None:
+        # the header is padded, so re-writing it with the final size fits
+        self._file.seek(0)
+        self._write_header()
+        if self._file.tell() != self._data_offset:
+            raise RuntimeError(
+                f"Could not update .npy header of {self._file.name}")
+        self._file.close()
+
+
+def _open_column_writers(directory: str, scanner: petsird.ScannerInformation,
+                         packed: bool) -> dict[str, _NpyColumnWriter]:
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    filenames = []
+    if scanner.prompt_event_policy != petsird.CoincidencePolicy.NONE:
+        filenames.append("prompts")
+    if scanner.delayed_event_policy != petsird.CoincidencePolicy.NONE:
+        filenames.append("delayeds")
+    writers = {}
+
+    def open_writers(kind: str, key: typing.Union[int, tuple],
+                     columns: tuple[str,
+                                    ...], record_dtype: numpy.dtype) -> None:
+        dtypes = {column: numpy.uint32 for column in columns}
+        if packed:
+            dtypes = {PACKED_COLUMN: record_dtype, "block": numpy.uint32}
+        for column, dtype in dtypes.items():
+            filename = get_column_filename(directory, kind, key, column)
+            writers[filename] = _NpyColumnWriter(filename, dtype)
+
+    for kind in filenames:
+        for pair in get_module_type_pairs(num_module_types):
+            open_writers(kind, pair, COINCIDENCE_COLUMNS,
+                         get_coincidence_dtype(scanner, pair))
+    if scanner.single_event_policy != petsird.SingleEventPolicy.NONE:
+        for mtype in range(num_module_types):
+            open_writers("singles", mtype, SINGLES_COLUMNS,
+                         get_single_dtype(scanner, mtype))
+    return writers
+
+
+def _append_columns(writers: dict[str, _NpyColumnWriter], directory: str,
+                    kind: str, key: typing.Union[int, tuple],
+                    arrays: typing.Union[CoincidenceArrays, SingleArrays],
+                    columns: tuple[str, ...]) -> None:
+    packed_filename = get_column_filename(directory, kind, key, PACKED_COLUMN)
+    if packed_filename in writers:
+        packed_writer = writers[packed_filename]
+        packed_writer.append(
+            columns_to_records(
+                [getattr(arrays, name) for name in packed_writer.dtype.names],
+                packed_writer.dtype))
+        columns = ("block", )
+    for column in columns:
+        writers[get_column_filename(directory, kind, key,
+                                    column)].append(getattr(arrays, column))
+
+
+def export_columnar(reader: petsird.PETSIRDReaderBase,
+                    directory: str,
+                    packed: bool = False) -> None:
+    """Export a PETSIRD stream to a directory of `.npy` columns
+
+    See the module documentation for the layout. If `packed` is set, events are
+    stored as fixed-width records. Triples and quadruples are not supported.
+    """
+    header = reader.read_header()
+    scanner = header.scanner
+    if (scanner.triple_event_policy != petsird.TripleEventPolicy.NONE
+            or scanner.quadruple_event_policy
+            != petsird.QuadrupleEventPolicy.NONE):
+        raise ValueError(
+            "Columnar export of triples and quadruples is not supported")
+
+    os.makedirs(directory, exist_ok=True)
+    writers = _open_column_writers(directory, scanner, packed)
+    blocks = []
+    try:
+        with petsird.BinaryPETSIRDWriter(
+                os.path.join(directory, HEADER_FILENAME)) as other_writer:
+            other_writer.write_header(header)
+            # usually all time blocks are event time blocks, but the header
+            # stream still needs its (empty) list of time blocks
+            other_writer.write_time_blocks(())
+            for stream_index, time_block in enumerate(
+                    reader.read_time_blocks()):
+                if not isinstance(time_block,
+                                  petsird.TimeBlock.EventTimeBlock):
+                    other_writer.write_time_blocks((time_block, ))
+                    continue
+                event_time_block = time_block.value
+                block_index = len(blocks)
+                blocks.append(
+                    (event_time_block.time_interval.start,
+                     event_time_block.time_interval.stop, stream_index))
+                for kind in COINCIDENCE_KINDS:
+                    for pair, arrays in get_coincidence_arrays(
+                            scanner, event_time_block, kind).items():
+                        arrays.block = numpy.full(len(arrays),
+                                                  block_index,
+                                                  dtype=numpy.uint32)
+                        _append_columns(writers, directory, kind, pair, arrays,
+                                        COINCIDENCE_COLUMNS)
+                for mtype, arrays in get_single_arrays(
+                        scanner, event_time_block).items():
+                    arrays.block = numpy.full(len(arrays),
+                                              block_index,
+                                              dtype=numpy.uint32)
+                    _append_columns(writers, directory, "singles", mtype,
+                                    arrays, SINGLES_COLUMNS)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    numpy.save(os.path.join(directory, BLOCKS_FILENAME),
+               numpy.array(blocks, dtype=BLOCK_DTYPE))
+
+
+@dataclass
+class ColumnarPETSIRD:
+    """PETSIRD data loaded from a columnar export, see `load_columnar`
+
+    `prompts` and `delayeds` are indexed by module-type pair, `singles` by
+    module-type. They are empty if the corresponding policy is `NONE`.
+    """
+    header: petsird.Header
+    blocks: npt.NDArray[numpy.void]
+    prompts: dict[tuple[int, int], CoincidenceArrays]
+    delayeds: dict[tuple[int, int], CoincidenceArrays]
+    singles: dict[int, SingleArrays]
+
+    def get_event_time_block(self, block_index: int) -> petsird.EventTimeBlock:
+        """Reconstruct the `EventTimeBlock` with the given index"""
+        scanner = self.header.scanner
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        block = self.blocks[block_index]
+        event_time_block = petsird.EventTimeBlock(
+            time_interval=petsird.TimeInterval(start=int(block["start"]),
+                                               stop=int(block["stop"])))
+        for kind, events in (("prompts", self.prompts), ("delayeds",
+                                                         self.delayeds)):
+            if not events:
+                continue
+            setattr(event_time_block, f"{kind[:-1]}_events", [[
+                arrays_to_coincidence_events(
+                    events[(mtype0, mtype1)].get_block(block_index))
+                for mtype1 in range(mtype0 + 1)
+            ] for mtype0 in range(num_module_types)])
+        if self.singles:
+            event_time_block.single_events = [
+                arrays_to_single_events(
+                    self.singles[mtype].get_block(block_index))
+                for mtype in range(num_module_types)
+            ]
+        return event_time_block
+
+
+def load_columnar(directory: str,
+                  mmap_mode: typing.Optional[str] = "r") -> ColumnarPETSIRD:
+    """Load a directory written by `export_columnar`
+
+    Columns are memory-mapped by default. Use `mmap_mode=None` to read them
+    into memory instead. For a packed export, the event columns are views of the
+    fields of the records, with the (narrower) integer types of the records.
+    """
+    with petsird.BinaryPETSIRDReader(os.path.join(directory, HEADER_FILENAME),
+                                     skip_completed_check=True) as reader:
+        header = reader.read_header()
+    scanner = header.scanner
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+
+    def load(kind: str, key: typing.Union[int, tuple],
+             column: str) -> npt.NDArray[numpy.uint32]:
+        return numpy.load(get_column_filename(directory, kind, key, column),
+                          mmap_mode=mmap_mode)
+
+    def load_columns(kind: str, key: typing.Union[int, tuple],
+                     columns: tuple[str, ...]) -> dict[str, npt.NDArray]:
+        packed_filename = get_column_filename(directory, kind, key,
+                                              PACKED_COLUMN)
+        if not os.path.exists(packed_filename):
+            return {column: load(kind, key, column) for column in columns}
+        records = numpy.load(packed_filename, mmap_mode=mmap_mode)
+        result = {name: records[name] for name in records.dtype.names}
+        result["block"] = load(kind, key, "block")
+        return result
+
+    coincidences = {}
+    for kind, policy in (("prompts", scanner.prompt_event_policy),
+                         ("delayeds", scanner.delayed_event_policy)):
+        coincidences[kind] = {}
+        if policy == petsird.CoincidencePolicy.NONE:
+            continue
+        for pair in get_module_type_pairs(num_module_types):
+            coincidences[kind][pair] = CoincidenceArrays(
+                **load_columns(kind, pair, COINCIDENCE_COLUMNS))
+    singles = {}
+    if scanner.single_event_policy != petsird.SingleEventPolicy.NONE:
+        singles = {
+            mtype:
+            SingleArrays(**load_columns("singles", mtype, SINGLES_COLUMNS))
+            for mtype in range(num_module_types)
+        }
+    return ColumnarPETSIRD(header=header,
+                           blocks=numpy.load(
+                               os.path.join(directory, BLOCKS_FILENAME)),
+                           prompts=coincidences["prompts"],
+                           delayeds=coincidences["delayeds"],
+                           singles=singles)
+
+
+def _merge_time_blocks(
+    columnar: ColumnarPETSIRD, other_time_blocks: Iterable[petsird.TimeBlock]
+) -> Iterator[petsird.TimeBlock]:
+    """Interleave event time blocks with the other time blocks in stream order"""
+    stream_indices = columnar.blocks["stream_index"]
+    block_index = 0
+    stream_index = 0
+
+    def event_time_blocks_up_to_here() -> Iterator[petsird.TimeBlock]:
+        nonlocal block_index, stream_index
+        while (block_index < len(stream_indices)
+               and stream_indices[block_index] <= stream_index):
+            yield petsird.TimeBlock.EventTimeBlock(
+                columnar.get_event_time_block(block_index))
+            block_index += 1
+            stream_index += 1
+
+    for time_block in other_time_blocks:
+        yield from event_time_blocks_up_to_here()
+        yield time_block
+        stream_index += 1
+    stream_index = numpy.iinfo(numpy.uint64).max
+    yield from event_time_blocks_up_to_here()
+
+
+def import_columnar(directory: str, writer: petsird.PETSIRDWriterBase) -> None:
+    """Write the data in a columnar export as a PETSIRD stream"""
+    columnar = load_columnar(directory)
+    with petsird.BinaryPETSIRDReader(os.path.join(directory,
+                                                  HEADER_FILENAME)) as reader:
+        writer.write_header(reader.read_header())
+        writer.write_time_blocks(
+            _merge_time_blocks(columnar, reader.read_time_blocks()))
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_columnar',
+        description='Convert PETSIRD files to/from a directory of .npy files')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser(
+        "export", help="write a PETSIRD file as .npy columns")
+    export_parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted",
+    )
+    export_parser.add_argument("-o",
+                               "--output",
+                               type=str,
+                               required=True,
+                               help="Directory to write to")
+    export_parser.add_argument("--packed",
+                               action="store_true",
+                               help="Store events as fixed-width records")
+    import_parser = subparsers.add_parser(
+        "import", help="write .npy columns as a PETSIRD file")
+    import_parser.add_argument("-i",
+                               "--input",
+                               type=str,
+                               required=True,
+                               help="Directory to read from")
+    import_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="File to write to, or stdout if omitted",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    if args.command == "export":
+        file = sys.stdin.buffer if args.input is None else args.input
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            export_columnar(reader, args.output, args.packed)
+    else:
+        file = sys.stdout.buffer if args.output is None else args.output
+        with petsird.BinaryPETSIRDWriter(file) as writer:
+            import_columnar(args.input, writer)
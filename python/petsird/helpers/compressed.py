@@ -0,0 +1,447 @@
+"""
+Preliminary helpers for a block-compressed container of PETSIRD data
+
+A container stores a PETSIRD stream as independently compressed frames (using
+`zlib` or `lzma` from the standard library), followed by an index of all frames.
+Every frame is a complete PETSIRD binary stream. The first frame holds the
+header (without time blocks), the other frames a run of time blocks after a
+small placeholder header. Frames can therefore be decompressed and decoded
+independently, e.g. in a thread or process pool, and a reader can seek to the
+frames that overlap a time range.
+
+Layout (all integers little-endian):
+- `MAGIC`, codec name (8 bytes, zero-padded)
+- frames (compressed data, back-to-back)
+- index: a `.npy` array with dtype `FRAME_INDEX_DTYPE`
+- offset of the index (uint64), `INDEX_MAGIC`
+
+Usage:
+    python -m petsird.helpers.compressed compress -i test.petsird -o test.petsirdz
+    python -m petsird.helpers.compressed decompress -i test.petsirdz -o copy.petsird
+    python -m petsird.helpers.compressed benchmark -i test.petsird -j 4
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import collections
+import concurrent.futures
+import io
+import lzma
+import os
+import struct
+import sys
+import tempfile
+import time
+import typing
+import zlib
+from collections.abc import Iterable, Iterator
+
+import numpy
+
+import petsird
+
+MAGIC = b"PETSIRDZ"
+INDEX_MAGIC = b"PZINDEX1"
+CODECS = ("zlib", "lzma")
+FRAME_INDEX_DTYPE = numpy.dtype([("offset", numpy.uint64),
+                                 ("size", numpy.uint64),
+                                 ("raw_size", numpy.uint64),
+                                 ("start", numpy.uint32),
+                                 ("stop", numpy.uint32),
+                                 ("num_time_blocks", numpy.uint32)])
+# approximate size of the uncompressed data in a frame
+DEFAULT_FRAME_SIZE = 8 * 1024 * 1024
+_FOOTER = struct.Struct("<Q8s")
+
+
+def compress_frame(data: bytes, codec: str, level: int = -1) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "lzma":
+        return lzma.compress(data, preset=None if level < 0 else level)
+    raise ValueError(f"Unknown codec {codec}")
+
+
+def decompress_frame(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "lzma":
+        return lzma.decompress(data)
+    raise ValueError(f"Unknown codec {codec}")
+
+
+def encode_time_blocks(
+        time_blocks: Iterable[petsird.TimeBlock],
+        header: typing.Optional[petsird.Header] = None) -> bytes:
+    """Encode time blocks as a PETSIRD stream (with a placeholder header)"""
+    stream = io.BytesIO()
+    writer = petsird.BinaryPETSIRDWriter(stream)
+    writer.write_header(petsird.Header() if header is None else header)
+    writer.write_time_blocks(time_blocks)
+    writer.close()
+    return stream.getvalue()
+
+
+def decode_time_blocks(data: bytes) -> list[petsird.TimeBlock]:
+    """Decode the time blocks of an (uncompressed) frame"""
+    reader = petsird.BinaryPETSIRDReader(io.BytesIO(data))
+    reader.read_header()
+    time_blocks = list(reader.read_time_blocks())
+    reader.close()
+    return time_blocks
+
+
+class CompressedPETSIRDWriter:
+    """Write a PETSIRD stream as a block-compressed container
+
+    Has the same interface as `BinaryPETSIRDWriter`. Time blocks are collected
+    until their encoded size exceeds `frame_size`. If an `executor` is given,
+    frames are compressed in parallel (but written in order). When used as a
+    context manager, the frame index is not written if an exception is raised
+    (see `abort`).
+    """
+
+    def __init__(self,
+                 path: str,
+                 codec: str = "zlib",
+                 level: int = -1,
+                 frame_size: int = DEFAULT_FRAME_SIZE,
+                 executor: typing.Optional[concurrent.futures.Executor] = None,
+                 max_pending_frames: int = 8):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec}")
+        self.codec = codec
+        self.level = level
+        self.frame_size = frame_size
+        self._executor = executor
+        self._max_pending_frames = max_pending_frames
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + codec.encode().ljust(8, b"\0"))
+        self._index = []
+        self._pending = collections.deque()
+        self._frame = None
+        self._has_header = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write_header(self, header: petsird.Header) -> None:
+        if self._has_header:
+            raise RuntimeError("Header was already written")
+        self._has_header = True
+        self._submit(encode_time_blocks((), header), 0, 0, 0)
+        self._start_frame()
+
+    def write_time_blocks(self,
+                          time_blocks: Iterable[petsird.TimeBlock]) -> None:
+        if not self._has_header:
+            raise RuntimeError("Header has to be written first")
+        for time_block in time_blocks:
+            self._frame_writer.write_time_blocks((time_block, ))
+            time_interval = time_block.value.time_interval
+            if self._frame["num_time_blocks"] == 0:
+                self._frame["start"] = time_interval.start
+            self._frame["start"] = min(self._frame["start"],
+                                       time_interval.start)
+            self._frame["stop"] = max(self._frame["stop"], time_interval.stop)
+            self._frame["num_time_blocks"] += 1
+            # the BytesIO lags the writer by at most its internal buffer
+            if self._frame_stream.tell() >= self.frame_size:
+                self._finish_frame()
+                self._start_frame()
+
+    def _start_frame(self) -> None:
+        self._frame_stream = io.BytesIO()
+        self._frame_writer = petsird.BinaryPETSIRDWriter(self._frame_stream)
+        self._frame_writer.write_header(petsird.Header())
+        self._frame = {"start": 0, "stop": 0, "num_time_blocks": 0}
+
+    def _finish_frame(self) -> None:
+        self._frame_writer.write_time_blocks(())
+        self._frame_writer.close()
+        if self._frame["num_time_blocks"] > 0:
+            self._submit(self._frame_stream.getvalue(), self._frame["start"],
+                         self._frame["stop"], self._frame["num_time_blocks"])
+        self._frame = None
+
+    def _submit(self, data: bytes, start: int, stop: int,
+                num_time_blocks: int) -> None:
+        if self._executor is None:
+            compressed = compress_frame(data, self.codec, self.level)
+        else:
+            compressed = self._executor.submit(compress_frame, data,
+                                               self.codec, self.level)
+        self._pending.append(
+            (compressed, len(data), start, stop, num_time_blocks))
+        while len(self._pending) > self._max_pending_frames:
+            self._write_pending_frame()
+
+    def _write_pending_frame(self) -> None:
+        compressed, raw_size, start, stop, num_time_blocks = (
+            self._pending.popleft())
+        if isinstance(compressed, concurrent.futures.Future):
+            compressed = compressed.result()
+        self._index.append((self._file.tell(), len(compressed), raw_size,
+                            start, stop, num_time_blocks))
+        self._file.write(compressed)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self._frame is not None:
+            self._finish_frame()
+        while self._pending:
+            self._write_pending_frame()
+        index_offset = self._file.tell()
+        numpy.lib.format.write_array(
+            self._file, numpy.array(self._index, dtype=FRAME_INDEX_DTYPE))
+        self._file.write(_FOOTER.pack(index_offset, INDEX_MAGIC))
+        self._file.close()
+
+    def abort(self) -> None:
+        """Close the file without the frame index (e.g. after an error)
+
+        The container can then not be mistaken for a complete one, as readers
+        refuse files without the index.
+        """
+        if self._file.closed:
+            return
+        for compressed, *_ in self._pending:
+            if isinstance(compressed, concurrent.futures.Future):
+                compressed.cancel()
+        self._pending.clear()
+        self._file.close()
+
+
+class CompressedPETSIRDReader:
+    """Read a block-compressed PETSIRD container
+
+    Has the same interface as `BinaryPETSIRDReader`, and can in addition read
+    only the time blocks that overlap a time range. If an `executor` is given,
+    up to `prefetch` frames are decompressed ahead in parallel. Decoding happens
+    in the calling thread, as time blocks cannot be pickled.
+    """
+
+    def __init__(self,
+                 path: str,
+                 executor: typing.Optional[concurrent.futures.Executor] = None,
+                 prefetch: int = 8):
+        self._file = open(path, "rb")
+        magic = self._file.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compressed PETSIRD container")
+        self.codec = self._file.read(8).rstrip(b"\0").decode()
+        self._executor = executor
+        self._prefetch = prefetch
+        self._file.seek(-_FOOTER.size, io.SEEK_END)
+        index_offset, index_magic = _FOOTER.unpack(
+            self._file.read(_FOOTER.size))
+        if index_magic != INDEX_MAGIC:
+            raise ValueError(f"{path} does not have a frame index")
+        self._file.seek(index_offset)
+        self.index = numpy.lib.format.read_array(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _read_frame_data(self, frame: int) -> bytes:
+        self._file.seek(int(self.index["offset"][frame]))
+        return self._file.read(int(self.index["size"][frame]))
+
+    def read_header(self) -> petsird.Header:
+        reader = petsird.BinaryPETSIRDReader(
+            io.BytesIO(decompress_frame(self._read_frame_data(0), self.codec)))
+        header = reader.read_header()
+        # read (the absence of) time blocks, such that the reader is complete
+        for _ in reader.read_time_blocks():
+            pass
+        reader.close()
+        return header
+
+    def get_frames(self,
+                   start: typing.Optional[int] = None,
+                   stop: typing.Optional[int] = None) -> numpy.ndarray:
+        """Find the frames with time blocks that overlap [start, stop) (in ms)"""
+        frames = numpy.arange(1, len(self.index))
+        index = self.index[1:]
+        keep = numpy.ones(len(frames), dtype=bool)
+        if start is not None:
+            keep &= index["stop"] > start
+        if stop is not None:
+            keep &= index["start"] < stop
+        return frames[keep]
+
+    def read_frames(
+            self, frames: Iterable[int]) -> Iterator[list[petsird.TimeBlock]]:
+        """Yield the time blocks of every frame, in order"""
+        if self._executor is None:
+            for frame in frames:
+                yield decode_time_blocks(
+                    decompress_frame(self._read_frame_data(frame), self.codec))
+            return
+        pending = collections.deque()
+        for frame in frames:
+            pending.append(
+                self._executor.submit(decompress_frame,
+                                      self._read_frame_data(frame),
+                                      self.codec))
+            if len(pending) > self._prefetch:
+                yield decode_time_blocks(pending.popleft().result())
+        while pending:
+            yield decode_time_blocks(pending.popleft().result())
+
+    def read_time_blocks(
+            self,
+            start: typing.Optional[int] = None,
+            stop: typing.Optional[int] = None) -> Iterator[petsird.TimeBlock]:
+        """Yield all time blocks, or only those overlapping [start, stop)"""
+        for time_blocks in self.read_frames(self.get_frames(start, stop)):
+            for time_block in time_blocks:
+                time_interval = time_block.value.time_interval
+                if start is not None and time_interval.stop <= start:
+                    continue
+                if stop is not None and time_interval.start >= stop:
+                    continue
+                yield time_block
+
+
+def compress(reader: petsird.PETSIRDReaderBase,
+             writer: CompressedPETSIRDWriter) -> None:
+    writer.write_header(reader.read_header())
+    writer.write_time_blocks(reader.read_time_blocks())
+
+
+def _make_executor(jobs: int, processes: bool = False):
+    if jobs <= 1:
+        return None
+    if processes:
+        return concurrent.futures.ProcessPoolExecutor(jobs)
+    return concurrent.futures.ThreadPoolExecutor(jobs)
+
+
+def benchmark(filename: str,
+              codecs: Iterable[str] = CODECS,
+              jobs: int = 1,
+              frame_size: int = DEFAULT_FRAME_SIZE) -> list[dict]:
+    """Measure compression ratio and throughput (in MB/s of uncompressed data)
+
+    Time blocks are read once, and then written to and read from a temporary
+    container for every codec.
+    """
+    with petsird.BinaryPETSIRDReader(filename) as reader:
+        header = reader.read_header()
+        time_blocks = list(reader.read_time_blocks())
+    raw_size = os.path.getsize(filename)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in codecs:
+            path = os.path.join(directory, f"benchmark.{codec}")
+            executor = _make_executor(jobs)
+            t0 = time.perf_counter()
+            with CompressedPETSIRDWriter(path,
+                                         codec,
+                                         frame_size=frame_size,
+                                         executor=executor) as writer:
+                writer.write_header(header)
+                writer.write_time_blocks(time_blocks)
+            t1 = time.perf_counter()
+            decode_executor = _make_executor(jobs, processes=True)
+            with CompressedPETSIRDReader(path, decode_executor) as reader:
+                reader.read_header()
+                num_time_blocks = sum(1 for _ in reader.read_time_blocks())
+            t2 = time.perf_counter()
+            for e in (executor, decode_executor):
+                if e is not None:
+                    e.shutdown()
+            assert num_time_blocks == len(time_blocks)
+            results.append({
+                "codec": codec,
+                "ratio": raw_size / os.path.getsize(path),
+                "write_MB_per_s": raw_size / 1e6 / (t1 - t0),
+                "read_MB_per_s": raw_size / 1e6 / (t2 - t1),
+            })
+    return results
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_compressed',
+        description='Convert to and from block-compressed PETSIRD containers')
+    parser.add_argument("command",
+                        choices=("compress", "decompress", "benchmark"))
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from (compress: stdin if omitted)",
+    )
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="File to write to")
+    parser.add_argument("--codec",
+                        choices=CODECS,
+                        default="zlib",
+                        help="Compression codec")
+    parser.add_argument("--level",
+                        type=int,
+                        default=-1,
+                        help="Compression level (default of the codec if < 0)")
+    parser.add_argument("--frame-size",
+                        type=int,
+                        default=DEFAULT_FRAME_SIZE,
+                        help="Approximate uncompressed size of a frame")
+    parser.add_argument("-j",
+                        "--jobs",
+                        type=int,
+                        default=1,
+                        help="Number of threads (or processes for decoding)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    if args.command == "benchmark":
+        if args.input is None:
+            sys.exit("benchmark needs an input file")
+        for result in benchmark(args.input,
+                                jobs=args.jobs,
+                                frame_size=args.frame_size):
+            print(f"{result['codec']}: ratio {result['ratio']:.2f}, "
+                  f"write {result['write_MB_per_s']:.1f} MB/s, "
+                  f"read {result['read_MB_per_s']:.1f} MB/s")
+        sys.exit(0)
+    if args.output is None:
+        sys.exit(f"{args.command} needs an output file")
+    if args.command == "compress":
+        file = sys.stdin.buffer if args.input is None else args.input
+        executor = _make_executor(args.jobs)
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            with CompressedPETSIRDWriter(args.output, args.codec, args.level,
+                                         args.frame_size, executor) as writer:
+                compress(reader, writer)
+    else:
+        executor = _make_executor(args.jobs, processes=True)
+        with CompressedPETSIRDReader(args.input, executor) as reader:
+            with petsird.BinaryPETSIRDWriter(args.output) as writer:
+                writer.write_header(reader.read_header())
+                writer.write_time_blocks(reader.read_time_blocks())
+    if executor is not None:
+        executor.shutdown()
@@ -0,0 +1,360 @@
+"""
+Preliminary helpers to compare two PETSIRD streams
+
+The headers are compared field by field, with a tolerance for floating point values
+(e.g. geometry and efficiencies). Time blocks are read in lockstep, such that memory
+usage does not depend on the length of the streams. The events of every
+`EventTimeBlock` are compared as sorted columns (see `petsird.helpers.columnar`),
+such that the order of the events within a time block does not matter.
+
+Usage:
+    python -m petsird.helpers.diff first.petsird second.petsird
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import dataclasses
+import enum
+import itertools
+import sys
+import typing
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import (COINCIDENCE_KINDS,
+                                      get_coincidence_arrays,
+                                      get_multiple_arrays, get_single_arrays)
+from petsird.helpers.validate import Violations
+
+MULTIPLE_KINDS = ("triples", "quadruples")
+KINDS = COINCIDENCE_KINDS + ("singles", ) + MULTIPLE_KINDS
+
+
+@dataclass
+class DiffReport:
+    """Differences (indexed by category) between two PETSIRD streams
+
+    Categories are `header`, `time_blocks` (type or number of time blocks), or a
+    kind of events (see `KINDS`). `num_events` holds the number of events of every
+    kind in both streams. The first `max_reported` differences are described in
+    `first_differences`.
+    """
+    num_time_blocks: int = 0
+    num_events: dict[str, list[int]] = field(default_factory=dict)
+    differences: dict[str, Violations] = field(default_factory=dict)
+    first_differences: list[str] = field(default_factory=list)
+    max_reported: int = 10
+
+    @property
+    def is_equal(self) -> bool:
+        return not self.differences
+
+    def add(self,
+            category: str,
+            count: int,
+            block: typing.Optional[int] = None,
+            location: str = "") -> None:
+        if count == 0:
+            return
+        self.differences.setdefault(category,
+                                    Violations()).add(count, block, location)
+        if len(self.first_differences) < self.max_reported:
+            where = "header" if block is None else f"time block {block}"
+            self.first_differences.append(f"{where}: {location}")
+
+    def format(self) -> str:
+        lines = [f"Compared {self.num_time_blocks} time blocks"]
+        for kind, (count0, count1) in self.num_events.items():
+            if count0 + count1 > 0:
+                lines.append(f"{kind}: {count0} and {count1} events")
+        for category, d in self.differences.items():
+            lines.append(f"{category}: {d.count} difference(s)")
+        if self.first_differences:
+            lines.append("First differences:")
+            lines.extend(f"    {line}" for line in self.first_differences)
+        else:
+            lines.append("No differences found")
+        return "\n".join(lines)
+
+
+def _format_value(value: typing.Any) -> str:
+    text = repr(value)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+
+def _is_number(value: typing.Any) -> bool:
+    return (isinstance(value, (int, float, numpy.number))
+            and not isinstance(value, (bool, enum.Enum)))
+
+
+def compare_values(value0: typing.Any,
+                   value1: typing.Any,
+                   path: str = "",
+                   rtol: float = 1e-5,
+                   atol: float = 1e-8) -> Iterator[str]:
+    """Compare (yardl) values recursively and describe the differences
+
+    Floating point values and arrays are compared with `numpy.isclose`. Arrays are
+    compared as a whole, and only their first differing element is described.
+    """
+    if isinstance(value0, numpy.ndarray) or isinstance(value1, numpy.ndarray):
+        array0 = numpy.asarray(value0)
+        array1 = numpy.asarray(value1)
+        if array0.shape != array1.shape:
+            yield f"{path}: shape {array0.shape} != {array1.shape}"
+            return
+        if (numpy.issubdtype(array0.dtype, numpy.inexact)
+                or numpy.issubdtype(array1.dtype, numpy.inexact)):
+            different = ~numpy.isclose(
+                array0, array1, rtol=rtol, atol=atol, equal_nan=True)
+        else:
+            different = array0 != array1
+        count = int(numpy.count_nonzero(different))
+        if count > 0:
+            index = tuple(int(i) for i in numpy.argwhere(different)[0])
+            yield (f"{path}{list(index)}: {array0[index]} != {array1[index]}"
+                   f" ({count} of {different.size} elements differ)")
+    elif isinstance(value0,
+                    (list, tuple)) and isinstance(value1, (list, tuple)):
+        if len(value0) != len(value1):
+            yield f"{path}: length {len(value0)} != {len(value1)}"
+            return
+        if value0 and _is_number(value0[0]) and _is_number(value1[0]):
+            # compare lists of numbers as arrays
+            yield from compare_values(numpy.array(value0), numpy.array(value1),
+                                      path, rtol, atol)
+            return
+        for k, (item0, item1) in enumerate(zip(value0, value1)):
+            yield from compare_values(item0, item1, f"{path}[{k}]", rtol, atol)
+    elif type(value0) is not type(value1):
+        yield (f"{path}: {type(value0).__name__} != {type(value1).__name__}")
+    elif isinstance(value0, (float, numpy.floating)):
+        # as numpy.isclose
+        if not abs(value0 - value1) <= atol + rtol * abs(value1):
+            yield f"{path}: {value0} != {value1}"
+    elif isinstance(value0, petsird.UnionCase):
+        yield from compare_values(value0.value, value1.value,
+                                  f"{path}.{value0.tag}", rtol, atol)
+    elif hasattr(value0, "__dict__") and not isinstance(value0, enum.Enum):
+        # yardl records
+        for name in vars(value0):
+            yield from compare_values(getattr(value0, name),
+                                      getattr(value1, name),
+                                      f"{path}.{name}".lstrip("."), rtol, atol)
+    elif value0 != value1:
+        yield f"{path}: {_format_value(value0)} != {_format_value(value1)}"
+
+
+def _get_columns(arrays: typing.Any) -> list[npt.NDArray]:
+    """List the (1D) event columns of columnar arrays, without the block column"""
+    columns = []
+    for f in dataclasses.fields(arrays):
+        column = getattr(arrays, f.name)
+        if f.name == "block" or column is None:
+            continue
+        # columns of triples and quadruples are 2D
+        columns.extend(column.T if column.ndim > 1 else (column, ))
+    return columns
+
+
+def get_unmatched(
+    columns0: list[npt.NDArray], columns1: list[npt.NDArray]
+) -> tuple[npt.NDArray[numpy.bool_], npt.NDArray[numpy.bool_]]:
+    """Find the rows of two tables without an identical row in the other table
+
+    Both tables are given as lists of columns, and are compared as multisets (i.e.
+    ignoring the order of the rows). Returns masks of the unmatched rows.
+    """
+    num0 = len(columns0[0])
+    source = numpy.repeat(numpy.array([0, 1], dtype=numpy.int8),
+                          [num0, len(columns1[0])])
+    columns = [
+        numpy.concatenate((c0, c1)) for c0, c1 in zip(columns0, columns1)
+    ]
+    # identical rows are adjacent, with the rows of the first table first
+    order = numpy.lexsort([source] + columns[::-1])
+    columns = [c[order] for c in columns]
+    source = source[order]
+    new_row = numpy.zeros(len(order), dtype=bool)
+    new_row[:1] = True
+    for c in columns:
+        new_row[1:] |= c[1:] != c[:-1]
+    row = numpy.cumsum(new_row) - 1
+    counts0 = numpy.bincount(row, weights=source == 0).astype(numpy.int64)
+    counts1 = numpy.bincount(row, weights=source == 1).astype(numpy.int64)
+    # rank of every entry within the entries of its row and table
+    starts = numpy.flatnonzero(new_row)[row]
+    rank = numpy.arange(len(order)) - starts - numpy.where(
+        source == 1, counts0[row], 0)
+    unmatched = numpy.where(source == 0, rank >= counts1[row], rank
+                            >= counts0[row])
+    masks = numpy.zeros(len(order), dtype=bool)
+    masks[order] = unmatched
+    return masks[:num0], masks[num0:]
+
+
+def _get_event_arrays(scanner: petsird.ScannerInformation,
+                      event_time_block: petsird.EventTimeBlock,
+                      kind: str) -> dict:
+    if kind in COINCIDENCE_KINDS:
+        return get_coincidence_arrays(scanner, event_time_block, kind)
+    if kind == "singles":
+        return get_single_arrays(scanner, event_time_block)
+    return get_multiple_arrays(scanner, event_time_block, kind)
+
+
+def _format_key(key: typing.Union[int, tuple]) -> str:
+    return "".join(f"[{k}]"
+                   for k in (key if isinstance(key, tuple) else (key, )))
+
+
+class StreamComparison:
+    """Compare two PETSIRD streams, one pair of time blocks at a time"""
+
+    def __init__(self,
+                 header0: petsird.Header,
+                 header1: petsird.Header,
+                 rtol: float = 1e-5,
+                 atol: float = 1e-8,
+                 max_reported: int = 10):
+        self.scanners = (header0.scanner, header1.scanner)
+        self.rtol = rtol
+        self.atol = atol
+        self.report = DiffReport(max_reported=max_reported)
+        self.report.num_events = {kind: [0, 0] for kind in KINDS}
+        for difference in compare_values(header0, header1, "", rtol, atol):
+            self.report.add("header", 1, None, difference)
+
+    def add_time_blocks(
+            self, time_block0: typing.Optional[petsird.TimeBlock],
+            time_block1: typing.Optional[petsird.TimeBlock]) -> None:
+        """Compare the next time blocks (None if a stream has ended)"""
+        block = self.report.num_time_blocks
+        self.report.num_time_blocks += 1
+        if time_block0 is None or time_block1 is None:
+            missing = "first" if time_block0 is None else "second"
+            self.report.add("time_blocks", 1, block,
+                            f"missing in the {missing} stream")
+        elif type(time_block0) is not type(time_block1):
+            self.report.add("time_blocks", 1, block,
+                            f"{time_block0.tag} != {time_block1.tag}")
+        elif isinstance(time_block0, petsird.TimeBlock.EventTimeBlock):
+            self._compare_events(block, time_block0.value, time_block1.value)
+            return
+        else:
+            for difference in compare_values(time_block0.value,
+                                             time_block1.value,
+                                             time_block0.tag, self.rtol,
+                                             self.atol):
+                self.report.add("time_blocks", 1, block, difference)
+            return
+        # count the events of the time block that was not compared
+        for k, time_block in enumerate((time_block0, time_block1)):
+            if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+                for kind in KINDS:
+                    self.report.num_events[kind][k] += sum(
+                        len(a) for a in _get_event_arrays(
+                            self.scanners[k], time_block.value, kind).values())
+
+    def _compare_events(self, block: int,
+                        event_time_block0: petsird.EventTimeBlock,
+                        event_time_block1: petsird.EventTimeBlock) -> None:
+        for difference in compare_values(event_time_block0.time_interval,
+                                         event_time_block1.time_interval,
+                                         "time_interval"):
+            self.report.add("time_blocks", 1, block, difference)
+        for kind in KINDS:
+            arrays0 = _get_event_arrays(self.scanners[0], event_time_block0,
+                                        kind)
+            arrays1 = _get_event_arrays(self.scanners[1], event_time_block1,
+                                        kind)
+            for key in sorted(arrays0.keys() | arrays1.keys()):
+                self._compare_arrays(block, kind, key, arrays0.get(key),
+                                     arrays1.get(key))
+
+    def _compare_arrays(self, block: int, kind: str, key: typing.Union[int,
+                                                                       tuple],
+                        arrays0: typing.Any, arrays1: typing.Any) -> None:
+        location = f"{kind}{_format_key(key)}"
+        if arrays0 is None or arrays1 is None:
+            missing = "first" if arrays0 is None else "second"
+            self.report.add(kind, 1, block,
+                            f"{location} not stored in the {missing} stream")
+            return
+        self.report.num_events[kind][0] += len(arrays0)
+        self.report.num_events[kind][1] += len(arrays1)
+        unmatched0, unmatched1 = get_unmatched(_get_columns(arrays0),
+                                               _get_columns(arrays1))
+        count0 = int(numpy.count_nonzero(unmatched0))
+        count1 = int(numpy.count_nonzero(unmatched1))
+        if count0 + count1 == 0:
+            return
+        description = (f"{location}: {count0} event(s) only in the first and"
+                       f" {count1} only in the second stream")
+        for stream, arrays, unmatched in (("first", arrays0, unmatched0),
+                                          ("second", arrays1, unmatched1)):
+            if unmatched.any():
+                event = arrays[numpy.flatnonzero(unmatched)[:1]]
+                description += f"; {stream}: " + ", ".join(
+                    f"{f.name}={getattr(event, f.name)[0].tolist()}"
+                    for f in dataclasses.fields(event) if f.name != "block")
+        self.report.add(kind, count0 + count1, block, description)
+
+
+def diff(reader0: petsird.PETSIRDReaderBase,
+         reader1: petsird.PETSIRDReaderBase,
+         rtol: float = 1e-5,
+         atol: float = 1e-8,
+         max_reported: int = 10) -> DiffReport:
+    """Compare two PETSIRD streams (read in lockstep)
+
+    See `compare_values` for `rtol` and `atol`.
+    """
+    comparison = StreamComparison(reader0.read_header(), reader1.read_header(),
+                                  rtol, atol, max_reported)
+    for time_block0, time_block1 in itertools.zip_longest(
+            reader0.read_time_blocks(), reader1.read_time_blocks()):
+        comparison.add_time_blocks(time_block0, time_block1)
+    return comparison.report
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_diff',
+        description='Compare two PETSIRD files, ignoring the order of events'
+        ' within a time block')
+    parser.add_argument("first", type=str, help="First file")
+    parser.add_argument("second",
+                        type=str,
+                        help="Second file, or - to read from stdin")
+    parser.add_argument("--rtol",
+                        type=float,
+                        default=1e-5,
+                        help="Relative tolerance for floating point values")
+    parser.add_argument("--atol",
+                        type=float,
+                        default=1e-8,
+                        help="Absolute tolerance for floating point values")
+    parser.add_argument("--max-reported",
+                        type=int,
+                        default=10,
+                        help="Number of differences to describe")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    second = sys.stdin.buffer if args.second == "-" else args.second
+    with petsird.BinaryPETSIRDReader(args.first) as reader0:
+        with petsird.BinaryPETSIRDReader(second) as reader1:
+            report = diff(reader0, reader1, args.rtol, args.atol,
+                          args.max_reported)
+    print(report.format())
+    sys.exit(0 if report.is_equal else 1)
@@ -0,0 +1,329 @@
+"""
+Preliminary helpers for encoding raw detector data as PETSIRD coincidences
+
+Converters typically start from arrays with, for every coincidence, the crystal
+ids and energies of both detections, their arrival time difference, and the
+detection time. `encode_coincidences` converts these (vectorized) to the columns
+of `petsird.helpers.columnar`:
+1. energies are binned with `event_energy_bin_edges` of the module-type
+2. the crystal id and energy index are combined into a `DetectionBin`
+3. detections are swapped where needed such that `are_detections_ordered` holds
+   (and the module-type pair is non-increasing), flipping the sign of the TOF
+4. TOF differences are converted to mm and binned with `tof_bin_edges`
+5. events are assigned to time blocks and grouped by module-type pair
+Events with energies or TOF outside the bin edges, or times outside the time
+blocks, are discarded. `make_event_time_blocks` then constructs `EventTimeBlock`s
+ready for the writer.
+
+A crystal id is the index of the detecting element in all modules of its type,
+i.e. `element_index + module_index * num_elements_per_module` (see
+`ExpandedDetectionBin`).
+
+Usage:
+    python -m petsird.helpers.encoder -i raw.npz --header scanner.petsird -o out.petsird
+
+where `raw.npz` contains the arrays `crystal0`, `crystal1`, `energy0`,
+`energy1`, `tof` and `time` (see `RawCoincidences`), optionally
+`type_of_module0` and `type_of_module1`, and a boolean `delayed` array.
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import math
+import typing
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import get_num_det_els
+from petsird.helpers.columnar import (BLOCK_DTYPE, CoincidenceArrays,
+                                      ColumnarPETSIRD, SingleArrays,
+                                      get_module_type_pairs)
+
+# speed of light in mm/ps
+SPEED_OF_LIGHT = 0.299792458
+
+
+@dataclass
+class RawCoincidences:
+    """Raw coincidence data, one entry per event
+
+    `crystal0` and `crystal1` are crystal ids (see module documentation),
+    `energy0` and `energy1` are in keV, `tof` is the arrival time difference
+    t0 - t1 in ps and `time` the detection time in ms (w.r.t. the start of the
+    acquisition). `type_of_module0` and `type_of_module1` can be arrays or
+    scalars, and default to 0.
+    """
+    crystal0: npt.NDArray[numpy.integer]
+    crystal1: npt.NDArray[numpy.integer]
+    energy0: npt.NDArray[numpy.floating]
+    energy1: npt.NDArray[numpy.floating]
+    tof: npt.NDArray[numpy.floating]
+    time: npt.NDArray[numpy.floating]
+    type_of_module0: typing.Optional[npt.NDArray[numpy.integer]] = None
+    type_of_module1: typing.Optional[npt.NDArray[numpy.integer]] = None
+
+    def __len__(self) -> int:
+        return len(self.crystal0)
+
+    def __getitem__(self, index) -> "RawCoincidences":
+        """Select events with a slice, boolean mask or index array"""
+
+        def select(values):
+            if values is None or numpy.ndim(values) == 0:
+                return values
+            return numpy.asarray(values)[index]
+
+        return RawCoincidences(crystal0=select(self.crystal0),
+                               crystal1=select(self.crystal1),
+                               energy0=select(self.energy0),
+                               energy1=select(self.energy1),
+                               tof=select(self.tof),
+                               time=select(self.time),
+                               type_of_module0=select(self.type_of_module0),
+                               type_of_module1=select(self.type_of_module1))
+
+
+def get_energy_indices(scanner: petsird.ScannerInformation,
+                       type_of_module: int,
+                       energies: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    """Bin energies (in keV), returning -1 outside the energy bin edges"""
+    edges = numpy.asarray(scanner.event_energy_bin_edges[type_of_module].edges)
+    return _get_bin_indices(edges, energies)
+
+
+def get_tof_indices(scanner: petsird.ScannerInformation,
+                    type_of_module_pair: tuple[int, int],
+                    tof: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    """Bin arrival time differences (in ps), returning -1 outside the TOF bin edges"""
+    mtype0, mtype1 = type_of_module_pair
+    edges = numpy.asarray(scanner.tof_bin_edges[mtype0][mtype1].edges)
+    return _get_bin_indices(
+        edges,
+        numpy.asarray(tof, dtype=numpy.float64) * (SPEED_OF_LIGHT / 2))
+
+
+def _get_bin_indices(edges: npt.NDArray,
+                     values: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    indices = numpy.searchsorted(edges, values, side="right") - 1
+    indices[indices >= len(edges) - 1] = -1
+    return indices
+
+
+def get_detection_bins(
+        scanner: petsird.ScannerInformation, type_of_module: int,
+        crystals: npt.ArrayLike,
+        energy_indices: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    """Combine crystal ids and energy indices to detection bins
+
+    Detection bins are -1 where the energy index is -1. Raises a `ValueError`
+    for invalid crystal ids.
+    """
+    crystals = numpy.asarray(crystals, dtype=numpy.int64)
+    energy_indices = numpy.asarray(energy_indices, dtype=numpy.int64)
+    num_det_els = get_num_det_els(scanner, type_of_module)
+    if numpy.any((crystals < 0) | (crystals >= num_det_els)):
+        raise ValueError(f"Crystal ids of module-type {type_of_module} "
+                         f"have to be in [0, {num_det_els})")
+    num_en = scanner.event_energy_bin_edges[type_of_module].number_of_bins()
+    return numpy.where(energy_indices >= 0, crystals * num_en + energy_indices,
+                       -1)
+
+
+def get_block_edges(time_block_duration: int,
+                    stop: float,
+                    start: int = 0) -> npt.NDArray[numpy.int64]:
+    """Return edges of time blocks of equal duration (in ms) covering [start, stop]"""
+    num_blocks = max(math.floor((stop - start) / time_block_duration) + 1, 1)
+    return start + time_block_duration * numpy.arange(num_blocks + 1,
+                                                      dtype=numpy.int64)
+
+
+def get_block_indices(block_edges: npt.ArrayLike,
+                      times: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    """Find the time block of every time (in ms), -1 outside the time blocks"""
+    return _get_bin_indices(numpy.asarray(block_edges), times)
+
+
+def _get_types_of_modules(types_of_modules: typing.Optional[npt.ArrayLike],
+                          num_events: int) -> npt.NDArray[numpy.int64]:
+    if types_of_modules is None:
+        return numpy.zeros(num_events, dtype=numpy.int64)
+    return numpy.broadcast_to(
+        numpy.asarray(types_of_modules, dtype=numpy.int64), (num_events, ))
+
+
+def _get_all_detection_bins(
+        scanner: petsird.ScannerInformation,
+        types_of_modules: npt.NDArray[numpy.int64], crystals: npt.ArrayLike,
+        energies: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    """Detection bins for events of different module-types"""
+    crystals = numpy.asarray(crystals)
+    energies = numpy.asarray(energies)
+    det_bins = numpy.full(len(types_of_modules), -1, dtype=numpy.int64)
+    for mtype in numpy.unique(types_of_modules).tolist():
+        selection = types_of_modules == mtype
+        det_bins[selection] = get_detection_bins(
+            scanner, mtype, crystals[selection],
+            get_energy_indices(scanner, mtype, energies[selection]))
+    return det_bins
+
+
+def encode_coincidences(
+        scanner: petsird.ScannerInformation, raw: RawCoincidences,
+        block_edges: npt.ArrayLike
+) -> dict[tuple[int, int], CoincidenceArrays]:
+    """Convert raw coincidence data to ordered coincidences per module-type pair
+
+    `block_edges` are the edges (in ms) of the time blocks, see `get_block_edges`.
+    Returns `CoincidenceArrays` for every module-type pair, sorted by the `block`
+    column (the index of the time block). The order of events within a time
+    block is preserved.
+    """
+    num_events = len(raw)
+    types0 = _get_types_of_modules(raw.type_of_module0, num_events)
+    types1 = _get_types_of_modules(raw.type_of_module1, num_events)
+    return group_coincidences(
+        scanner, types0,
+        _get_all_detection_bins(scanner, types0, raw.crystal0,
+                                raw.energy0), types1,
+        _get_all_detection_bins(scanner, types1, raw.crystal1, raw.energy1),
+        raw.tof, get_block_indices(block_edges, raw.time))
+
+
+def group_coincidences(
+    scanner: petsird.ScannerInformation, types0: npt.NDArray[numpy.int64],
+    det_bins0: npt.NDArray[numpy.int64], types1: npt.NDArray[numpy.int64],
+    det_bins1: npt.NDArray[numpy.int64], tof: npt.ArrayLike,
+    blocks: npt.NDArray[numpy.int64]
+) -> dict[tuple[int, int], CoincidenceArrays]:
+    """Order and bin coincidences given as detection bins, see `encode_coincidences`
+
+    `tof` is the arrival time difference (in ps) and `blocks` the time block
+    index of every event. Events with a detection bin, TOF bin or time block
+    index of -1 are discarded.
+    """
+    tof = numpy.asarray(tof, dtype=numpy.float64)
+    # enforce ordering, see are_detections_ordered
+    swap = (types0 < types1) | ((types0 == types1) & (det_bins0 < det_bins1))
+    types0, types1 = (numpy.where(swap, types1,
+                                  types0), numpy.where(swap, types0, types1))
+    det_bins0, det_bins1 = (numpy.where(swap, det_bins1, det_bins0),
+                            numpy.where(swap, det_bins0, det_bins1))
+    tof = numpy.where(swap, -tof, tof)
+
+    valid = (det_bins0 >= 0) & (det_bins1 >= 0) & (blocks >= 0)
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    result = {}
+    for pair in get_module_type_pairs(num_module_types):
+        selection = numpy.flatnonzero(valid & (types0 == pair[0])
+                                      & (types1 == pair[1]))
+        tof_idx = get_tof_indices(scanner, pair, tof[selection])
+        selection = selection[tof_idx >= 0]
+        tof_idx = tof_idx[tof_idx >= 0]
+        order = numpy.argsort(blocks[selection], kind="stable")
+        selection = selection[order]
+        result[pair] = CoincidenceArrays(
+            det_bin0=det_bins0[selection].astype(numpy.uint32),
+            det_bin1=det_bins1[selection].astype(numpy.uint32),
+            tof_idx=tof_idx[order].astype(numpy.uint32),
+            block=blocks[selection].astype(numpy.uint32))
+    return result
+
+
+def make_event_time_blocks(
+    header: petsird.Header,
+    block_edges: npt.ArrayLike,
+    prompts: dict[tuple[int, int], CoincidenceArrays],
+    delayeds: typing.Optional[dict[tuple[int, int], CoincidenceArrays]] = None,
+    singles: typing.Optional[dict[int, SingleArrays]] = None
+) -> Iterator[petsird.EventTimeBlock]:
+    """Construct an `EventTimeBlock` for every time block
+
+    Events are given as columns with a sorted `block` column (see
+    `encode_coincidences`). `delayeds` and `singles` are omitted if `None`.
+    """
+    block_edges = numpy.asarray(block_edges)
+    blocks = numpy.zeros(len(block_edges) - 1, dtype=BLOCK_DTYPE)
+    blocks["start"] = block_edges[:-1]
+    blocks["stop"] = block_edges[1:]
+    blocks["stream_index"] = numpy.arange(len(blocks))
+    columnar = ColumnarPETSIRD(header=header,
+                               blocks=blocks,
+                               prompts=prompts,
+                               delayeds=delayeds or {},
+                               singles=singles or {})
+    for block_index in range(len(blocks)):
+        yield columnar.get_event_time_block(block_index)
+
+
+def encode(header: petsird.Header,
+           raw: RawCoincidences,
+           writer: petsird.PETSIRDWriterBase,
+           time_block_duration: int = 1,
+           delayed: typing.Optional[npt.ArrayLike] = None) -> None:
+    """Write raw coincidence data as a PETSIRD stream
+
+    `delayed` is an optional boolean array marking delayed coincidences. Time
+    blocks start at 0 and cover all events.
+    """
+    scanner = header.scanner
+    times = numpy.asarray(raw.time)
+    block_edges = get_block_edges(time_block_duration,
+                                  float(times.max()) if len(times) else 0)
+    if delayed is None:
+        prompts = encode_coincidences(scanner, raw, block_edges)
+        delayeds = None
+    else:
+        delayed = numpy.asarray(delayed, dtype=bool)
+        prompts = encode_coincidences(scanner, raw[~delayed], block_edges)
+        delayeds = encode_coincidences(scanner, raw[delayed], block_edges)
+    writer.write_header(header)
+    writer.write_time_blocks(
+        petsird.TimeBlock.EventTimeBlock(event_time_block) for event_time_block
+        in make_event_time_blocks(header, block_edges, prompts, delayeds))
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_encoder',
+        description='Encode raw coincidence data as a PETSIRD file')
+    parser.add_argument("-i",
+                        "--input",
+                        type=str,
+                        required=True,
+                        help=".npz file with the raw data")
+    parser.add_argument(
+        "--header",
+        type=str,
+        required=True,
+        help="PETSIRD file to take the header from (time blocks are ignored)")
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        required=True,
+                        help="File to write to")
+    parser.add_argument("--time-block-duration",
+                        type=int,
+                        default=1,
+                        help="Duration of the time blocks in ms")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    with petsird.BinaryPETSIRDReader(args.header,
+                                     skip_completed_check=True) as reader:
+        header = reader.read_header()
+    with numpy.load(args.input) as data:
+        arrays = {name: data[name] for name in data.files}
+    delayed = arrays.pop("delayed", None)
+    with petsird.BinaryPETSIRDWriter(args.output) as writer:
+        encode(header, RawCoincidences(**arrays), writer,
+               args.time_block_duration, delayed)
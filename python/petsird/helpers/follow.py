@@ -0,0 +1,308 @@
+"""
+Preliminary helpers for monitoring a PETSIRD stream while it is being written
+
+`FollowStream` wraps a growing file (or a pipe) such that a `BinaryPETSIRDReader`
+waits for more data at the (current) end of the file, like `tail -f`. A file is
+considered finished when it did not grow for `timeout` seconds, a pipe when it is
+closed. If the stream ends in the middle of a time block, `follow` stops at the
+last complete time block and reports the stream as truncated. A stream that ends
+within the header is detected by `open_reader`.
+
+`RateMonitor` keeps sliding-window statistics over the last `window` ms of
+acquisition time, updated incrementally for every time block:
+- prompt and delayed rates per module-type pair
+- singles rates per module-type (from singles events and singles histograms)
+- dead-time fractions per module-type (mean over the detection bins)
+- total counts since the start
+
+Usage:
+    python -m petsird.helpers.analysis --follow -i acquisition.petsird
+    python -m petsird.helpers.generator | python -m petsird.helpers.analysis --follow
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import collections
+import io
+import time
+import typing
+from collections.abc import Callable
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import get_module_type_pairs
+
+# the generated reader raises a BufferError instead of an EOFError when a short
+# read leaves a partial record in its buffer
+_TRUNCATION_ERRORS = (EOFError, BufferError)
+
+
+class FollowStream(io.BufferedIOBase):
+    """Read-only stream that waits for a file to grow
+
+    Reads only return less data than requested when the stream is finished, such
+    that the yardl reader never sees a partially written time block as the end
+    of the stream. `on_wait` is called while waiting (e.g. to emit statistics).
+    """
+
+    def __init__(self,
+                 file: typing.Union[str, typing.BinaryIO],
+                 poll_interval: float = 0.1,
+                 timeout: float = 10.0,
+                 on_wait: typing.Optional[Callable[[], None]] = None):
+        super().__init__()
+        self._owns_file = isinstance(file, str)
+        self._file = open(file, "rb") if self._owns_file else file
+        self._readinto = getattr(self._file, "readinto1", self._file.readinto)
+        self._is_pipe = not self._file.seekable()
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.on_wait = on_wait
+        self._last_data_time = time.monotonic()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        num_read = 0
+        while num_read < len(view):
+            n = self._readinto(view[num_read:])
+            if n:
+                num_read += n
+                self._last_data_time = time.monotonic()
+                continue
+            if (self._is_pipe
+                    or time.monotonic() - self._last_data_time > self.timeout):
+                break
+            if self.on_wait is not None:
+                self.on_wait()
+            time.sleep(self.poll_interval)
+        return num_read
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            chunks = []
+            while chunk := self.read(1 << 16):
+                chunks.append(chunk)
+            return b"".join(chunks)
+        buffer = bytearray(size)
+        return bytes(buffer[:self.readinto(buffer)])
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._file.close()
+        super().close()
+
+
+class _SlidingSum:
+    """Sums of values and durations of time intervals in a sliding window"""
+
+    def __init__(self, size: int):
+        self._entries = collections.deque()
+        self.values = numpy.zeros(size)
+        self.duration = 0
+
+    def add(self, start: int, stop: int, values: npt.ArrayLike) -> None:
+        values = numpy.asarray(values, dtype=numpy.float64)
+        self._entries.append((stop, stop - start, values))
+        self.values += values
+        self.duration += stop - start
+
+    def evict(self, before: int) -> None:
+        """Remove intervals that stopped at or before `before`"""
+        while self._entries and self._entries[0][0] <= before:
+            _, duration, values = self._entries.popleft()
+            self.values -= values
+            self.duration -= duration
+        if not self._entries:
+            # avoid accumulating rounding errors
+            self.values[:] = 0
+
+    def get_means(self) -> typing.Optional[npt.NDArray[numpy.float64]]:
+        """Return the values per ms, or `None` for an empty window"""
+        if self.duration <= 0:
+            return None
+        return self.values / self.duration
+
+
+class RateMonitor:
+    """Sliding-window statistics over the last `window` ms of acquisition time"""
+
+    def __init__(self,
+                 scanner: petsird.ScannerInformation,
+                 window: int = 1000):
+        self.scanner = scanner
+        self.window = window
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        self.pairs = get_module_type_pairs(num_module_types)
+        self.types = list(range(num_module_types))
+        num_pairs = len(self.pairs)
+        # prompts and delayeds per pair, followed by singles events per type
+        self._events = _SlidingSum(2 * num_pairs + num_module_types)
+        self._singles_histograms = _SlidingSum(num_module_types)
+        # alive-time fraction multiplied by the duration
+        self._alive_times = _SlidingSum(num_module_types)
+        self.totals = numpy.zeros(2 * num_pairs + 2 * num_module_types,
+                                  dtype=numpy.int64)
+        self.num_time_blocks = 0
+        self.last_time = 0
+
+    def _count_events(self,
+                      event_time_block: petsird.EventTimeBlock) -> list[int]:
+        counts = []
+        for events in (event_time_block.prompt_events,
+                       event_time_block.delayed_events):
+            counts.extend(
+                len(events[mtype0][mtype1]) if events else 0
+                for mtype0, mtype1 in self.pairs)
+        single_events = event_time_block.single_events
+        counts.extend(
+            len(single_events[mtype]) if single_events else 0
+            for mtype in self.types)
+        return counts
+
+    def add_time_block(self, time_block: petsird.TimeBlock) -> None:
+        """Update the statistics with a time block"""
+        self.num_time_blocks += 1
+        value = time_block.value
+        start = value.time_interval.start
+        stop = value.time_interval.stop
+        num_event_counts = len(self._events.values)
+        if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            counts = self._count_events(value)
+            self._events.add(start, stop, counts)
+            self.totals[:num_event_counts] += counts
+        elif isinstance(time_block,
+                        petsird.TimeBlock.SinglesHistogramTimeBlock):
+            counts = [int(numpy.sum(h)) for h in value.singles_histograms]
+            self._singles_histograms.add(start, stop, counts)
+            self.totals[num_event_counts:] += counts
+        elif isinstance(time_block, petsird.TimeBlock.DeadTimeTimeBlock):
+            fractions = value.alive_time_fractions.singles_alive_time_fractions
+            self._alive_times.add(
+                start, stop,
+                [numpy.mean(f) * (stop - start) for f in fractions])
+        else:
+            return
+        self.last_time = max(self.last_time, stop)
+        before = self.last_time - self.window
+        for sliding_sum in (self._events, self._singles_histograms,
+                            self._alive_times):
+            sliding_sum.evict(before)
+
+    def get_statistics(self) -> dict:
+        """Return the current statistics as a JSON-serialisable dictionary
+
+        Rates are in counts per second, and `None` if the window does not
+        contain time blocks of the corresponding type.
+        """
+        num_pairs = len(self.pairs)
+        num_types = len(self.types)
+        pair_keys = [f"{mtype0}_{mtype1}" for mtype0, mtype1 in self.pairs]
+        type_keys = [str(mtype) for mtype in self.types]
+
+        def as_dict(keys: list[str],
+                    values: typing.Optional[npt.NDArray],
+                    scale: float = 1000) -> dict:
+            if values is None:
+                return dict.fromkeys(keys)
+            return {
+                key: float(value) * scale
+                for key, value in zip(keys, values)
+            }
+
+        event_rates = self._events.get_means()
+        if event_rates is None:
+            event_rates = [None] * 3
+        else:
+            event_rates = [
+                event_rates[:num_pairs], event_rates[num_pairs:2 * num_pairs],
+                event_rates[2 * num_pairs:]
+            ]
+        alive_fractions = self._alive_times.get_means()
+        totals = self.totals.tolist()
+        return {
+            "time":
+            self.last_time,
+            "num_time_blocks":
+            self.num_time_blocks,
+            "window_ms":
+            self._events.duration,
+            "prompt_rates":
+            as_dict(pair_keys, event_rates[0]),
+            "delayed_rates":
+            as_dict(pair_keys, event_rates[1]),
+            "singles_event_rates":
+            as_dict(type_keys, event_rates[2]),
+            "singles_histogram_rates":
+            as_dict(type_keys, self._singles_histograms.get_means()),
+            "dead_time_fractions":
+            as_dict(type_keys,
+                    None if alive_fractions is None else 1 - alive_fractions,
+                    scale=1),
+            "totals": {
+                "prompts":
+                dict(zip(pair_keys, totals[:num_pairs])),
+                "delayeds":
+                dict(zip(pair_keys, totals[num_pairs:2 * num_pairs])),
+                "singles_events":
+                dict(
+                    zip(type_keys,
+                        totals[2 * num_pairs:2 * num_pairs + num_types])),
+                "singles_histograms":
+                dict(zip(type_keys, totals[2 * num_pairs + num_types:])),
+            },
+        }
+
+
+def open_reader(
+    stream: typing.BinaryIO
+) -> typing.Optional[tuple[petsird.BinaryPETSIRDReader, petsird.Header]]:
+    """Open a reader for a (growing) stream and read the header
+
+    Returns `None` if the stream ends before the end of the header.
+    """
+    try:
+        reader = petsird.BinaryPETSIRDReader(stream, skip_completed_check=True)
+        return reader, reader.read_header()
+    except _TRUNCATION_ERRORS:
+        return None
+
+
+def follow(reader: petsird.PETSIRDReaderBase,
+           monitor: RateMonitor,
+           emit: Callable[[dict], None],
+           interval: float = 1.0,
+           stream: typing.Optional[FollowStream] = None) -> None:
+    """Update `monitor` with all time blocks, and `emit` statistics regularly
+
+    `interval` is in seconds (wall-clock time). If `stream` is given, statistics
+    are also emitted while waiting for data. The last statistics are always
+    emitted, with `"truncated": True` if the stream ended within a time block.
+    """
+    last_emit = time.monotonic()
+
+    def maybe_emit() -> None:
+        nonlocal last_emit
+        now = time.monotonic()
+        if now - last_emit >= interval:
+            emit(monitor.get_statistics())
+            last_emit = now
+
+    if stream is not None:
+        stream.on_wait = maybe_emit
+    truncated = False
+    try:
+        for time_block in reader.read_time_blocks():
+            monitor.add_time_block(time_block)
+            maybe_emit()
+    except _TRUNCATION_ERRORS:
+        truncated = True
+    statistics = monitor.get_statistics()
+    statistics["truncated"] = truncated
+    emit(statistics)
@@ -0,0 +1,429 @@
+"""
+Preliminary helpers for respiratory and cardiac gating of PETSIRD data
+
+Values of an `ExternalSignalTimeBlock` are assumed to be equally spaced samples
+over its time interval (at the centre of each sub-interval). For triggers, the
+values are ignored and the start of the time interval is used as trigger time.
+Gates are derived from a signal with
+- `PhaseGating`: the time between consecutive triggers (or maxima of a trace) is
+  divided into equal phase bins
+- `AmplitudeGating`: the signal value is binned (by default in bins containing
+  the same amount of time)
+An `EventTimeBlock` is assigned to the gate at the centre of its time interval,
+and single events to the gate at their arrival time. Events outside the signal
+are dropped. All gates are written in a single pass over the data.
+
+Usage:
+    python -m petsird.helpers.gating -i test.petsird -n 8 -o gated.petsird
+    python -m petsird.helpers.gating -i test.petsird --method amplitude -n 4 \
+        --histograms gated_histograms
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import contextlib
+import os
+import sys
+import typing
+from collections.abc import Iterable, Sequence
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import get_num_detection_bins
+from petsird.helpers.columnar import (get_coincidence_arrays,
+                                      get_single_arrays, nest_by_module_types)
+from petsird.helpers.subsample import get_subset_filename
+
+TRIGGER_SIGNAL_TYPES = (
+    petsird.ExternalSignalTypeEnum.ECG_TRIGGER,
+    petsird.ExternalSignalTypeEnum.RESP_TRIGGER,
+    petsird.ExternalSignalTypeEnum.OTHER_MOTION_TRIGGER,
+    petsird.ExternalSignalTypeEnum.MR_PULSE_START,
+)
+# time_offset_in_time_block is in ps, time intervals in ms
+_PS_TO_MS = 1e-9
+# number of detections of the events in the fields of an `EventTimeBlock`
+_NUM_DETECTIONS = {
+    "prompt_events": 2,
+    "delayed_events": 2,
+    "triple_events": 3,
+    "quadruple_events": 4
+}
+
+
+class SignalTrace:
+    """Samples (or triggers) of one external signal as a function of time (in ms)"""
+
+    def __init__(self, is_trigger: bool = False):
+        self.is_trigger = is_trigger
+        self._times = []
+        self._values = []
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self._times)
+
+    def append(self, time_interval: petsird.TimeInterval,
+               values: Sequence[float]) -> None:
+        if self.is_trigger:
+            times = numpy.array([time_interval.start], dtype=numpy.float64)
+            values = numpy.ones(1, dtype=numpy.float32)
+        else:
+            values = numpy.asarray(values, dtype=numpy.float32)
+            duration = time_interval.stop - time_interval.start
+            times = time_interval.start + duration * (
+                numpy.arange(len(values)) + 0.5) / max(len(values), 1)
+        self._times.append(times)
+        self._values.append(values)
+        self._arrays = None
+
+    @property
+    def times(self) -> npt.NDArray[numpy.float64]:
+        return self._get_arrays()[0]
+
+    @property
+    def values(self) -> npt.NDArray[numpy.float32]:
+        return self._get_arrays()[1]
+
+    def _get_arrays(self):
+        if self._arrays is None:
+            times = numpy.concatenate(self._times or [numpy.zeros(0)])
+            values = numpy.concatenate(self._values
+                                       or [numpy.zeros(0, numpy.float32)])
+            # time blocks of one signal should be ordered, but make sure
+            order = numpy.argsort(times, kind="stable")
+            self._arrays = (times[order], values[order])
+        return self._arrays
+
+    def get_values(self, times: npt.ArrayLike) -> npt.NDArray[numpy.float64]:
+        """Interpolate the trace (NaN outside the sampled time range)"""
+        return numpy.interp(times, self.times, self.values, numpy.nan,
+                            numpy.nan)
+
+    def get_trigger_times(self,
+                          min_interval: float = 0.
+                          ) -> npt.NDArray[numpy.float64]:
+        """Return trigger times, or times of local maxima for a trace
+
+        Maxima closer than `min_interval` (in ms) to the previous one are dropped.
+        """
+        if self.is_trigger:
+            return self.times
+        values = self.values
+        is_max = numpy.zeros(len(values), dtype=bool)
+        is_max[1:-1] = (values[1:-1] > values[:-2]) & (values[1:-1]
+                                                       >= values[2:])
+        peaks = self.times[is_max]
+        if min_interval <= 0 or len(peaks) == 0:
+            return peaks
+        kept = [peaks[0]]
+        for peak in peaks[1:].tolist():
+            if peak - kept[-1] >= min_interval:
+                kept.append(peak)
+        return numpy.array(kept)
+
+
+def read_signal_traces(
+    time_blocks: Iterable[petsird.TimeBlock],
+    exam: typing.Optional[petsird.ExamInformation] = None
+) -> dict[int, SignalTrace]:
+    """Collect the `ExternalSignalTimeBlock`s of a stream (indexed by signal_id)
+
+    The signal types in `exam` are used to find triggers. Without it, signals
+    without values are considered to be triggers.
+    """
+    signal_types = {}
+    if exam is not None:
+        signal_types = {s.id: s.type for s in exam.external_signals}
+    traces = {}
+    for time_block in time_blocks:
+        if not isinstance(time_block,
+                          petsird.TimeBlock.ExternalSignalTimeBlock):
+            continue
+        block = time_block.value
+        trace = traces.get(block.signal_id)
+        if trace is None:
+            signal_type = signal_types.get(block.signal_id)
+            is_trigger = (signal_type in TRIGGER_SIGNAL_TYPES if signal_type
+                          is not None else len(block.signal_values) == 0)
+            trace = traces[block.signal_id] = SignalTrace(is_trigger)
+        trace.append(block.time_interval, block.signal_values)
+    return traces
+
+
+class PhaseGating:
+    """Gates from equal phase bins between consecutive triggers"""
+
+    def __init__(self, trigger_times: npt.ArrayLike, num_gates: int):
+        self.trigger_times = numpy.asarray(trigger_times, dtype=numpy.float64)
+        self.num_gates = num_gates
+
+    def get_phases(self, times: npt.ArrayLike) -> npt.NDArray[numpy.float64]:
+        """Phase in [0, 1), or NaN before the first or after the last trigger"""
+        times = numpy.asarray(times, dtype=numpy.float64)
+        cycle = numpy.searchsorted(self.trigger_times, times, side="right") - 1
+        valid = (cycle >= 0) & (cycle < len(self.trigger_times) - 1)
+        phases = numpy.full(times.shape, numpy.nan)
+        start = self.trigger_times[cycle[valid]]
+        stop = self.trigger_times[cycle[valid] + 1]
+        phases[valid] = (times[valid] - start) / (stop - start)
+        return phases
+
+    def get_gates(self, times: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+        """Gate index for every time (-1 if not in a gate)"""
+        phases = self.get_phases(times)
+        gates = numpy.full(phases.shape, -1, dtype=numpy.int64)
+        valid = ~numpy.isnan(phases)
+        gates[valid] = numpy.minimum(
+            (phases[valid] * self.num_gates).astype(numpy.int64),
+            self.num_gates - 1)
+        return gates
+
+
+class AmplitudeGating:
+    """Gates from bins in the signal value"""
+
+    def __init__(self, trace: SignalTrace, gate_edges: npt.ArrayLike):
+        self.trace = trace
+        self.gate_edges = numpy.asarray(gate_edges, dtype=numpy.float64)
+        self.num_gates = len(self.gate_edges) - 1
+
+    @classmethod
+    def from_quantiles(cls, trace: SignalTrace,
+                       num_gates: int) -> "AmplitudeGating":
+        """Create gates containing the same fraction of the (sampled) time"""
+        edges = numpy.quantile(trace.values,
+                               numpy.linspace(0, 1, num_gates + 1))
+        return cls(trace, edges)
+
+    def get_gates(self, times: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+        """Gate index for every time (-1 if not in a gate)"""
+        values = self.trace.get_values(times)
+        gates = numpy.searchsorted(self.gate_edges, values, side="right") - 1
+        # include the upper edge in the last gate
+        gates[values == self.gate_edges[-1]] = self.num_gates - 1
+        gates[(gates >= self.num_gates) | numpy.isnan(values)] = -1
+        return gates
+
+
+class Gating(typing.Protocol):
+    """Interface of PhaseGating and AmplitudeGating"""
+
+    num_gates: int
+
+    def get_gates(self, times: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+        ...
+
+
+def get_block_gate(gating: Gating, time_interval: petsird.TimeInterval) -> int:
+    """Gate of a time block (at the centre of its time interval)"""
+    centre = (time_interval.start + time_interval.stop) / 2
+    return int(gating.get_gates([centre])[0])
+
+
+class GatedHistograms:
+    """Counts per gate and detection bin, and time per gate
+
+    Prompt counts are accumulated for both detection bins of a coincidence.
+    """
+
+    def __init__(self, scanner: petsird.ScannerInformation, num_gates: int):
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        self.num_gates = num_gates
+        self.num_detection_bins = [
+            get_num_detection_bins(scanner, mtype)
+            for mtype in range(num_module_types)
+        ]
+        self.prompts = [
+            numpy.zeros((num_gates, n), dtype=numpy.int64)
+            for n in self.num_detection_bins
+        ]
+        self.singles = [
+            numpy.zeros((num_gates, n), dtype=numpy.int64)
+            for n in self.num_detection_bins
+        ]
+        self.durations = numpy.zeros(num_gates, dtype=numpy.float64)
+
+    def _add(self, histograms: npt.NDArray[numpy.int64],
+             gates: npt.NDArray[numpy.int64],
+             det_bins: npt.NDArray[numpy.uint32]) -> None:
+        num_bins = histograms.shape[1]
+        valid = gates >= 0
+        indices = gates[valid] * num_bins + det_bins[valid]
+        histograms += numpy.bincount(
+            indices, minlength=histograms.size).reshape(histograms.shape)
+
+    def add_coincidences(self, gate: int, type_of_module_pair: tuple[int, int],
+                         det_bin0: npt.NDArray[numpy.uint32],
+                         det_bin1: npt.NDArray[numpy.uint32]) -> None:
+        if gate < 0:
+            return
+        for mtype, det_bins in zip(type_of_module_pair, (det_bin0, det_bin1)):
+            self.prompts[mtype][gate] += numpy.bincount(
+                det_bins, minlength=self.num_detection_bins[mtype])
+
+    def add_singles(self, type_of_module: int, gates: npt.NDArray[numpy.int64],
+                    det_bins: npt.NDArray[numpy.uint32]) -> None:
+        self._add(self.singles[type_of_module], gates, det_bins)
+
+    def save(self, directory: str) -> None:
+        """Save as `.npy` files with shape (num_gates, num_detection_bins)"""
+        os.makedirs(directory, exist_ok=True)
+        for mtype in range(len(self.prompts)):
+            numpy.save(os.path.join(directory, f"prompts_{mtype}.npy"),
+                       self.prompts[mtype])
+            numpy.save(os.path.join(directory, f"singles_{mtype}.npy"),
+                       self.singles[mtype])
+        numpy.save(os.path.join(directory, "durations.npy"), self.durations)
+
+
+def gate_time_blocks(
+        scanner: petsird.ScannerInformation,
+        time_blocks: Iterable[petsird.TimeBlock],
+        gating: Gating,
+        writers: Sequence[petsird.PETSIRDWriterBase] = (),
+        histograms: typing.Optional[GatedHistograms] = None) -> None:
+    """Distribute time blocks over gates in a single pass
+
+    If given, every writer (one per gate, with the header already written)
+    receives all time blocks that are not an `EventTimeBlock`, the event time
+    blocks of its gate (with only the singles of the gate) and the singles of
+    the gate in other time blocks.
+    """
+    if writers and len(writers) != gating.num_gates:
+        raise ValueError(f"Expected {gating.num_gates} writers")
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    for time_block in time_blocks:
+        if not isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            for writer in writers:
+                writer.write_time_blocks((time_block, ))
+            continue
+        event_time_block = time_block.value
+        time_interval = event_time_block.time_interval
+        gate = get_block_gate(gating, time_interval)
+        if histograms is not None and gate >= 0:
+            histograms.durations[gate] += (time_interval.stop -
+                                           time_interval.start)
+            for pair, arrays in get_coincidence_arrays(
+                    scanner, event_time_block).items():
+                histograms.add_coincidences(gate, pair, arrays.det_bin0,
+                                            arrays.det_bin1)
+        single_gates = {}
+        for mtype, arrays in get_single_arrays(scanner,
+                                               event_time_block).items():
+            times = time_interval.start + arrays.time_offset * _PS_TO_MS
+            single_gates[mtype] = gating.get_gates(times)
+            if histograms is not None:
+                histograms.add_singles(mtype, single_gates[mtype],
+                                       arrays.det_bin)
+        for k, writer in enumerate(writers):
+            singles = [[
+                events[i]
+                for i in numpy.flatnonzero(single_gates[mtype] == k).tolist()
+            ] for mtype, events in enumerate(event_time_block.single_events)]
+            if k != gate and not any(singles):
+                continue
+            gated_block = petsird.EventTimeBlock(time_interval=time_interval,
+                                                 single_events=singles)
+            for field, num_detections in _NUM_DETECTIONS.items():
+                nested = getattr(event_time_block, field)
+                if k != gate and nested:
+                    nested = nest_by_module_types(num_module_types,
+                                                  num_detections, lambda _: [])
+                setattr(gated_block, field, nested)
+            writer.write_time_blocks(
+                (petsird.TimeBlock.EventTimeBlock(gated_block), ))
+    for writer in writers:
+        # a gate can be without time blocks, but its writer only closes after a
+        # call to write_time_blocks
+        writer.write_time_blocks(())
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_gating',
+        description='Gate a PETSIRD file using an external signal')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted (needs --signals)",
+    )
+    parser.add_argument(
+        "--signals",
+        type=str,
+        default=None,
+        help="File with the external signals (default: extra pass over input)")
+    parser.add_argument("--signal-id",
+                        type=int,
+                        default=None,
+                        help="signal_id to use (default: the first one)")
+    parser.add_argument("--method",
+                        choices=("phase", "amplitude"),
+                        default="phase",
+                        help="Gating method")
+    parser.add_argument("-n",
+                        "--gates",
+                        type=int,
+                        default=4,
+                        help="Number of gates")
+    parser.add_argument("--min-interval",
+                        type=float,
+                        default=0.,
+                        help="Minimum time between maxima of a trace (ms)")
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="File to write to (_<gate> is appended)")
+    parser.add_argument("--histograms",
+                        type=str,
+                        default=None,
+                        help="Directory to write gated histograms to")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    signals_file = args.signals if args.signals is not None else args.input
+    if signals_file is None:
+        sys.exit("Reading from stdin needs --signals")
+    with petsird.BinaryPETSIRDReader(signals_file) as reader:
+        header = reader.read_header()
+        traces = read_signal_traces(reader.read_time_blocks(), header.exam)
+    if not traces:
+        sys.exit("No external signals found")
+    signal_id = (min(traces) if args.signal_id is None else args.signal_id)
+    trace = traces[signal_id]
+    if args.method == "phase":
+        gating = PhaseGating(trace.get_trigger_times(args.min_interval),
+                             args.gates)
+    else:
+        gating = AmplitudeGating.from_quantiles(trace, args.gates)
+
+    file = sys.stdin.buffer if args.input is None else args.input
+    with contextlib.ExitStack() as stack:
+        writers = []
+        if args.output is not None:
+            writers = [
+                stack.enter_context(
+                    petsird.BinaryPETSIRDWriter(
+                        get_subset_filename(args.output, k, args.gates)))
+                for k in range(args.gates)
+            ]
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            header = reader.read_header()
+            for writer in writers:
+                writer.write_header(header)
+            histograms = (None if args.histograms is None else GatedHistograms(
+                header.scanner, args.gates))
+            gate_time_blocks(header.scanner, reader.read_time_blocks(), gating,
+                             writers, histograms)
+    if histograms is not None:
+        histograms.save(args.histograms)
@@ -482,10 +482,10 @@ def get_events(header: petsird.Header,
     num_tof_bins = tof_bin_edges.number_of_bins()
     count1 = get_num_detection_bins(header.scanner, type_of_module1)
 
-    detection_bins = [petsird.DetectionBin(), petsird.DetectionBin()]
     for _ in range(num_events):
         event = petsird.CoincidenceEvent(
-            detection_bins=detection_bins,
+            detection_bins=[petsird.DetectionBin(),
+                            petsird.DetectionBin()],
             tof_idx=get_random_uint(num_tof_bins),
         )
         # Generate random detection_bins until detection effficiency is not zero
@@ -499,7 +499,7 @@ def get_events(header: petsird.Header,
                 header.scanner, type_of_module0, expanded_detection_bin0)
             # TODO move test to separate function
             assert expanded_detection_bin0 == petsird.helpers.expand_detection_bin(
-                header.scanner, type_of_module0, detection_bins[0])
+                header.scanner, type_of_module0, event.detection_bins[0])
 
             # short-cut to directly generate a random detection bin
             # Note: we need the events to be ordered
@@ -541,7 +541,7 @@ def generate() -> None:
                         list(
                             get_events(header, type_of_module_pair,
                                        num_prompts_this_block)))
-                    prompts_this_block.append(prompts_mod0)
+                prompts_this_block.append(prompts_mod0)
             # Normally we'd write multiple blocks, but here we have just one,
             # so let's write a tuple with just one element
             writer.write_time_blocks((petsird.TimeBlock.EventTimeBlock(
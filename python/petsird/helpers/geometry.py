@@ -2,15 +2,22 @@
 Preliminary helpers for geometric calculations for PETSIRD data
 """
 
-#  Copyright (C) 2024 - 2025 University College London
+#  Copyright (C) 2024 - 2026 University College London
 #
 #  SPDX-License-Identifier: Apache-2.0
 
+from collections.abc import Sequence
+
 import numpy
 import numpy.typing as npt
 
 import petsird
 
+# Corner indices of the 6 faces of a BoxShape.
+# This assumes the corner ordering used in petsird.helpers.generator.get_crystal
+BOX_SHAPE_FACES = ((0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 5, 4), (2, 3, 7, 6),
+                   (1, 2, 6, 5), (4, 7, 3, 0))
+
 
 def transform_to_mat44(
     transform: petsird.RigidTransformation, ) -> npt.NDArray[numpy.float32]:
@@ -79,3 +86,105 @@ def get_detecting_box(
         mult_transforms([mod_transform, transform]),
         det_els.object.shape,
     )
+
+
+def transforms_to_mat44s(
+    transforms: Sequence[petsird.RigidTransformation]
+) -> npt.NDArray[numpy.float32]:
+    """stack rigid transformations into an array of shape (N, 4, 4)"""
+    mats = numpy.zeros((len(transforms), 4, 4), dtype=numpy.float32)
+    mats[:, 3, 3] = 1
+    if len(transforms) > 0:
+        mats[:, 0:3, :] = numpy.stack([t.matrix for t in transforms])
+    return mats
+
+
+def transform_coords(mat: npt.NDArray[numpy.float32],
+                     coords: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+    """apply (stacked) 4x4 matrices to (stacked) coordinates
+
+    `mat` has shape (..., 4, 4) and `coords` (..., 3). Leading dimensions are
+    broadcast against each other.
+    """
+    coords = numpy.asarray(coords)
+    return (numpy.matmul(mat[..., 0:3, 0:3], coords[..., None])[..., 0] +
+            mat[..., 0:3, 3])
+
+
+def get_detecting_element_mat44s(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule) -> npt.NDArray[numpy.float32]:
+    """Find the transformations of all detecting elements of a module-type
+
+    The result has shape (num_modules, num_elements_per_module, 4, 4).
+    """
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    det_els = rep_module.object.detecting_elements
+    mod_mats = transforms_to_mat44s(rep_module.transforms)
+    el_mats = transforms_to_mat44s(det_els.transforms)
+    return numpy.matmul(mod_mats[:, None], el_mats[None, :])
+
+
+def get_detecting_box_corners(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule) -> npt.NDArray[numpy.float32]:
+    """Find the corners of all detecting boxes of a module-type
+
+    Vectorized version of get_detecting_box. The result has shape
+    (num_modules, num_elements_per_module, 8, 3).
+    """
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    box_shape = rep_module.object.detecting_elements.object.shape
+    corners = numpy.array([c.c for c in box_shape.corners])
+    mats = get_detecting_element_mat44s(scanner, type_of_module)
+    return transform_coords(mats[:, :, None], corners)
+
+
+def get_detecting_element_centres(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule) -> npt.NDArray[numpy.float32]:
+    """Find the centres (mean of the corners) of all detecting boxes
+
+    The result has shape (num_modules, num_elements_per_module, 3).
+    """
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    box_shape = rep_module.object.detecting_elements.object.shape
+    centre = numpy.mean([c.c for c in box_shape.corners], axis=0)
+    mats = get_detecting_element_mat44s(scanner, type_of_module)
+    return transform_coords(mats, centre)
+
+
+def get_detection_bin_centres(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule,
+        detection_bins: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+    """Find the centres of the detecting boxes for an array of detection bins
+
+    The result has shape (len(detection_bins), 3).
+    """
+    num_en = scanner.event_energy_bin_edges[type_of_module].number_of_bins()
+    centres = get_detecting_element_centres(scanner, type_of_module)
+    return centres.reshape(-1, 3)[numpy.asarray(detection_bins) // num_en]
+
+
+def get_module_box_corners(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule) -> npt.NDArray[numpy.float32]:
+    """Find the corners of a box around each module of a module-type
+
+    The box is the bounding box of all detecting elements in module coordinates,
+    transformed with the module transforms. The result has shape (num_modules, 8, 3)
+    with corners ordered as in BOX_SHAPE_FACES.
+    """
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    det_els = rep_module.object.detecting_elements
+    corners = numpy.array([c.c for c in det_els.object.shape.corners])
+    el_corners = transform_coords(
+        transforms_to_mat44s(det_els.transforms)[:, None], corners)
+    lo = el_corners.min(axis=(0, 1))
+    hi = el_corners.max(axis=(0, 1))
+    box = numpy.array([(x, y, z) for x in (lo[0], hi[0])
+                       for (y, z) in ((lo[1], lo[2]), (lo[1], hi[2]),
+                                      (hi[1], hi[2]), (hi[1], lo[2]))])
+    return transform_coords(
+        transforms_to_mat44s(rep_module.transforms)[:, None], box)
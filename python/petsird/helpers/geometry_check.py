@@ -0,0 +1,435 @@
+"""
+Preliminary helpers to check the consistency of a ScannerGeometry
+
+The checks find
+- transformations that are not rigid (the rotation part is not orthonormal, or is a
+  reflection)
+- duplicated transformations of modules or elements
+- degenerate or non-convex detecting boxes (e.g. wrongly ordered corners)
+- overlapping detecting elements (of all module types).
+All detecting boxes are computed in bulk. Overlap candidates are pairs of boxes that
+share a cell of a `petsird.helpers.spatial_index.VolumeIndex`, which are then
+tested exactly with the separating axis theorem (vectorized over the candidates).
+
+Usage:
+    python -m petsird.helpers.geometry_check -i test.petsird
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import sys
+import typing
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.geometry import (BOX_SHAPE_FACES, get_module_box_corners,
+                                      transform_coords, transforms_to_mat44s)
+from petsird.helpers.spatial_index import VolumeIndex, get_box_planes
+from petsird.helpers.validate import ValidationReport
+
+# Corner indices of the 12 edges of a BoxShape (see BOX_SHAPE_FACES)
+BOX_SHAPE_EDGES = tuple(
+    sorted({
+        tuple(sorted((face[k], face[(k + 1) % 4])))
+        for face in BOX_SHAPE_FACES
+        for k in range(4)
+    }))
+
+
+def get_transform_groups(
+    scanner: petsird.ScannerInformation
+) -> list[tuple[str, npt.NDArray[numpy.float32]]]:
+    """List all lists of transformations in the geometry with their name
+
+    Every list is returned as an array of shape (N, 4, 4).
+    """
+    groups = []
+    for mtype, rep_module in enumerate(
+            scanner.scanner_geometry.replicated_modules):
+        prefix = f"replicated_modules[{mtype}]"
+        module = rep_module.object
+        groups.append((f"{prefix}.transforms",
+                       transforms_to_mat44s(rep_module.transforms)))
+        groups.append(
+            (f"{prefix}.object.detecting_elements.transforms",
+             transforms_to_mat44s(module.detecting_elements.transforms)))
+        for k, rep_volume in enumerate(module.non_detecting_elements):
+            groups.append(
+                (f"{prefix}.object.non_detecting_elements[{k}].transforms",
+                 transforms_to_mat44s(rep_volume.transforms)))
+    return groups
+
+
+def get_non_rigid(mats: npt.NDArray[numpy.float32],
+                  tolerance: float = 1e-4) -> npt.NDArray[numpy.bool_]:
+    """Find the 4x4 transformations that are not a rotation plus translation
+
+    `mats` has shape (N, 4, 4). A transformation is rigid if its 3x3 part is
+    orthonormal (within `tolerance`) and has a positive determinant.
+    """
+    rotations = numpy.asarray(mats, dtype=numpy.float64)[:, 0:3, 0:3]
+    gram = numpy.matmul(rotations.transpose(0, 2, 1), rotations)
+    errors = numpy.abs(gram - numpy.eye(3)).max(axis=(1, 2), initial=0)
+    return (errors > tolerance) | (numpy.linalg.det(rotations) <= 0)
+
+
+def get_duplicates(
+    mats: npt.NDArray[numpy.float32],
+    tolerance: float = 1e-3,
+    rotation_tolerance: float = 1e-4
+) -> tuple[npt.NDArray[numpy.intp], npt.NDArray[numpy.intp]]:
+    """Find (nearly) identical 4x4 transformations
+
+    Translations are compared after rounding to `tolerance` (in mm) and rotations
+    after rounding to `rotation_tolerance`. Returns arrays of indices of the
+    duplicates and of an earlier transformation they duplicate.
+    """
+    mats = numpy.asarray(mats, dtype=numpy.float64)
+    keys = numpy.concatenate(
+        (numpy.round(mats[:, 0:3, 0:3].reshape(-1, 9) / rotation_tolerance),
+         numpy.round(mats[:, 0:3, 3] / tolerance)),
+        axis=1)
+    order = numpy.lexsort(keys.T[::-1])
+    same = numpy.all(keys[order[1:]] == keys[order[:-1]], axis=1)
+    # compare with the first transformation of every run of identical keys
+    run_starts = numpy.maximum.accumulate(
+        numpy.where(numpy.append(False, same), 0, numpy.arange(len(order))))
+    duplicates = numpy.flatnonzero(numpy.append(False, same))
+    first = numpy.minimum(order[duplicates], order[run_starts[duplicates]])
+    second = numpy.maximum(order[duplicates], order[run_starts[duplicates]])
+    return second, first
+
+
+def get_degenerate_boxes(corners: npt.NDArray[numpy.float32],
+                         tolerance: float = 1e-3) -> npt.NDArray[numpy.bool_]:
+    """Find boxes that are thinner than `tolerance` (in mm) or not convex
+
+    `corners` has shape (N, 8, 3). Boxes with non-planar faces, or with corners that
+    are not ordered as in BOX_SHAPE_FACES, are not convex.
+    """
+    corners = numpy.asarray(corners, dtype=numpy.float64)
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        normals, offsets = get_box_planes(corners)
+    distances = numpy.einsum("nfi,nci->nfc", normals, corners)
+    centres = corners.mean(axis=1)
+    thickness = offsets - numpy.einsum("nfi,ni->nf", normals, centres)
+    with numpy.errstate(invalid="ignore"):
+        return (~numpy.all(numpy.isfinite(normals), axis=(1, 2))
+                | numpy.any(distances > offsets[:, :, None] + tolerance,
+                            axis=(1, 2))
+                | numpy.any(thickness < tolerance / 2, axis=1))
+
+
+def _get_edge_directions(corners: npt.NDArray[numpy.float64],
+                         tolerance: float = 1e-6) -> list[int]:
+    """Find the indices of the non-parallel edges of a box (given its corners)"""
+    edges = numpy.array([corners[j] - corners[i] for i, j in BOX_SHAPE_EDGES])
+    edges /= numpy.linalg.norm(edges, axis=1, keepdims=True)
+    kept: list[int] = []
+    for k, edge in enumerate(edges):
+        if all(
+                numpy.linalg.norm(numpy.cross(edge, edges[m])) > tolerance
+                for m in kept):
+            kept.append(k)
+    return kept
+
+
+def _get_edges(corners: npt.NDArray[numpy.float64],
+               edges: npt.NDArray[numpy.intp]) -> npt.NDArray[numpy.float64]:
+    """Find edge vectors given corners (P, 8, 3) and edge indices (P, E)"""
+    ends = numpy.array(BOX_SHAPE_EDGES)[edges]  # (P, E, 2)
+    return (numpy.take_along_axis(corners, ends[:, :, 1, None], axis=1) -
+            numpy.take_along_axis(corners, ends[:, :, 0, None], axis=1))
+
+
+def _is_outside(normals: npt.NDArray[numpy.float64],
+                offsets: npt.NDArray[numpy.float64],
+                corners: npt.NDArray[numpy.float64],
+                tolerance: float) -> npt.NDArray[numpy.bool_]:
+    """Test if boxes (P, 8, 3) are outside a face plane of other boxes (pairwise)"""
+    distances = numpy.einsum("pfi,pci->pfc", normals, corners).min(axis=2)
+    return numpy.any(distances >= offsets - tolerance, axis=1)
+
+
+def _are_separated(corners0: npt.NDArray[numpy.float64],
+                   corners1: npt.NDArray[numpy.float64],
+                   axes: npt.NDArray[numpy.float64],
+                   tolerance: float) -> npt.NDArray[numpy.bool_]:
+    """Test if pairs of boxes are separated along any of the (pairwise) axes
+
+    `corners0` and `corners1` have shape (P, 8, 3) and `axes` (P, A, 3).
+    """
+    proj0 = numpy.einsum("pai,pci->pac", axes, corners0)
+    proj1 = numpy.einsum("pai,pci->pac", axes, corners1)
+    return numpy.any((proj0.max(axis=2) <= proj1.min(axis=2) + tolerance)
+                     | (proj1.max(axis=2) <= proj0.min(axis=2) + tolerance),
+                     axis=1)
+
+
+def get_overlapping_boxes(
+    corners: npt.NDArray[numpy.float32],
+    edges: typing.Optional[npt.NDArray[numpy.intp]] = None,
+    tolerance: float = 1e-3,
+    cell_size: typing.Optional[float] = None,
+    groups: typing.Optional[npt.NDArray[numpy.int64]] = None,
+    chunk_size: int = 1 << 18
+) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64]]:
+    """Find all pairs of (convex) boxes that overlap by more than `tolerance` (in mm)
+
+    `corners` has shape (N, 8, 3). Boxes sharing a face do not overlap. `edges`
+    (shape (N, E)) gives the indices (into BOX_SHAPE_EDGES) of the non-parallel
+    edges of every box, which are all 12 edges if omitted. Boxes with the same
+    `groups` value (e.g. in the same module) are not tested. Returns arrays
+    `first < second` of box indices. Candidates are processed in chunks of
+    `chunk_size` pairs to limit memory usage.
+    """
+    corners = numpy.asarray(corners, dtype=numpy.float64).reshape(-1, 8, 3)
+    if len(corners) < 2:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return empty, empty
+    if edges is None:
+        edges = numpy.broadcast_to(numpy.arange(len(BOX_SHAPE_EDGES)),
+                                   (len(corners), len(BOX_SHAPE_EDGES)))
+    first, second = VolumeIndex(corners,
+                                cell_size=cell_size).get_overlap_candidates()
+    # bounding boxes overlap
+    lo = corners.min(axis=1)
+    hi = corners.max(axis=1)
+    keep = numpy.all((hi[first] > lo[second] + tolerance)
+                     & (hi[second] > lo[first] + tolerance),
+                     axis=1)
+    if groups is not None:
+        keep &= groups[first] != groups[second]
+    first = first[keep]
+    second = second[keep]
+
+    normals, offsets = get_box_planes(corners)
+    overlap = numpy.zeros(len(first), dtype=bool)
+    for start in range(0, len(first), chunk_size):
+        ids0 = first[start:start + chunk_size]
+        ids1 = second[start:start + chunk_size]
+        corners0 = corners[ids0]
+        corners1 = corners[ids1]
+        # face planes separate most (e.g. adjacent) boxes
+        candidates = numpy.flatnonzero(~(
+            _is_outside(normals[ids0], offsets[ids0], corners1, tolerance)
+            | _is_outside(normals[ids1], offsets[ids1], corners0, tolerance)))
+        if len(candidates) == 0:
+            continue
+        corners0 = corners0[candidates]
+        corners1 = corners1[candidates]
+        # cross products of the edges of both boxes
+        edges0 = _get_edges(corners0, edges[ids0[candidates]])
+        edges1 = _get_edges(corners1, edges[ids1[candidates]])
+        axes = numpy.cross(edges0[:, :, None],
+                           edges1[:, None, :]).reshape(len(candidates), -1, 3)
+        norms = numpy.linalg.norm(axes, axis=2, keepdims=True)
+        # parallel edges do not give an axis, NaN never separates
+        axes = numpy.divide(axes,
+                            norms,
+                            out=numpy.full_like(axes, numpy.nan),
+                            where=norms > 1e-9)
+        overlap[start + candidates] = ~_are_separated(corners0, corners1, axes,
+                                                      tolerance)
+    return first[overlap], second[overlap]
+
+
+def _get_element_corners(
+        scanner: petsird.ScannerInformation, type_of_module: int,
+        modules: npt.NDArray[numpy.int64]) -> npt.NDArray[numpy.float64]:
+    """Find the corners of all detecting boxes in some modules of a module-type
+
+    The result has shape (len(modules) * num_elements_per_module, 8, 3).
+    """
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    det_els = rep_module.object.detecting_elements
+    corners = numpy.array([c.c for c in det_els.object.shape.corners],
+                          dtype=numpy.float64)
+    mats = numpy.matmul(
+        transforms_to_mat44s(rep_module.transforms)[modules][:, None],
+        transforms_to_mat44s(det_els.transforms)[None, :])
+    return transform_coords(mats[:, :, None], corners).reshape(-1, 8, 3)
+
+
+def get_overlapping_elements(
+    scanner: petsird.ScannerInformation,
+    tolerance: float = 1e-3,
+    cell_size: typing.Optional[float] = None
+) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64]]:
+    """Find all pairs of detecting elements that overlap by more than `tolerance`
+
+    Elements are numbered over all modules of all module types, as in
+    `DetectingElementIndex`. Elements of the same module are tested once for every
+    module-type (in module coordinates). Elements of different modules are only
+    tested if the boxes around the modules (see `get_module_box_corners`) overlap.
+    Returns sorted arrays `first < second` of element numbers.
+    """
+    rep_modules = scanner.scanner_geometry.replicated_modules
+    num_elements = [
+        len(m.object.detecting_elements.transforms) for m in rep_modules
+    ]
+    num_modules = [len(m.transforms) for m in rep_modules]
+    starts = numpy.cumsum(
+        [0] + [n_mod * n_el for n_mod, n_el in zip(num_modules, num_elements)])
+    edges = []
+    firsts = []
+    seconds = []
+    for mtype, rep_module in enumerate(rep_modules):
+        det_els = rep_module.object.detecting_elements
+        corners = numpy.array([c.c for c in det_els.object.shape.corners],
+                              dtype=numpy.float64)
+        edges.append(_get_edge_directions(corners))
+        # the same overlaps occur in every module
+        corners = transform_coords(
+            transforms_to_mat44s(det_els.transforms)[:, None], corners)
+        first, second = get_overlapping_boxes(
+            corners,
+            numpy.broadcast_to(edges[mtype],
+                               (len(corners), len(edges[mtype]))), tolerance,
+            cell_size)
+        offsets = starts[mtype] + num_elements[mtype] * numpy.arange(
+            num_modules[mtype])
+        firsts.append((offsets[:, None] + first).ravel())
+        seconds.append((offsets[:, None] + second).ravel())
+
+    # modules with overlapping boxes, numbered over all module types
+    types = [m for m in range(len(rep_modules)) if num_elements[m] > 0]
+    first, second = get_overlapping_boxes(
+        numpy.concatenate([get_module_box_corners(scanner, m)
+                           for m in types] + [numpy.zeros((0, 8, 3))]),
+        tolerance=tolerance)
+    module_starts = numpy.cumsum([0] + [num_modules[m] for m in types])
+    involved = numpy.zeros(module_starts[-1], dtype=bool)
+    involved[first] = True
+    involved[second] = True
+    corners = []
+    element_ids = []
+    element_modules = []
+    element_edges = []
+    width = max((len(e) for e in edges), default=0)
+    for k, mtype in enumerate(types):
+        modules = numpy.flatnonzero(
+            involved[module_starts[k]:module_starts[k + 1]])
+        corners.append(_get_element_corners(scanner, mtype, modules))
+        element_ids.append(
+            (starts[mtype] + num_elements[mtype] * modules[:, None] +
+             numpy.arange(num_elements[mtype])).ravel())
+        element_modules.append(
+            numpy.repeat(module_starts[k] + modules, num_elements[mtype]))
+        # pad the edge directions of all types to the same number
+        padded = edges[mtype] + edges[mtype][:1] * (width - len(edges[mtype]))
+        element_edges.append(
+            numpy.broadcast_to(padded, (len(corners[-1]), width)))
+    if corners:
+        # overlaps within a module were found already
+        first, second = get_overlapping_boxes(
+            numpy.concatenate(corners),
+            numpy.concatenate(element_edges),
+            tolerance,
+            cell_size,
+            groups=numpy.concatenate(element_modules))
+        # elements are numbered in increasing order, such that first < second
+        element_ids = numpy.concatenate(element_ids)
+        firsts.append(element_ids[first])
+        seconds.append(element_ids[second])
+
+    keys = (numpy.concatenate(firsts + [numpy.zeros(0, dtype=numpy.int64)]) *
+            starts[-1] +
+            numpy.concatenate(seconds + [numpy.zeros(0, dtype=numpy.int64)]))
+    keys.sort()
+    return keys // starts[-1], keys % starts[-1]
+
+
+def _describe_element(scanner: petsird.ScannerInformation,
+                      element: int) -> str:
+    rep_modules = scanner.scanner_geometry.replicated_modules
+    for mtype, rep_module in enumerate(rep_modules):
+        num_elements = len(rep_module.object.detecting_elements.transforms)
+        size = len(rep_module.transforms) * num_elements
+        if element < size:
+            module, element = divmod(element, num_elements)
+            return f"type {mtype} module {module} element {element}"
+        element -= size
+    raise ValueError("element number out of range")
+
+
+def check_geometry(
+        scanner: petsird.ScannerInformation,
+        tolerance: float = 1e-3,
+        rotation_tolerance: float = 1e-4,
+        cell_size: typing.Optional[float] = None) -> ValidationReport:
+    """Check transformations and detecting elements of the scanner geometry
+
+    `tolerance` (in mm) is used for translations, thickness of boxes and overlaps,
+    `rotation_tolerance` for rotation matrices. See `VolumeIndex` for `cell_size`.
+    """
+    report = ValidationReport()
+    for name, mats in get_transform_groups(scanner):
+        wrong = numpy.flatnonzero(get_non_rigid(mats, rotation_tolerance))
+        if len(wrong) > 0:
+            report.add("transform_not_rigid", len(wrong), None,
+                       f"{name}[{wrong[0]}]")
+        duplicates, originals = get_duplicates(mats, tolerance,
+                                               rotation_tolerance)
+        if len(duplicates) > 0:
+            report.add("duplicate_transform", len(duplicates), None,
+                       f"{name}[{duplicates[0]}] and [{originals[0]}]")
+
+    for mtype, rep_module in enumerate(
+            scanner.scanner_geometry.replicated_modules):
+        box_shape = rep_module.object.detecting_elements.object.shape
+        corners = numpy.array([c.c for c in box_shape.corners])
+        if get_degenerate_boxes(corners[None], tolerance)[0]:
+            report.add(
+                "degenerate_shape", 1, None,
+                f"replicated_modules[{mtype}].object.detecting_elements")
+    # overlaps are only meaningful for convex boxes
+    if "degenerate_shape" in report.violations:
+        return report
+
+    first, second = get_overlapping_elements(scanner, tolerance, cell_size)
+    if len(first) > 0:
+        report.add(
+            "overlap", len(first), None,
+            f"{_describe_element(scanner, first[0])} and"
+            f" {_describe_element(scanner, second[0])}")
+    return report
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_geometry_check',
+        description='Check the scanner geometry of a PETSIRD file')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted",
+    )
+    parser.add_argument("--tolerance",
+                        type=float,
+                        default=1e-3,
+                        help="Tolerance for distances (in mm)")
+    parser.add_argument("--rotation-tolerance",
+                        type=float,
+                        default=1e-4,
+                        help="Tolerance for rotation matrices")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    file = sys.stdin.buffer if args.input is None else args.input
+    with petsird.BinaryPETSIRDReader(file,
+                                     skip_completed_check=True) as reader:
+        header = reader.read_header()
+    report = check_geometry(header.scanner, args.tolerance,
+                            args.rotation_tolerance)
+    print(report.format(summary=False))
+    sys.exit(0 if report.is_valid else 1)
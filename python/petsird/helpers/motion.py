@@ -0,0 +1,205 @@
+"""
+Preliminary helpers for bed and gantry motion in PETSIRD data
+
+`BedMovementTimeBlock`s and `GantryMovementTimeBlock`s define rigid transformations
+that are constant from the start of their time block until the next one of the
+same kind. Coordinates in the `ScannerGeometry` of a module-type are mapped to
+patient coordinates as
+    inverse(bed) * gantry_alignment * gantry[type_of_module] * coordinate
+where the bed transformation is interpreted as the movement of the bed (and
+therefore the patient) from the reference position, in reference coordinates.
+Before the first movement time block, the identity transformation is used.
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import typing
+from collections.abc import Iterable, Iterator
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import CoincidenceArrays, get_coincidence_arrays
+from petsird.helpers.geometry import (get_detecting_element_centres,
+                                      transform_coords, transform_to_mat44)
+
+_IDENTITY_MAT44 = numpy.eye(4, dtype=numpy.float32)
+
+
+class TransformTable:
+    """Piecewise constant rigid transformations as a function of time (in ms)"""
+
+    def __init__(self):
+        self._start_times = [0]
+        self._mat44s = [_IDENTITY_MAT44]
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return len(self._start_times)
+
+    def append(self, start_time: int, mat44: npt.NDArray[numpy.float32]):
+        """Add a transformation that is valid from start_time onwards"""
+        if start_time < self._start_times[-1]:
+            raise ValueError("Movement time blocks have to be ordered in time")
+        self._start_times.append(start_time)
+        self._mat44s.append(mat44)
+        self._arrays = None
+
+    @property
+    def start_times(self) -> npt.NDArray[numpy.int64]:
+        return self._get_arrays()[0]
+
+    @property
+    def mat44s(self) -> npt.NDArray[numpy.float32]:
+        """all transformations as an array of shape (len(self), 4, 4)"""
+        return self._get_arrays()[1]
+
+    def _get_arrays(self):
+        if self._arrays is None:
+            self._arrays = (numpy.array(self._start_times, dtype=numpy.int64),
+                            numpy.stack(self._mat44s))
+        return self._arrays
+
+    def get_indices(self, times: npt.ArrayLike) -> npt.NDArray[numpy.intp]:
+        """Find the index of the transformation valid at every time"""
+        return numpy.searchsorted(self.start_times, times, side="right") - 1
+
+    def get_mat44s(self, times: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+        """Find the transformations valid at the given times (stacked)"""
+        return self.mat44s[self.get_indices(times)]
+
+
+class MotionTables:
+    """Bed and gantry positions over time for a scanner"""
+
+    def __init__(self, scanner: petsird.ScannerInformation):
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        self.bed = TransformTable()
+        self.gantry = [TransformTable() for _ in range(num_module_types)]
+        self.gantry_alignment = (_IDENTITY_MAT44
+                                 if scanner.gantry_alignment is None else
+                                 transform_to_mat44(scanner.gantry_alignment))
+
+    def update(self, time_block: petsird.TimeBlock) -> bool:
+        """Add the movement in a time block. Returns False for other time blocks."""
+        if isinstance(time_block, petsird.TimeBlock.BedMovementTimeBlock):
+            self.bed.append(time_block.value.time_interval.start,
+                            transform_to_mat44(time_block.value.transform))
+            return True
+        if isinstance(time_block, petsird.TimeBlock.GantryMovementTimeBlock):
+            start = time_block.value.time_interval.start
+            for table, transform in zip(self.gantry,
+                                        time_block.value.transforms):
+                table.append(start, transform_to_mat44(transform))
+            return True
+        return False
+
+    def get_geometry_to_patient_mat44s(
+            self, type_of_module: petsird.TypeOfModule,
+            times: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+        """Find the transformations from scanner geometry to patient coordinates
+
+        Returns an array of shape (len(times), 4, 4).
+        """
+        times = numpy.atleast_1d(times)
+        bed = self.bed.get_mat44s(times)
+        gantry = self.gantry[type_of_module].get_mat44s(times)
+        return numpy.matmul(numpy.linalg.inv(bed),
+                            numpy.matmul(self.gantry_alignment, gantry))
+
+
+def read_motion_tables(
+        scanner: petsird.ScannerInformation,
+        time_blocks: Iterable[petsird.TimeBlock]) -> MotionTables:
+    """Build the bed and gantry position tables from (all) time blocks"""
+    tables = MotionTables(scanner)
+    for time_block in time_blocks:
+        tables.update(time_block)
+    return tables
+
+
+class LOREndpointMapper:
+    """Map coincidences to LOR endpoints in patient coordinates
+
+    Endpoints are the centres of the detecting elements, see
+    `get_detecting_element_centres`.
+    """
+
+    def __init__(self, scanner: petsird.ScannerInformation,
+                 motion_tables: MotionTables):
+        self.motion_tables = motion_tables
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        self._centres = [
+            get_detecting_element_centres(scanner, mtype).reshape(-1, 3)
+            for mtype in range(num_module_types)
+        ]
+        self._num_energy_bins = [
+            scanner.event_energy_bin_edges[mtype].number_of_bins()
+            for mtype in range(num_module_types)
+        ]
+
+    def get_endpoints(self, type_of_module: petsird.TypeOfModule,
+                      detection_bins: npt.ArrayLike,
+                      times: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+        """Map detection bins at given times (in ms) to patient coordinates
+
+        Returns an array of shape (len(detection_bins), 3).
+        """
+        detection_bins = numpy.asarray(detection_bins)
+        times = numpy.broadcast_to(times, detection_bins.shape)
+        # find the transformations only once for every distinct time
+        unique_times, inverse = numpy.unique(times, return_inverse=True)
+        mats = self.motion_tables.get_geometry_to_patient_mat44s(
+            type_of_module, unique_times)
+        coords = self._centres[type_of_module][
+            detection_bins // self._num_energy_bins[type_of_module]]
+        return transform_coords(mats[inverse.reshape(-1)], coords)
+
+    def get_lor_endpoints(self, type_of_module_pair: tuple[int, int],
+                          arrays: CoincidenceArrays,
+                          times: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+        """Map coincidences at given times to LOR endpoints
+
+        Returns an array of shape (len(arrays), 2, 3).
+        """
+        endpoints0 = self.get_endpoints(type_of_module_pair[0],
+                                        arrays.det_bin0, times)
+        endpoints1 = self.get_endpoints(type_of_module_pair[1],
+                                        arrays.det_bin1, times)
+        return numpy.stack((endpoints0, endpoints1), axis=1)
+
+
+def iter_lor_endpoints(
+    scanner: petsird.ScannerInformation,
+    time_blocks: Iterable[petsird.TimeBlock],
+    kind: str = "prompts",
+    motion_tables: typing.Optional[MotionTables] = None
+) -> Iterator[tuple[petsird.EventTimeBlock, dict[tuple[int, int],
+                                                 npt.NDArray[numpy.float32]]]]:
+    """Yield LOR endpoints (in patient coordinates) for every event time block
+
+    For each `EventTimeBlock`, yields the block and a dictionary (indexed by
+    module-type pair) with arrays of shape (num_events, 2, 3).
+    If `motion_tables` is not given, they are built on the fly from the movement
+    time blocks in the stream. The time of an event is taken as the start of its
+    time block.
+    """
+    update = motion_tables is None
+    if update:
+        motion_tables = MotionTables(scanner)
+    mapper = LOREndpointMapper(scanner, motion_tables)
+    for time_block in time_blocks:
+        if update and motion_tables.update(time_block):
+            continue
+        if not isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            continue
+        event_time_block = time_block.value
+        time = event_time_block.time_interval.start
+        yield event_time_block, {
+            pair: mapper.get_lor_endpoints(pair, arrays, time)
+            for pair, arrays in get_coincidence_arrays(
+                scanner, event_time_block, kind).items()
+        }
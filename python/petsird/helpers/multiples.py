@@ -0,0 +1,187 @@
+"""
+Preliminary helpers for converting triples and quadruples to coincidences
+
+Multiples are converted to pairs of detections following the `CoincidencePolicy`
+semantics:
+- `MULTIPLES_AS_ALL_COINCIDENCES`: all pairs, i.e. 3 for a triple and 6 for a
+  quadruple
+- `MULTIPLES_AS_SEQUENTIAL_COINCIDENCES`: pairs of consecutive detections in
+  order of arrival (first and second, second and third, ...)
+Detections of every coincidence are swapped if necessary, such that its
+module-type pair is non-increasing and `are_detections_ordered` is satisfied.
+
+The TOF indices of a multiple give the arrival time differences of the later
+stored detections w.r.t. the first. Arrival times are estimated from the TOF bin
+centres. The TOF of a coincidence is the arrival time of its first detection
+minus that of its second (as in `petsird.helpers.encoder` and
+`petsird.helpers.sorter`), binned with the TOF bin edges of its module-type pair.
+Coincidences with a TOF outside these edges are discarded.
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import itertools
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import (CoincidenceArrays, MultipleArrays,
+                                      get_multiple_arrays)
+
+
+def get_detection_pairs(
+        num_detections: int,
+        policy: petsird.CoincidencePolicy) -> list[tuple[int, int]]:
+    """Return the positions (in order of arrival) of the detections forming the
+    coincidences of a multiple"""
+    if policy == petsird.CoincidencePolicy.MULTIPLES_AS_ALL_COINCIDENCES:
+        return list(itertools.combinations(range(num_detections), 2))
+    if policy == petsird.CoincidencePolicy.MULTIPLES_AS_SEQUENTIAL_COINCIDENCES:
+        return [(i, i + 1) for i in range(num_detections - 1)]
+    raise ValueError(f"Cannot convert multiples to coincidences for {policy}")
+
+
+def _get_tof_bin_edges(scanner: petsird.ScannerInformation,
+                       pair: tuple[int, int]) -> npt.NDArray[numpy.float32]:
+    return numpy.asarray(scanner.tof_bin_edges[pair[0]][pair[1]].edges)
+
+
+def _get_tof_bin_centres(scanner: petsird.ScannerInformation,
+                         pair: tuple[int, int]) -> npt.NDArray[numpy.float32]:
+    edges = _get_tof_bin_edges(scanner, pair)
+    return (edges[1:] + edges[:-1]) / 2
+
+
+def _get_tof_indices(edges: npt.NDArray[numpy.float32],
+                     differences: npt.NDArray) -> npt.NDArray[numpy.int64]:
+    """Bin TOF differences, returning -1 outside the TOF bin edges"""
+    indices = numpy.searchsorted(edges, differences, side="right") - 1
+    indices[indices >= len(edges) - 1] = -1
+    return indices
+
+
+def multiples_to_coincidences(
+    scanner: petsird.ScannerInformation,
+    types_of_modules: tuple[int, ...],
+    arrays: MultipleArrays,
+    policy: petsird.CoincidencePolicy = petsird.CoincidencePolicy.
+    MULTIPLES_AS_ALL_COINCIDENCES
+) -> dict[tuple[int, int], CoincidenceArrays]:
+    """Convert triples or quadruples of given module-types to coincidences
+
+    Returns a dictionary indexed by module-type pair (only for pairs that can
+    occur). Coincidences stemming from the same multiple are consecutive. The
+    `block` column is propagated.
+    """
+    num_detections = arrays.num_detections
+    det_bins = arrays.det_bins.astype(numpy.int64)
+    types = numpy.asarray(types_of_modules, dtype=numpy.int64)
+    # arrival times w.r.t. the first detection, from the bin centres
+    times = numpy.zeros(det_bins.shape, dtype=numpy.float32)
+    for k in range(1, num_detections):
+        centres = _get_tof_bin_centres(
+            scanner, (types_of_modules[0], types_of_modules[k]))
+        times[:, k] = centres[arrays.tof_indices[:, k - 1]]
+    # stored detections in order of arrival
+    arrival_order = numpy.argsort(times, axis=1, kind="stable")
+    rows = numpy.arange(len(arrays))
+
+    detection_pairs = get_detection_pairs(num_detections, policy)
+    pairs = sorted(
+        {(max(t0, t1), min(t0, t1))
+         for t0, t1 in itertools.combinations(types_of_modules, 2)},
+        reverse=True)
+    # per module-type pair: multiple, position in detection_pairs and columns
+    columns = {
+        pair: {
+            "multiple": [],
+            "position": [],
+            "det_bin0": [],
+            "det_bin1": [],
+            "tof_idx": []
+        }
+        for pair in pairs
+    }
+    for position, (i, j) in enumerate(detection_pairs):
+        first = arrival_order[:, i]
+        second = arrival_order[:, j]
+        types0 = types[first]
+        types1 = types[second]
+        det_bins0 = det_bins[rows, first]
+        det_bins1 = det_bins[rows, second]
+        differences = times[rows, first] - times[rows, second]
+        # enforce ordering, see are_detections_ordered
+        swap = (types0 < types1) | ((types0 == types1) &
+                                    (det_bins0 < det_bins1))
+        types0, types1 = (numpy.where(swap, types1, types0),
+                          numpy.where(swap, types0, types1))
+        det_bins0, det_bins1 = (numpy.where(swap, det_bins1, det_bins0),
+                                numpy.where(swap, det_bins0, det_bins1))
+        differences = numpy.where(swap, -differences, differences)
+        for pair in pairs:
+            selection = numpy.flatnonzero((types0 == pair[0])
+                                          & (types1 == pair[1]))
+            tof_idx = _get_tof_indices(_get_tof_bin_edges(scanner, pair),
+                                       differences[selection])
+            selection = selection[tof_idx >= 0]
+            pair_columns = columns[pair]
+            pair_columns["multiple"].append(selection)
+            pair_columns["position"].append(
+                numpy.full(len(selection), position, dtype=numpy.int64))
+            pair_columns["det_bin0"].append(det_bins0[selection])
+            pair_columns["det_bin1"].append(det_bins1[selection])
+            pair_columns["tof_idx"].append(tof_idx[tof_idx >= 0])
+
+    result = {}
+    for pair, pair_columns in columns.items():
+        concatenated = {
+            name: numpy.concatenate(values)
+            for name, values in pair_columns.items()
+        }
+        multiple = concatenated.pop("multiple")
+        # such that coincidences of one multiple are consecutive
+        order = numpy.argsort(multiple * len(detection_pairs) +
+                              concatenated.pop("position"),
+                              kind="stable")
+        result[pair] = CoincidenceArrays(**{
+            name:
+            values[order].astype(numpy.uint32)
+            for name, values in concatenated.items()
+        },
+                                         block=None if arrays.block is None
+                                         else arrays.block[multiple[order]])
+    return result
+
+
+def get_coincidences_from_multiples(
+    scanner: petsird.ScannerInformation,
+    event_time_block: petsird.EventTimeBlock,
+    policy: petsird.CoincidencePolicy = petsird.CoincidencePolicy.
+    MULTIPLES_AS_ALL_COINCIDENCES
+) -> dict[tuple[int, int], CoincidenceArrays]:
+    """Convert all triples and quadruples in a time block to coincidences
+
+    Returns a dictionary indexed by module-type pair (only for pairs with
+    coincidences).
+    """
+    result = {}
+    for kind in ("triples", "quadruples"):
+        multiples = get_multiple_arrays(scanner, event_time_block, kind)
+        for types_of_modules, arrays in multiples.items():
+            if len(arrays) == 0:
+                continue
+            coincidences = multiples_to_coincidences(scanner, types_of_modules,
+                                                     arrays, policy)
+            for pair, pair_arrays in coincidences.items():
+                result.setdefault(pair, []).append(pair_arrays)
+    return {
+        pair:
+        CoincidenceArrays(
+            det_bin0=numpy.concatenate([a.det_bin0 for a in arrays_list]),
+            det_bin1=numpy.concatenate([a.det_bin1 for a in arrays_list]),
+            tof_idx=numpy.concatenate([a.tof_idx for a in arrays_list]))
+        for pair, arrays_list in result.items()
+    }
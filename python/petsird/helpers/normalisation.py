@@ -0,0 +1,307 @@
+"""
+Preliminary helpers for estimating detection efficiencies ("normalisation")
+
+The component-based model in `DetectionEfficiencies` is fitted to an acquisition
+of a uniform source, using
+- fan sums: the number of coincidences of every detection bin (with any bin in a
+  module that is in coincidence)
+- SGID counts: the number of coincidences for every pair of detection bins in a
+  module pair, summed over all module pairs with the same SGID
+The fit alternates between (fan-sum style) multiplicative updates of the
+`detection_bin_efficiencies` and the `ModulePairEfficiencies` of every SGID.
+Geometric effects of the source (e.g. solid angle and attenuation) are therefore
+absorbed in the module pair efficiencies. Delayed coincidences (if present) are
+subtracted.
+
+The model cannot distinguish factors that are common to a detection bin in all
+modules of a type (e.g. due to the position of the detecting element in the module)
+from the module pair efficiencies. Therefore, detection bin efficiencies are
+normalised to have mean 1 over all modules for every bin in the module,
+and module pair efficiencies to have mean 1 over all bin pairs with counts. The
+`calibration_factor` is not estimated.
+
+SGID counts and module pair efficiencies can be stored in memory-mapped `.npy`
+files, such that the memory needed is bounded by the size of a few SGIDs
+and the detection bin efficiencies.
+
+Usage:
+    python -m petsird.helpers.normalisation -i uniform.petsird -o norm.petsird
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import os
+import sys
+import typing
+from collections.abc import Iterable
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import get_module_pair_sgid_lut_as_array
+from petsird.helpers.columnar import (CoincidenceArrays,
+                                      get_coincidence_arrays,
+                                      get_module_type_pairs)
+
+
+def _allocate(shape: tuple[int, ...], directory: typing.Optional[str],
+              filename: str) -> npt.NDArray[numpy.float64]:
+    """Return an array filled with zeros, memory-mapped if `directory` is given"""
+    if directory is None:
+        return numpy.zeros(shape, dtype=numpy.float64)
+    return numpy.lib.format.open_memmap(os.path.join(directory, filename),
+                                        mode="w+",
+                                        dtype=numpy.float64,
+                                        shape=shape)
+
+
+class NormalisationCounts:
+    """Fan sums and SGID counts of an acquisition
+
+    The header needs to have an SGID LUT (`module_pair_sgidlut`).
+    """
+
+    def __init__(self,
+                 scanner: petsird.ScannerInformation,
+                 directory: typing.Optional[str] = None):
+        if not scanner.detection_efficiencies.module_pair_sgidlut:
+            raise ValueError(
+                "Estimating detection efficiencies needs an SGID LUT")
+        geometry = scanner.scanner_geometry
+        num_module_types = geometry.number_of_module_types()
+        self.directory = directory
+        self.num_modules = [
+            len(m.transforms) for m in geometry.replicated_modules
+        ]
+        self.num_bins_in_module = [
+            len(m.object.detecting_elements.transforms) *
+            scanner.event_energy_bin_edges[mtype].number_of_bins()
+            for mtype, m in enumerate(geometry.replicated_modules)
+        ]
+        self.fan_sums = [
+            numpy.zeros(
+                (num_modules, num_bins)) for num_modules, num_bins in zip(
+                    self.num_modules, self.num_bins_in_module)
+        ]
+        self.sgid_luts = {}
+        self.sgid_counts = {}
+        for pair in get_module_type_pairs(num_module_types):
+            lut = get_module_pair_sgid_lut_as_array(scanner, pair)
+            self.sgid_luts[pair] = lut
+            self.sgid_counts[pair] = _allocate(
+                (int(lut.max(initial=-1)) + 1,
+                 self.num_bins_in_module[pair[0]],
+                 self.num_bins_in_module[pair[1]]), directory,
+                f"sgid_counts_{pair[0]}_{pair[1]}.npy")
+
+    def add(self,
+            type_of_module_pair: tuple[int, int],
+            arrays: CoincidenceArrays,
+            weight: float = 1.) -> None:
+        """Add coincidences (with a weight, e.g. -1 for delayeds)"""
+        mtype0, mtype1 = type_of_module_pair
+        mod0, bin0 = numpy.divmod(arrays.det_bin0.astype(numpy.int64),
+                                  self.num_bins_in_module[mtype0])
+        mod1, bin1 = numpy.divmod(arrays.det_bin1.astype(numpy.int64),
+                                  self.num_bins_in_module[mtype1])
+        sgids = self.sgid_luts[type_of_module_pair][mod0, mod1]
+        in_coincidence = sgids >= 0
+        sgid_counts = self.sgid_counts[type_of_module_pair]
+        indices = numpy.ravel_multi_index(
+            (sgids[in_coincidence], bin0[in_coincidence],
+             bin1[in_coincidence]), sgid_counts.shape)
+        # only touch the entries with counts (as the array can be memory-mapped)
+        indices, num_counts = numpy.unique(indices, return_counts=True)
+        sgid_counts.reshape(-1)[indices] += weight * num_counts
+        for mtype, mods, bins in ((mtype0, mod0, bin0), (mtype1, mod1, bin1)):
+            fan_sums = self.fan_sums[mtype]
+            fan_sums += weight * numpy.bincount(
+                mods[in_coincidence] * fan_sums.shape[1] +
+                bins[in_coincidence],
+                minlength=fan_sums.size).reshape(fan_sums.shape)
+
+    def accumulate(self,
+                   scanner: petsird.ScannerInformation,
+                   time_blocks: Iterable[petsird.TimeBlock],
+                   subtract_delayeds: bool = True) -> None:
+        """Add the prompts (minus delayeds) of all event time blocks"""
+        for time_block in time_blocks:
+            if not isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+                continue
+            for pair, arrays in get_coincidence_arrays(scanner,
+                                                       time_block.value,
+                                                       "prompts").items():
+                self.add(pair, arrays)
+            if subtract_delayeds:
+                for pair, arrays in get_coincidence_arrays(
+                        scanner, time_block.value, "delayeds").items():
+                    self.add(pair, arrays, -1.)
+
+
+def _get_module_pairs_per_sgid(
+    lut: npt.NDArray[numpy.int64], num_sgids: int
+) -> list[tuple[npt.NDArray[numpy.intp], npt.NDArray[numpy.intp]]]:
+    """Find the module indices of all module pairs of every SGID"""
+    order = numpy.argsort(lut, axis=None, kind="stable")
+    boundaries = numpy.searchsorted(
+        lut.reshape(-1)[order], numpy.arange(num_sgids + 1))
+    return [
+        numpy.unravel_index(order[boundaries[s]:boundaries[s + 1]], lut.shape)
+        for s in range(num_sgids)
+    ]
+
+
+def fit_detection_efficiencies(
+    counts: NormalisationCounts,
+    num_iterations: int = 10
+) -> tuple[list[npt.NDArray[numpy.float64]], dict[tuple[int, int],
+                                                  npt.NDArray[numpy.float64]]]:
+    """Fit the efficiency model to the counts
+
+    Returns the detection bin efficiencies (per module-type, with shape
+    (num_modules, num_bins_in_module)) and the module pair efficiencies (per
+    module-type pair, with shape (num_sgids, num_bins_in_module0,
+    num_bins_in_module1)). The latter are memory-mapped if the counts are.
+    """
+    efficiencies = [numpy.ones_like(f) for f in counts.fan_sums]
+    module_pairs = {}
+    for pair, lut in counts.sgid_luts.items():
+        if pair[0] == pair[1]:
+            # coincidences are ordered, so only module0 >= module1 occurs
+            lut = numpy.where(numpy.tri(len(lut), dtype=bool), lut, -1)
+        module_pairs[pair] = _get_module_pairs_per_sgid(
+            lut, len(counts.sgid_counts[pair]))
+    pair_efficiencies = {
+        pair:
+        _allocate(sgid_counts.shape, counts.directory,
+                  f"module_pair_efficiencies_{pair[0]}_{pair[1]}.npy")
+        for pair, sgid_counts in counts.sgid_counts.items()
+    }
+
+    def update_pair_efficiencies():
+        """Update the module pair efficiencies, SGID by SGID
+
+        Returns the sum over the fan of every detection bin of the efficiencies
+        of the other bin times the module pair efficiency.
+        """
+        fan_models = [numpy.zeros_like(e) for e in efficiencies]
+        for (mtype0, mtype1), sgid_counts in counts.sgid_counts.items():
+            for sgid, (mods0, mods1) in enumerate(module_pairs[mtype0,
+                                                               mtype1]):
+                eff0 = efficiencies[mtype0][mods0]
+                eff1 = efficiencies[mtype1][mods1]
+                expected = eff0.T @ eff1
+                values = numpy.divide(sgid_counts[sgid],
+                                      expected,
+                                      out=numpy.zeros_like(expected),
+                                      where=expected > 0)
+                pair_efficiencies[mtype0, mtype1][sgid] = values
+                numpy.add.at(fan_models[mtype0], mods0, eff1 @ values.T)
+                numpy.add.at(fan_models[mtype1], mods1, eff0 @ values)
+        return fan_models
+
+    for _ in range(num_iterations):
+        fan_models = update_pair_efficiencies()
+        for mtype, fan_model in enumerate(fan_models):
+            efficiencies[mtype] = numpy.divide(counts.fan_sums[mtype],
+                                               fan_model,
+                                               out=numpy.zeros_like(fan_model),
+                                               where=fan_model > 0)
+            # factors common to a bin in all modules cannot be distinguished
+            # from the module pair efficiencies, so normalise them out
+            mean = efficiencies[mtype].mean(axis=0)
+            efficiencies[mtype] = numpy.divide(efficiencies[mtype],
+                                               mean,
+                                               out=numpy.zeros_like(fan_model),
+                                               where=mean > 0)
+    update_pair_efficiencies()
+
+    # normalise the module pair efficiencies
+    total = 0.
+    num_values = 0
+    for pair, values in pair_efficiencies.items():
+        for sgid in range(len(values)):
+            total += values[sgid].sum()
+            num_values += numpy.count_nonzero(counts.sgid_counts[pair][sgid])
+    if total > 0:
+        for values in pair_efficiencies.values():
+            for sgid in range(len(values)):
+                values[sgid] *= num_values / total
+    return efficiencies, pair_efficiencies
+
+
+def set_detection_efficiencies(
+    scanner: petsird.ScannerInformation,
+    detection_bin_efficiencies: list[npt.NDArray[numpy.float64]],
+    module_pair_efficiencies: dict[tuple[int, int], npt.NDArray[numpy.float64]]
+) -> None:
+    """Store fitted efficiencies in the scanner (keeping the SGID LUTs)
+
+    The module pair efficiencies are stored as views of the (possibly
+    memory-mapped) arrays, such that they are only loaded when writing.
+    """
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    detection_efficiencies = scanner.detection_efficiencies
+    detection_efficiencies.detection_bin_efficiencies = [
+        e.reshape(-1).astype(numpy.float32) for e in detection_bin_efficiencies
+    ]
+    detection_efficiencies.module_pair_efficiencies_vectors = [[[
+        petsird.ModulePairEfficiencies(values=values, sgid=sgid)
+        for sgid, values in enumerate(module_pair_efficiencies[mtype0, mtype1])
+    ] for mtype1 in range(mtype0 + 1)] for mtype0 in range(num_module_types)]
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_normalisation',
+        description='Estimate detection efficiencies from a uniform source')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        required=True,
+        help="PETSIRD file to write the header with the efficiencies to")
+    parser.add_argument("-n",
+                        "--iterations",
+                        type=int,
+                        default=10,
+                        help="Number of iterations")
+    parser.add_argument(
+        "--work-dir",
+        type=str,
+        default=None,
+        help="Directory for memory-mapped SGID counts and efficiencies")
+    parser.add_argument("--keep-delayeds",
+                        action='store_true',
+                        help="Do not subtract delayed coincidences")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    if args.work_dir is not None:
+        os.makedirs(args.work_dir, exist_ok=True)
+    file = sys.stdin.buffer if args.input is None else args.input
+    with petsird.BinaryPETSIRDReader(file) as reader:
+        header = reader.read_header()
+        counts = NormalisationCounts(header.scanner, args.work_dir)
+        counts.accumulate(header.scanner,
+                          reader.read_time_blocks(),
+                          subtract_delayeds=not args.keep_delayeds)
+    efficiencies, pair_efficiencies = fit_detection_efficiencies(
+        counts, args.iterations)
+    set_detection_efficiencies(header.scanner, efficiencies, pair_efficiencies)
+    with petsird.BinaryPETSIRDWriter(args.output) as writer:
+        writer.write_header(header)
+        writer.write_time_blocks(())
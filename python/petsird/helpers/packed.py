@@ -0,0 +1,212 @@
+"""
+Preliminary helpers for a fixed-width (packed) representation of PETSIRD events
+
+Events in an `EventTimeBlock` are encoded by yardl as variable-length records.
+The helpers in this module convert event lists to NumPy structured arrays with
+fixed-width records, using the smallest unsigned integer type for every field,
+given the number of detection bins (see `get_num_detection_bins`) and TOF bins
+of the module-type (pair). Packed arrays can be sliced, scanned, and saved to
+and memory-mapped from `.npy` files without any decoding (see also the `packed`
+option of `petsird.helpers.columnar`).
+
+Triples and quadruples are not supported.
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import itertools
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import get_num_detection_bins
+
+_UINT_DTYPES = (numpy.uint8, numpy.uint16, numpy.uint32, numpy.uint64)
+
+
+def get_uint_dtype(max_value: int) -> numpy.dtype:
+    """Return the smallest unsigned integer type that can store `max_value`"""
+    for dtype in _UINT_DTYPES:
+        if max_value <= numpy.iinfo(dtype).max:
+            return numpy.dtype(dtype)
+    raise ValueError(f"{max_value} does not fit in an unsigned integer type")
+
+
+def get_coincidence_dtype(scanner: petsird.ScannerInformation,
+                          pair: tuple[int, int]) -> numpy.dtype:
+    """Return the record type for coincidences of a module-type pair
+
+    Fields are `det_bin0`, `det_bin1` and `tof_idx` (without padding).
+    """
+    num_tof_bins = scanner.tof_bin_edges[pair[0]][pair[1]].number_of_bins()
+    return numpy.dtype([
+        ("det_bin0",
+         get_uint_dtype(get_num_detection_bins(scanner, pair[0]) - 1)),
+        ("det_bin1",
+         get_uint_dtype(get_num_detection_bins(scanner, pair[1]) - 1)),
+        ("tof_idx", get_uint_dtype(max(num_tof_bins - 1, 0))),
+    ])
+
+
+def get_single_dtype(scanner: petsird.ScannerInformation,
+                     type_of_module: int) -> numpy.dtype:
+    """Return the record type for singles of a module-type
+
+    Fields are `det_bin` and `time_offset` (in ps, as in `SingleEvent`).
+    """
+    return numpy.dtype([
+        ("det_bin",
+         get_uint_dtype(get_num_detection_bins(scanner, type_of_module) - 1)),
+        ("time_offset", numpy.uint32),
+    ])
+
+
+def columns_to_records(columns: Sequence[npt.ArrayLike],
+                       dtype: numpy.dtype) -> npt.NDArray[numpy.void]:
+    """Convert columns (one for every field of `dtype`) to packed records
+
+    Raises `OverflowError` for values that do not fit in their field (assigning
+    them would wrap, and `numpy.fromiter` only raises with NumPy 2).
+    """
+    num_events = len(columns[0]) if len(columns) > 0 else 0
+    records = numpy.empty(num_events, dtype=dtype)
+    for name, values in zip(dtype.names, columns):
+        values = numpy.asarray(values)
+        if len(values) > 0:
+            info = numpy.iinfo(dtype[name])
+            for value in (values.min(), values.max()):
+                if not info.min <= value <= info.max:
+                    raise OverflowError(
+                        f"{name} {value} is out of bounds for {dtype[name]}")
+        records[name] = values
+    return records
+
+
+def pack_coincidence_events(events: petsird.ListOfCoincidenceEvents,
+                            dtype: numpy.dtype) -> npt.NDArray[numpy.void]:
+    """Convert a list of `CoincidenceEvent`s to packed records"""
+    num_events = len(events)
+    values = numpy.fromiter(itertools.chain.from_iterable(
+        (e.detection_bins[0], e.detection_bins[1], e.tof_idx) for e in events),
+                            dtype=numpy.int64,
+                            count=3 * num_events)
+    return columns_to_records(values.reshape(num_events, 3).T, dtype)
+
+
+def unpack_coincidence_events(
+        records: npt.NDArray[numpy.void]) -> list[petsird.CoincidenceEvent]:
+    """Convert packed records to a list of `CoincidenceEvent`s"""
+    return [
+        petsird.CoincidenceEvent(detection_bins=[bin0, bin1], tof_idx=tof_idx)
+        for bin0, bin1, tof_idx in zip(records["det_bin0"].tolist(
+        ), records["det_bin1"].tolist(), records["tof_idx"].tolist())
+    ]
+
+
+def pack_single_events(events: petsird.ListOfSingleEvents,
+                       dtype: numpy.dtype) -> npt.NDArray[numpy.void]:
+    """Convert a list of `SingleEvent`s to packed records"""
+    num_events = len(events)
+    values = numpy.fromiter(itertools.chain.from_iterable(
+        (e.detection_bin, e.time_offset_in_time_block) for e in events),
+                            dtype=numpy.int64,
+                            count=2 * num_events)
+    return columns_to_records(values.reshape(num_events, 2).T, dtype)
+
+
+def unpack_single_events(
+        records: npt.NDArray[numpy.void]) -> list[petsird.SingleEvent]:
+    """Convert packed records to a list of `SingleEvent`s"""
+    return [
+        petsird.SingleEvent(detection_bin=det_bin,
+                            time_offset_in_time_block=time_offset)
+        for det_bin, time_offset in zip(records["det_bin"].tolist(),
+                                        records["time_offset"].tolist())
+    ]
+
+
+@dataclass
+class PackedEventTimeBlock:
+    """Packed representation of an `EventTimeBlock`
+
+    `prompts` and `delayeds` are indexed by module-type pair, `singles` by
+    module-type. They are empty if the corresponding policy is `NONE`.
+    """
+    time_interval: petsird.TimeInterval
+    prompts: dict[tuple[int, int],
+                  npt.NDArray[numpy.void]] = field(default_factory=dict)
+    delayeds: dict[tuple[int, int],
+                   npt.NDArray[numpy.void]] = field(default_factory=dict)
+    singles: dict[int, npt.NDArray[numpy.void]] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(records.nbytes
+                   for events in (self.prompts, self.delayeds, self.singles)
+                   for records in events.values())
+
+
+def _check_policies(scanner: petsird.ScannerInformation) -> None:
+    if (scanner.triple_event_policy != petsird.TripleEventPolicy.NONE
+            or scanner.quadruple_event_policy
+            != petsird.QuadrupleEventPolicy.NONE):
+        raise ValueError("Packing of triples and quadruples is not supported")
+
+
+def pack_event_time_block(
+        scanner: petsird.ScannerInformation,
+        event_time_block: petsird.EventTimeBlock) -> PackedEventTimeBlock:
+    """Convert an `EventTimeBlock` to its packed representation"""
+    _check_policies(scanner)
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    packed = PackedEventTimeBlock(time_interval=event_time_block.time_interval)
+    for events, policy, result in (
+        (event_time_block.prompt_events, scanner.prompt_event_policy,
+         packed.prompts),
+        (event_time_block.delayed_events, scanner.delayed_event_policy,
+         packed.delayeds),
+    ):
+        if policy == petsird.CoincidencePolicy.NONE:
+            continue
+        for mtype0 in range(num_module_types):
+            for mtype1 in range(mtype0 + 1):
+                pair = (mtype0, mtype1)
+                result[pair] = pack_coincidence_events(
+                    events[mtype0][mtype1],
+                    get_coincidence_dtype(scanner, pair))
+    if scanner.single_event_policy != petsird.SingleEventPolicy.NONE:
+        for mtype in range(num_module_types):
+            packed.singles[mtype] = pack_single_events(
+                event_time_block.single_events[mtype],
+                get_single_dtype(scanner, mtype))
+    return packed
+
+
+def unpack_event_time_block(
+        scanner: petsird.ScannerInformation,
+        packed: PackedEventTimeBlock) -> petsird.EventTimeBlock:
+    """Convert a packed representation back to an `EventTimeBlock`"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    event_time_block = petsird.EventTimeBlock(
+        time_interval=packed.time_interval)
+    if packed.prompts:
+        event_time_block.prompt_events = [[
+            unpack_coincidence_events(packed.prompts[(mtype0, mtype1)])
+            for mtype1 in range(mtype0 + 1)
+        ] for mtype0 in range(num_module_types)]
+    if packed.delayeds:
+        event_time_block.delayed_events = [[
+            unpack_coincidence_events(packed.delayeds[(mtype0, mtype1)])
+            for mtype1 in range(mtype0 + 1)
+        ] for mtype0 in range(num_module_types)]
+    if packed.singles:
+        event_time_block.single_events = [
+            unpack_single_events(packed.singles[mtype])
+            for mtype in range(num_module_types)
+        ]
+    return event_time_block
@@ -1,29 +1,32 @@
-#  Copyright (C) 2024 University College London
+#  Copyright (C) 2024 - 2026 University College London
 #
 #  SPDX-License-Identifier: Apache-2.0
 
 # basic plotting of the scanner geometry
 # preliminary code!
+#
+# All boxes are drawn as a single Poly3DCollection, such that large scanners can
+# be plotted. Use --level modules or --decimate to reduce the amount of detail,
+# --efficiencies or --values to colour the boxes, and --output to save the figure
+# to a file without opening a window.
+import argparse
 import sys
+import typing
 
 import matplotlib.pyplot as plt
 import numpy
+import numpy.typing as npt
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
 import petsird
-import petsird.helpers.geometry
+from petsird.helpers.geometry import (BOX_SHAPE_FACES,
+                                      get_detecting_box_corners,
+                                      get_module_box_corners)
 
 
 def draw_BoxShape(ax, box: petsird.BoxShape) -> None:
     vertices = numpy.array([c.c for c in box.corners])
-    edges = [
-        [vertices[j] for j in [0, 1, 2, 3]],
-        [vertices[j] for j in [4, 5, 6, 7]],
-        [vertices[j] for j in [0, 1, 5, 4]],
-        [vertices[j] for j in [2, 3, 7, 6]],
-        [vertices[j] for j in [1, 2, 6, 5]],
-        [vertices[j] for j in [4, 7, 3, 0]],
-    ]
+    edges = vertices[numpy.array(BOX_SHAPE_FACES)]
     box_poly = Poly3DCollection(edges,
                                 alpha=0.25,
                                 linewidths=1,
@@ -31,9 +34,157 @@ def draw_BoxShape(ax, box: petsird.BoxShape) -> None:
     ax.add_collection3d(box_poly)
 
 
+def get_box_faces(corners: npt.ArrayLike) -> npt.NDArray[numpy.float32]:
+    """Convert box corners of shape (..., 8, 3) to faces of shape (N * 6, 4, 3)"""
+    corners = numpy.asarray(corners).reshape(-1, 8, 3)
+    return corners[:, numpy.array(BOX_SHAPE_FACES)].reshape(-1, 4, 3)
+
+
+def draw_boxes(ax,
+               corners: npt.ArrayLike,
+               values: typing.Optional[npt.ArrayLike] = None,
+               cmap: str = "viridis",
+               alpha: float = 0.25,
+               linewidths: float = 1) -> Poly3DCollection:
+    """Draw many boxes (given by their corners) as a single collection
+
+    If `values` (one per box) are given, faces are coloured with `cmap`.
+    """
+    corners = numpy.asarray(corners).reshape(-1, 8, 3)
+    collection = Poly3DCollection(get_box_faces(corners),
+                                  alpha=alpha,
+                                  linewidths=linewidths,
+                                  edgecolors="r" if values is None else None)
+    if values is not None:
+        # every box has 6 faces
+        collection.set_array(numpy.repeat(numpy.ravel(values), 6))
+        collection.set_cmap(cmap)
+    ax.add_collection3d(collection)
+    # collections do not update the data limits
+    ax.auto_scale_xyz(corners[..., 0], corners[..., 1], corners[..., 2])
+    return collection
+
+
+def get_efficiency_values(
+        scanner: petsird.ScannerInformation,
+        type_of_module: petsird.TypeOfModule) -> npt.NDArray[numpy.float32]:
+    """Detection bin efficiencies as (num_modules, num_elements, num_energy_bins)
+
+    Efficiencies that are not stored (or have size 0) are considered to be 1.
+    """
+    efficiencies = scanner.detection_efficiencies.detection_bin_efficiencies
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    shape = (len(rep_module.transforms),
+             len(rep_module.object.detecting_elements.transforms), -1)
+    if not efficiencies or len(efficiencies[type_of_module]) == 0:
+        num_energy_bins = scanner.event_energy_bin_edges[
+            type_of_module].number_of_bins()
+        return numpy.ones(shape[:2] + (num_energy_bins, ), dtype=numpy.float32)
+    return numpy.asarray(efficiencies[type_of_module]).reshape(shape)
+
+
+def get_scanner_boxes(
+    scanner: petsird.ScannerInformation,
+    type_of_module: petsird.TypeOfModule,
+    level: str = "elements",
+    decimate: int = 1,
+    values: typing.Optional[npt.ArrayLike] = None
+) -> tuple[npt.NDArray[numpy.float32], typing.Optional[npt.NDArray]]:
+    """Find the boxes to draw for a module-type and their values
+
+    `level` is "modules" or "elements". For "elements", only every `decimate`th
+    element is kept. `values` are per detection bin (in any shape that can be
+    reshaped to (num_modules, num_elements, -1)) and are averaged over energy
+    bins (and elements for "modules").
+    Returns corners of shape (N, 8, 3) and values of shape (N,) (or None).
+    """
+    if level == "modules":
+        corners = get_module_box_corners(scanner, type_of_module)
+        if values is not None:
+            values = numpy.asarray(values).reshape(len(corners), -1)
+            values = values.mean(axis=1)
+        return corners, values
+    if level != "elements":
+        raise ValueError(f"Unknown level of detail {level}")
+    corners = get_detecting_box_corners(scanner, type_of_module)
+    num_modules, num_elements = corners.shape[:2]
+    corners = corners.reshape(-1, 8, 3)[::decimate]
+    if values is not None:
+        values = numpy.asarray(values).reshape(num_modules * num_elements, -1)
+        values = values.mean(axis=1)[::decimate]
+    return corners, values
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_plot_scanner',
+        description='Plot the scanner geometry of a PETSIRD file')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted",
+    )
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="Image file to save to (no window is opened)")
+    parser.add_argument("--level",
+                        choices=("elements", "modules"),
+                        default="elements",
+                        help="Level of detail")
+    parser.add_argument("--decimate",
+                        type=int,
+                        default=1,
+                        help="Only draw every Nth detecting element")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--efficiencies",
+                       action='store_true',
+                       help="Colour by the detection bin efficiencies")
+    group.add_argument(
+        "--values",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Colour by per-bin values in .npy files (one per module-type)")
+    parser.add_argument("--cmap",
+                        type=str,
+                        default="viridis",
+                        help="Matplotlib colour map")
+    parser.add_argument("--dpi",
+                        type=int,
+                        default=150,
+                        help="Resolution of the saved image")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    reader = petsird.BinaryPETSIRDReader(sys.stdin.buffer)
+    args = parserCreator()
+    if args.output is not None:
+        # headless rendering
+        plt.switch_backend("Agg")
+    file = sys.stdin.buffer if args.input is None else args.input
+    reader = petsird.BinaryPETSIRDReader(file)
     header = reader.read_header()
+    scanner = header.scanner
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    if args.values is not None and len(args.values) != num_module_types:
+        sys.exit(f"--values needs {num_module_types} file(s)")
+
+    all_corners = []
+    all_values = []
+    for mtype in range(num_module_types):
+        values = None
+        if args.efficiencies:
+            values = get_efficiency_values(scanner, mtype)
+        elif args.values is not None:
+            values = numpy.load(args.values[mtype], mmap_mode="r")
+        corners, values = get_scanner_boxes(scanner, mtype, args.level,
+                                            args.decimate, values)
+        all_corners.append(corners)
+        all_values.append(values)
 
     # Create a new figure
     fig = plt.figure()
@@ -41,20 +192,20 @@ if __name__ == "__main__":
     # Add a 3D subplot
     ax = fig.add_subplot(111, projection="3d")
 
-    # draw all crystals
-    for rep_module in header.scanner.scanner_geometry.replicated_modules:
-        det_els = rep_module.object.detecting_elements
-        for mod_transform in rep_module.transforms:
-            for transform in det_els.transforms:
-                draw_BoxShape(
-                    ax,
-                    petsird.helpers.geometry.transform_BoxShape(
-                        petsird.helpers.geometry.mult_transforms(
-                            [mod_transform, transform]),
-                        det_els.object.shape,
-                    ),
-                )
+    colour = args.efficiencies or args.values is not None
+    collection = draw_boxes(
+        ax,
+        numpy.concatenate(all_corners),
+        values=numpy.concatenate(all_values) if colour else None,
+        cmap=args.cmap,
+        alpha=0.8 if colour else 0.25,
+        linewidths=0 if colour else 1)
+    if colour:
+        fig.colorbar(collection, ax=ax, shrink=0.6)
     # make axis "equal"
     ax.set_aspect("equal", adjustable="datalim")
     ax.set_box_aspect([1., 1., 1.])
-    plt.show()
+    if args.output is not None:
+        fig.savefig(args.output, dpi=args.dpi)
+    else:
+        plt.show()
@@ -0,0 +1,597 @@
+"""
+Preliminary helpers for a quick-look backprojection of PETSIRD coincidences
+
+This is not a reconstruction, but a fast sanity check of the data and geometry
+(e.g. is the phantom where it is expected?). Every coincidence is backprojected
+along the line between the centres of its detecting elements (see
+`petsird.helpers.geometry`) into a voxel grid, by sampling the part of the line
+inside the grid at (about) one sample per voxel and accumulating the samples
+in their nearest voxel. All events of a batch are handled at once (vectorized).
+
+Options:
+- TOF weighting: samples are weighted with a Gaussian around the centre of the
+  TOF bin, with the `tof_resolution` (FWHM) combined with the TOF bin width
+- efficiencies: events are weighted with the inverse of their detection
+  efficiency (see `get_detection_efficiency`). Events with zero efficiency are
+  discarded.
+Batches are backprojected in a thread or process pool. The input can be a
+PETSIRD file or a columnar export (see `petsird.helpers.columnar`), which avoids
+decoding the events.
+
+The image is indexed as [x, y, z], and saved as `.npz` with the `image`, the
+`voxel_size` and the `origin` (the centre of the first voxel) in mm.
+
+Usage:
+    python -m petsird.helpers.preview -i test.petsird -o preview.npz
+    python -m petsird.helpers.preview -i test_columns -o preview.npz --tof -j 8
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import typing
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import (CoincidenceArrays, ColumnarPETSIRD,
+                                      get_coincidence_arrays,
+                                      get_module_type_pairs, load_columnar)
+from petsird.helpers.geometry import get_detecting_element_centres
+from petsird.helpers.shared import (SharedTables, SharedTablesHandle,
+                                    attach_in_worker, get_centre_tables,
+                                    get_efficiency_tables, get_layout_tables,
+                                    get_tof_tables, get_worker_tables,
+                                    publish_tables, table_name)
+
+# FWHM of a Gaussian in units of its standard deviation
+_FWHM_TO_SIGMA = 1 / (2 * numpy.sqrt(2 * numpy.log(2)))
+# TOF kernels are truncated at this number of standard deviations
+_TOF_TRUNCATION = 3
+# maximum number of samples handled at once
+_MAX_SAMPLES = 1 << 22
+
+
+@dataclass
+class ImageGrid:
+    """Voxel grid with `origin` the centre of the first voxel (in mm)"""
+    shape: tuple[int, int, int]
+    voxel_size: npt.NDArray[numpy.float64]
+    origin: npt.NDArray[numpy.float64]
+
+    @property
+    def lower(self) -> npt.NDArray[numpy.float64]:
+        """Corner of the grid (outer edge of the first voxel)"""
+        return self.origin - self.voxel_size / 2
+
+    @property
+    def upper(self) -> npt.NDArray[numpy.float64]:
+        """Opposite corner of the grid"""
+        return self.lower + self.voxel_size * numpy.asarray(self.shape)
+
+
+def get_default_grid(scanner: petsird.ScannerInformation,
+                     voxel_size: float = 4.0) -> ImageGrid:
+    """Return a grid with cubic voxels covering all detecting element centres"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    centres = numpy.concatenate([
+        get_detecting_element_centres(scanner, mtype).reshape(-1, 3)
+        for mtype in range(num_module_types)
+    ])
+    lower = centres.min(axis=0)
+    upper = centres.max(axis=0)
+    shape = numpy.maximum(numpy.ceil((upper - lower) / voxel_size), 1)
+    voxel_sizes = numpy.full(3, voxel_size, dtype=numpy.float64)
+    origin = (lower + upper) / 2 - voxel_sizes * (shape - 1) / 2
+    return ImageGrid(shape=tuple(int(n) for n in shape),
+                     voxel_size=voxel_sizes,
+                     origin=origin)
+
+
+class DetectionEfficiencies:
+    """Vectorized lookup of the detection efficiencies of a scanner
+
+    See `petsird.helpers.get_detection_efficiency`.
+    """
+
+    def __init__(self, scanner: petsird.ScannerInformation):
+        self._set_tables({
+            **get_layout_tables(scanner),
+            **get_efficiency_tables(scanner)
+        })
+
+    @classmethod
+    def from_tables(
+            cls, tables: Mapping[str, npt.NDArray]) -> "DetectionEfficiencies":
+        """Create from (e.g. shared) tables, see `petsird.helpers.shared`"""
+        efficiencies = cls.__new__(cls)
+        efficiencies._set_tables(tables)
+        return efficiencies
+
+    def _set_tables(self, tables: Mapping[str, npt.NDArray]) -> None:
+        num_module_types = len(tables["num_modules"])
+        self.calibration_factor = float(tables.get("calibration_factor", 1.0))
+        # efficiencies that are absent (or of size 0) are considered to be 1,
+        # and stored as None
+        self.detection_bin_efficiencies = []
+        for mtype in range(num_module_types):
+            values = tables.get(table_name("detection_bin_efficiencies",
+                                           mtype))
+            self.detection_bin_efficiencies.append(
+                None if values is None or len(values) == 0 else values)
+        self.module_pair_efficiencies = None
+        if table_name("sgid_lut", 0, 0) in tables:
+            self.num_bins_in_module = (tables["num_elements"] *
+                                       tables["num_energy_bins"])
+            self.module_pair_efficiencies = {
+                pair: (tables[table_name("sgid_lut", *pair)],
+                       tables[table_name("module_pair_efficiencies", *pair)])
+                for pair in get_module_type_pairs(num_module_types)
+            }
+
+    def get(self, pair: tuple[int, int], det_bin0: npt.ArrayLike,
+            det_bin1: npt.ArrayLike) -> npt.NDArray[numpy.float64]:
+        """Return the detection efficiencies of (ordered) pairs of detection bins"""
+        det_bin0 = numpy.asarray(det_bin0, dtype=numpy.int64)
+        det_bin1 = numpy.asarray(det_bin1, dtype=numpy.int64)
+        result = numpy.full(len(det_bin0), self.calibration_factor)
+        for mtype, det_bins in zip(pair, (det_bin0, det_bin1)):
+            values = self.detection_bin_efficiencies[mtype]
+            if values is not None:
+                result *= values[det_bins]
+        if self.module_pair_efficiencies is not None:
+            lut, values = self.module_pair_efficiencies[pair]
+            num_bins0 = self.num_bins_in_module[pair[0]]
+            num_bins1 = self.num_bins_in_module[pair[1]]
+            sgids = lut[det_bin0 // num_bins0, det_bin1 // num_bins1]
+            in_coincidence = sgids >= 0
+            result[~in_coincidence] = 0
+            result[in_coincidence] *= values[sgids[in_coincidence],
+                                             det_bin0[in_coincidence] %
+                                             num_bins0,
+                                             det_bin1[in_coincidence] %
+                                             num_bins1]
+        return result
+
+
+class Backprojector:
+    """Backproject coincidences of a scanner into an image grid"""
+
+    def __init__(self,
+                 scanner: petsird.ScannerInformation,
+                 grid: ImageGrid,
+                 tof: bool = False,
+                 efficiencies: bool = False):
+        tables = {**get_layout_tables(scanner), **get_centre_tables(scanner)}
+        if tof:
+            tables.update(get_tof_tables(scanner))
+        if efficiencies:
+            tables.update(get_efficiency_tables(scanner))
+        self._set_tables(tables, grid, tof, efficiencies)
+
+    @classmethod
+    def from_tables(cls,
+                    tables: Mapping[str, npt.NDArray],
+                    grid: ImageGrid,
+                    tof: bool = False,
+                    efficiencies: bool = False) -> "Backprojector":
+        """Create from (e.g. shared) tables, see `petsird.helpers.shared`"""
+        backprojector = cls.__new__(cls)
+        backprojector._set_tables(tables, grid, tof, efficiencies)
+        return backprojector
+
+    def _set_tables(self, tables: Mapping[str, npt.NDArray], grid: ImageGrid,
+                    tof: bool, efficiencies: bool) -> None:
+        num_module_types = len(tables["num_modules"])
+        self.tables = tables
+        self.grid = grid
+        self.step = float(numpy.min(grid.voxel_size))
+        self.centres = [
+            tables[table_name("centres", mtype)]
+            for mtype in range(num_module_types)
+        ]
+        self.num_energy_bins = tables["num_energy_bins"]
+        # TOF bin centres and the standard deviation of the TOF kernel
+        self.tof_kernels = {}
+        if tof:
+            for pair in get_module_type_pairs(num_module_types):
+                edges = numpy.asarray(tables[table_name(
+                    "tof_bin_edges", *pair)],
+                                      dtype=numpy.float64)
+                if len(edges) <= 2:
+                    continue
+                sigma = (float(tables[table_name("tof_resolution", *pair)]) *
+                         _FWHM_TO_SIGMA)
+                widths = numpy.diff(edges)
+                self.tof_kernels[pair] = ((edges[1:] + edges[:-1]) / 2,
+                                          numpy.sqrt(sigma**2 +
+                                                     widths**2 / 12))
+        self.efficiencies = DetectionEfficiencies.from_tables(
+            tables) if efficiencies else None
+
+    def share(self) -> SharedTablesHandle:
+        """Move the tables to shared memory (once) and return their handle
+
+        The shared memory is removed when this backprojector is garbage collected.
+        """
+        if not isinstance(self.tables, SharedTables):
+            self._set_tables(publish_tables(self.tables), self.grid,
+                             bool(self.tof_kernels), self.efficiencies
+                             is not None)
+        return self.tables.handle
+
+    def get_lines(
+        self, pair: tuple[int, int], arrays: CoincidenceArrays
+    ) -> tuple[npt.NDArray[numpy.float64], npt.NDArray[numpy.float64],
+               npt.NDArray[numpy.float64], npt.NDArray[numpy.float64]]:
+        """Return start points, unit directions and the range inside the grid
+
+        Lines start at the first detecting element. The range is given as
+        distances from the start point, and is empty (start >= stop) for lines
+        that do not intersect the grid.
+        """
+        points0 = self.centres[pair[0]][arrays.det_bin0 //
+                                        self.num_energy_bins[pair[0]]].astype(
+                                            numpy.float64)
+        points1 = self.centres[pair[1]][arrays.det_bin1 //
+                                        self.num_energy_bins[pair[1]]].astype(
+                                            numpy.float64)
+        directions = points1 - points0
+        lengths = numpy.linalg.norm(directions, axis=1)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            directions /= lengths[:, None]
+            # slab method, with infinite distances for axis-parallel lines
+            distances0 = (self.grid.lower - points0) / directions
+            distances1 = (self.grid.upper - points0) / directions
+        parallel = directions == 0
+        inside = ((points0 >= self.grid.lower) & (points0 <= self.grid.upper))
+        # lines outside a slab get an entry distance of +inf (start > stop)
+        distances0[parallel] = numpy.where(inside[parallel], -numpy.inf,
+                                           numpy.inf)
+        distances1[parallel] = numpy.inf
+        starts = numpy.maximum(
+            numpy.minimum(distances0, distances1).max(axis=1), 0)
+        stops = numpy.minimum(
+            numpy.maximum(distances0, distances1).min(axis=1), lengths)
+        # coinciding detecting elements do not define a line
+        stops[lengths == 0] = 0
+        return points0, directions, starts, stops
+
+    def backproject(self, pair: tuple[int, int],
+                    arrays: CoincidenceArrays) -> npt.NDArray[numpy.float64]:
+        """Backproject coincidences of a module-type pair into a new image"""
+        image = numpy.zeros(int(numpy.prod(self.grid.shape)))
+        if len(arrays) == 0:
+            return image.reshape(self.grid.shape)
+        points, directions, starts, stops = self.get_lines(pair, arrays)
+        weights = numpy.ones(len(arrays))
+        if self.efficiencies is not None:
+            efficiencies = self.efficiencies.get(pair, arrays.det_bin0,
+                                                 arrays.det_bin1)
+            stops[efficiencies <= 0] = 0
+            weights[efficiencies > 0] /= efficiencies[efficiencies > 0]
+        tof_kernel = self.tof_kernels.get(pair)
+        if tof_kernel is not None:
+            lengths = numpy.linalg.norm(
+                self.centres[pair[1]][arrays.det_bin1 //
+                                      self.num_energy_bins[pair[1]]] - points,
+                axis=1)
+            # negative TOF values are closer to the first detecting element
+            tof_centres = lengths / 2 + tof_kernel[0][arrays.tof_idx]
+            sigmas = tof_kernel[1][arrays.tof_idx]
+            starts = numpy.maximum(starts,
+                                   tof_centres - _TOF_TRUNCATION * sigmas)
+            stops = numpy.minimum(stops,
+                                  tof_centres + _TOF_TRUNCATION * sigmas)
+        num_samples = numpy.where(stops > starts,
+                                  numpy.ceil((stops - starts) / self.step),
+                                  0).astype(numpy.int64)
+        spacings = numpy.zeros(len(arrays))
+        sampled = num_samples > 0
+        spacings[sampled] = ((stops[sampled] - starts[sampled]) /
+                             num_samples[sampled])
+        # process lines in chunks of at most (about) _MAX_SAMPLES samples
+        cumulative = numpy.cumsum(num_samples)
+        first = 0
+        while first < len(arrays):
+            last = max(
+                int(
+                    numpy.searchsorted(cumulative,
+                                       cumulative[first] - num_samples[first] +
+                                       _MAX_SAMPLES,
+                                       side="right")), first + 1)
+            lines = slice(first, last)
+            self._add_samples(
+                image, points[lines], directions[lines], starts[lines],
+                spacings[lines], num_samples[lines], weights[lines],
+                None if tof_kernel is None else
+                (tof_centres[lines], sigmas[lines]))
+            first = last
+        return image.reshape(self.grid.shape)
+
+    def _add_samples(
+        self, image: npt.NDArray[numpy.float64],
+        points: npt.NDArray[numpy.float64],
+        directions: npt.NDArray[numpy.float64],
+        starts: npt.NDArray[numpy.float64],
+        spacings: npt.NDArray[numpy.float64],
+        num_samples: npt.NDArray[numpy.int64],
+        weights: npt.NDArray[numpy.float64],
+        tof: typing.Optional[tuple[npt.NDArray[numpy.float64],
+                                   npt.NDArray[numpy.float64]]]
+    ) -> None:
+        """Sample lines at the centres of `num_samples` equal intervals"""
+        # (index + 0.5) of every sample along its line
+        positions = numpy.arange(num_samples.sum()) - numpy.repeat(
+            numpy.cumsum(num_samples) - num_samples - 0.5, num_samples)
+        voxels = numpy.zeros(len(positions), dtype=numpy.int64)
+        lower = self.grid.lower
+        for axis, size in enumerate(self.grid.shape):
+            # coordinates in voxel units, per line and per sample
+            first = (points[:, axis] + starts * directions[:, axis] -
+                     lower[axis]) / self.grid.voxel_size[axis]
+            increments = (spacings * directions[:, axis] /
+                          self.grid.voxel_size[axis])
+            coordinates = (
+                numpy.repeat(first, num_samples) +
+                positions * numpy.repeat(increments, num_samples)).astype(
+                    numpy.int64)
+            # samples can be rounded outside of the grid
+            numpy.clip(coordinates, 0, size - 1, out=coordinates)
+            voxels *= size
+            voxels += coordinates
+        sample_weights = numpy.repeat(weights * spacings, num_samples)
+        if tof is not None:
+            tof_centres, sigmas = tof
+            sigmas = numpy.repeat(sigmas, num_samples)
+            distances = (numpy.repeat(starts - tof_centres, num_samples) +
+                         positions * numpy.repeat(spacings, num_samples))
+            sample_weights *= numpy.exp(
+                -0.5 *
+                (distances / sigmas)**2) / (numpy.sqrt(2 * numpy.pi) * sigmas)
+        image += numpy.bincount(voxels,
+                                weights=sample_weights,
+                                minlength=len(image))
+
+
+# backprojector of a worker process, see make_executor
+_worker_backprojector: typing.Optional[Backprojector] = None
+
+
+def _init_worker(handle: SharedTablesHandle, grid: ImageGrid, tof: bool,
+                 efficiencies: bool) -> None:
+    global _worker_backprojector
+    attach_in_worker(handle)
+    _worker_backprojector = Backprojector.from_tables(get_worker_tables(),
+                                                      grid, tof, efficiencies)
+
+
+def _backproject_in_worker(
+        pair: tuple[int, int],
+        arrays: CoincidenceArrays) -> npt.NDArray[numpy.float64]:
+    return _worker_backprojector.backproject(pair, arrays)
+
+
+def make_executor(backprojector: Backprojector,
+                  jobs: int,
+                  processes: bool = False
+                  ) -> typing.Optional[concurrent.futures.Executor]:
+    """Return a pool to backproject batches in (or `None` for `jobs <= 1`)
+
+    Workers of process pools attach to the tables of the backprojector in shared
+    memory (see `Backprojector.share`), instead of receiving a copy.
+    """
+    if jobs <= 1:
+        return None
+    if processes:
+        return concurrent.futures.ProcessPoolExecutor(
+            jobs,
+            initializer=_init_worker,
+            initargs=(backprojector.share(), backprojector.grid,
+                      bool(backprojector.tof_kernels),
+                      backprojector.efficiencies is not None))
+    return concurrent.futures.ThreadPoolExecutor(jobs)
+
+
+def backproject_batches(backprojector: Backprojector,
+                        batches: Iterable[tuple[tuple[int, int],
+                                                CoincidenceArrays]],
+                        executor: typing.Optional[
+                            concurrent.futures.Executor] = None,
+                        max_pending: int = 16) -> npt.NDArray[numpy.float64]:
+    """Backproject batches of coincidences (per module-type pair) into one image
+
+    At most `max_pending` batches (and their images) are pending in the executor.
+    """
+    image = numpy.zeros(backprojector.grid.shape)
+    if executor is None:
+        for pair, arrays in batches:
+            image += backprojector.backproject(pair, arrays)
+        return image
+    function = (_backproject_in_worker if isinstance(
+        executor, concurrent.futures.ProcessPoolExecutor) else
+                backprojector.backproject)
+    pending = collections.deque()
+    for pair, arrays in batches:
+        pending.append(executor.submit(function, pair, arrays))
+        if len(pending) > max_pending:
+            image += pending.popleft().result()
+    for future in pending:
+        image += future.result()
+    return image
+
+
+def get_batches(
+    scanner: petsird.ScannerInformation,
+    time_blocks: Iterable[petsird.TimeBlock],
+    kind: str = "prompts",
+    batch_size: int = 1 << 18
+) -> Iterator[tuple[tuple[int, int], CoincidenceArrays]]:
+    """Collect the coincidences of time blocks in batches of (about) `batch_size`"""
+    collected = collections.defaultdict(list)
+    sizes = collections.Counter()
+
+    def concatenate(pair: tuple[int, int]) -> CoincidenceArrays:
+        arrays = collected.pop(pair)
+        sizes.pop(pair)
+        return CoincidenceArrays(
+            det_bin0=numpy.concatenate([a.det_bin0 for a in arrays]),
+            det_bin1=numpy.concatenate([a.det_bin1 for a in arrays]),
+            tof_idx=numpy.concatenate([a.tof_idx for a in arrays]))
+
+    for time_block in time_blocks:
+        if not isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            continue
+        for pair, arrays in get_coincidence_arrays(scanner, time_block.value,
+                                                   kind).items():
+            if len(arrays) == 0:
+                continue
+            collected[pair].append(arrays)
+            sizes[pair] += len(arrays)
+            if sizes[pair] >= batch_size:
+                yield pair, concatenate(pair)
+    for pair in list(collected):
+        yield pair, concatenate(pair)
+
+
+def get_columnar_batches(
+    columnar: ColumnarPETSIRD,
+    kind: str = "prompts",
+    batch_size: int = 1 << 18
+) -> Iterator[tuple[tuple[int, int], CoincidenceArrays]]:
+    """Split the coincidences of a columnar export in batches of `batch_size`"""
+    coincidences = columnar.prompts if kind == "prompts" else columnar.delayeds
+    for pair, arrays in coincidences.items():
+        for start in range(0, len(arrays), batch_size):
+            batch = arrays[start:start + batch_size]
+            # copy from memory-mapped files, such that batches can be pickled
+            yield pair, CoincidenceArrays(det_bin0=numpy.array(batch.det_bin0),
+                                          det_bin1=numpy.array(batch.det_bin1),
+                                          tof_idx=numpy.array(batch.tof_idx))
+
+
+def save_image(filename: str, image: npt.NDArray[numpy.float64],
+               grid: ImageGrid) -> None:
+    """Save an image with its grid as `.npz`"""
+    numpy.savez(filename,
+                image=image.astype(numpy.float32),
+                voxel_size=grid.voxel_size,
+                origin=grid.origin)
+
+
+def plot_image(filename: str, image: npt.NDArray[numpy.float64],
+               grid: ImageGrid) -> None:
+    """Save the central slices of an image as a figure"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    lower = grid.lower
+    upper = grid.upper
+    centre = [n // 2 for n in image.shape]
+    slices = (
+        ("x-y", image[:, :, centre[2]], (0, 1)),
+        ("x-z", image[:, centre[1], :], (0, 2)),
+        ("y-z", image[centre[0], :, :], (1, 2)),
+    )
+    figure, axes = plt.subplots(1, 3, figsize=(15, 5))
+    for ax, (title, image_slice, (axis0, axis1)) in zip(axes, slices):
+        ax.imshow(image_slice.T,
+                  origin="lower",
+                  extent=(lower[axis0], upper[axis0], lower[axis1],
+                          upper[axis1]))
+        ax.set_title(title)
+        ax.set_xlabel("xyz"[axis0] + " (mm)")
+        ax.set_ylabel("xyz"[axis1] + " (mm)")
+    figure.savefig(filename)
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_preview',
+        description='Quick-look backprojection of a PETSIRD file')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File (or columnar export) to read from, or stdin if omitted",
+    )
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="Image file to write to (.npz)")
+    parser.add_argument("--plot",
+                        type=str,
+                        default=None,
+                        help="Image file to save the central slices to")
+    parser.add_argument("--voxel-size",
+                        type=float,
+                        default=4.0,
+                        help="Voxel size in mm")
+    parser.add_argument("--tof", action="store_true", help="Use TOF weighting")
+    parser.add_argument("--efficiencies",
+                        action="store_true",
+                        help="Divide by the detection efficiencies")
+    parser.add_argument("--kind",
+                        choices=("prompts", "delayeds"),
+                        default="prompts",
+                        help="Coincidences to backproject")
+    parser.add_argument("-j",
+                        "--jobs",
+                        type=int,
+                        default=os.cpu_count(),
+                        help="Number of threads or processes")
+    parser.add_argument("--processes",
+                        action="store_true",
+                        help="Use processes instead of threads")
+    parser.add_argument("--batch-size",
+                        type=int,
+                        default=1 << 18,
+                        help="Number of events per batch")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    if args.output is None and args.plot is None:
+        sys.exit("Specify an output and/or a plot file")
+    columnar = None
+    if args.input is not None and os.path.isdir(args.input):
+        columnar = load_columnar(args.input)
+        reader = None
+        header = columnar.header
+    else:
+        reader = petsird.BinaryPETSIRDReader(sys.stdin.buffer if args.input is
+                                             None else args.input)
+        header = reader.read_header()
+    grid = get_default_grid(header.scanner, args.voxel_size)
+    backprojector = Backprojector(header.scanner, grid, args.tof,
+                                  args.efficiencies)
+    executor = make_executor(backprojector, args.jobs, args.processes)
+    if columnar is not None:
+        batches = get_columnar_batches(columnar, args.kind, args.batch_size)
+    else:
+        batches = get_batches(header.scanner, reader.read_time_blocks(),
+                              args.kind, args.batch_size)
+    try:
+        image = backproject_batches(backprojector, batches, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if reader is not None:
+            reader.close()
+    if args.output is not None:
+        save_image(args.output, image, grid)
+    if args.plot is not None:
+        plot_image(args.plot, image, grid)
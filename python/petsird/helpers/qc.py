@@ -0,0 +1,447 @@
+"""
+Preliminary helpers for quality control with count maps per detection bin
+
+A `CountMaps` accumulates, from columnar event arrays (see
+`petsird.helpers.columnar`),
+- counts per detection bin of every module-type for prompts, delayeds and
+  singles (both detection bins of a coincidence are counted)
+- counts per time block of every module-type pair (module-type for singles)
+- counts per time block of every module
+Maps can be reshaped to [module, element, energy bin] (see `CountMaps.get_map`)
+to find dead elements or hot modules, and the time series to find rate drops.
+Count maps of several files (or shards of a file) can be merged, and saved as
+`.npy` files with a JSON summary.
+
+Usage:
+    python -m petsird.helpers.qc -i test.petsird -o qc
+    python -m petsird.helpers.qc -i part0.petsird part1_columns -o qc --json -
+    python -m petsird.helpers.qc --merge qc_day0 qc_day1 -o qc_total
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import os
+import sys
+import typing
+from collections.abc import Iterable
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import (COINCIDENCE_KINDS, HEADER_FILENAME,
+                                      CoincidenceArrays, ColumnarPETSIRD,
+                                      SingleArrays, get_coincidence_arrays,
+                                      get_module_type_pairs, get_single_arrays,
+                                      load_columnar)
+from petsird.helpers.shared import get_layout_tables
+from petsird.helpers.summary import (CHUNK_SIZE, KINDS, format_key,
+                                     get_durations, get_rates,
+                                     get_time_intervals)
+
+SUMMARY_FILENAME = "count_maps.json"
+INTERVALS_FILENAME = "time_intervals.npy"
+
+
+class CountMaps:
+    """Accumulator of counts per detection bin and counts per time block
+
+    Maps are indexed by kind ("prompts", "delayeds" or "singles") and then
+    module-type. Counts per time block are indexed by kind and then
+    module-type pair (module-type for singles), and counts of modules per time
+    block by kind and module-type.
+    """
+
+    def __init__(self, scanner: petsird.ScannerInformation):
+        self.scanner = scanner
+        layout = get_layout_tables(scanner)
+        self.num_modules = layout["num_modules"]
+        self.num_elements = layout["num_elements"]
+        self.num_energy_bins = layout["num_energy_bins"]
+        self.num_bins_in_module = self.num_elements * self.num_energy_bins
+        self.types = list(range(len(self.num_modules)))
+        self.keys = {
+            kind: get_module_type_pairs(len(self.types))
+            for kind in COINCIDENCE_KINDS
+        }
+        self.keys["singles"] = self.types
+        self.maps = {
+            kind: {
+                mtype:
+                numpy.zeros(self.num_modules[mtype] *
+                            self.num_bins_in_module[mtype],
+                            dtype=numpy.int64)
+                for mtype in self.types
+            }
+            for kind in KINDS
+        }
+        # time interval (in ms) of every time block
+        self.time_intervals = []
+        self.block_counts = {
+            kind: {
+                key: []
+                for key in self.keys[kind]
+            }
+            for kind in KINDS
+        }
+        # arrays of shape (num_blocks, num_modules), concatenated on demand
+        self._module_block_counts = {
+            kind: {
+                mtype: []
+                for mtype in self.types
+            }
+            for kind in KINDS
+        }
+        # detection bins not yet added to the maps, see _flush
+        self._pending = {
+            kind: {
+                mtype: []
+                for mtype in self.types
+            }
+            for kind in KINDS
+        }
+        self._num_pending = 0
+
+    def _flush(self) -> None:
+        for kind in KINDS:
+            for mtype, pending in self._pending[kind].items():
+                if not pending:
+                    continue
+                counts = self.maps[kind][mtype]
+                counts += numpy.bincount(numpy.concatenate(pending),
+                                         minlength=len(counts))
+                pending.clear()
+        self._num_pending = 0
+
+    def _add_detections(self, kind: str, mtype: int, det_bins: npt.NDArray,
+                        block: typing.Optional[npt.NDArray],
+                        module_counts: npt.NDArray[numpy.int64]) -> None:
+        """Add detection bins to the maps, and to the counts of modules per block
+
+        `block` gives the (relative) block of every detection (or `None` for a
+        single block).
+        """
+        self._pending[kind][mtype].append(det_bins)
+        self._num_pending += len(det_bins)
+        # CHUNK_SIZE also bounds the number of buffered detection bins
+        if self._num_pending >= CHUNK_SIZE:
+            self._flush()
+        modules = det_bins // self.num_bins_in_module[mtype]
+        if block is not None:
+            modules = block.astype(
+                numpy.int64) * self.num_modules[mtype] + modules
+        module_counts += numpy.bincount(
+            modules, minlength=module_counts.size).reshape(module_counts.shape)
+
+    def _add_events(self, kind: str,
+                    events: dict[typing.Union[int, tuple[int, int]],
+                                 typing.Union[CoincidenceArrays,
+                                              SingleArrays]], num_blocks: int,
+                    chunk_size: int) -> None:
+        """Add events (of all keys) of `num_blocks` subsequent time blocks
+
+        The `block` column is only used if `num_blocks > 1`.
+        """
+        module_counts = {
+            mtype:
+            numpy.zeros((num_blocks, self.num_modules[mtype]),
+                        dtype=numpy.int64)
+            for mtype in self.types
+        }
+        for key in self.keys[kind]:
+            block_counts = numpy.zeros(num_blocks, dtype=numpy.int64)
+            arrays = events.get(key)
+            for start in range(0, 0 if arrays is None else len(arrays),
+                               chunk_size):
+                chunk = arrays[start:start + chunk_size]
+                block = None if num_blocks == 1 else chunk.block
+                if block is None:
+                    block_counts[0] += len(chunk)
+                else:
+                    block_counts += numpy.bincount(block, minlength=num_blocks)
+                if kind == "singles":
+                    self._add_detections(kind, key, chunk.det_bin, block,
+                                         module_counts[key])
+                else:
+                    for mtype, det_bins in zip(
+                            key, (chunk.det_bin0, chunk.det_bin1)):
+                        self._add_detections(kind, mtype, det_bins, block,
+                                             module_counts[mtype])
+            self.block_counts[kind][key].extend(block_counts.tolist())
+        for mtype in self.types:
+            self._module_block_counts[kind][mtype].append(module_counts[mtype])
+
+    def add_event_time_block(self,
+                             event_time_block: petsird.EventTimeBlock) -> None:
+        time_interval = event_time_block.time_interval
+        self.time_intervals.append((time_interval.start, time_interval.stop))
+        for kind in COINCIDENCE_KINDS:
+            self._add_events(
+                kind,
+                get_coincidence_arrays(self.scanner, event_time_block, kind),
+                1, CHUNK_SIZE)
+        self._add_events("singles",
+                         get_single_arrays(self.scanner, event_time_block), 1,
+                         CHUNK_SIZE)
+
+    def accumulate(self, time_blocks: Iterable[petsird.TimeBlock]) -> None:
+        """Add all event time blocks"""
+        for time_block in time_blocks:
+            if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+                self.add_event_time_block(time_block.value)
+
+    def add_columnar(self,
+                     columnar: ColumnarPETSIRD,
+                     chunk_size: int = CHUNK_SIZE) -> None:
+        """Add all events of a columnar export (in chunks of `chunk_size`)"""
+        num_blocks = len(columnar.blocks)
+        self.time_intervals.extend(
+            zip(columnar.blocks["start"].tolist(),
+                columnar.blocks["stop"].tolist()))
+        for kind, events in (("prompts", columnar.prompts),
+                             ("delayeds", columnar.delayeds),
+                             ("singles", columnar.singles)):
+            self._add_events(kind, events, num_blocks, chunk_size)
+
+    def _check_compatible(self, other: "CountMaps") -> None:
+        for name in ("num_modules", "num_elements", "num_energy_bins"):
+            if not numpy.array_equal(getattr(self, name), getattr(other,
+                                                                  name)):
+                raise ValueError(
+                    f"Count maps of different scanners ({name} differs)")
+
+    def merge(self, other: "CountMaps") -> None:
+        """Add the counts of another `CountMaps` (of subsequent time blocks)"""
+        self._check_compatible(other)
+        other._flush()
+        for kind in KINDS:
+            for mtype in self.types:
+                self.maps[kind][mtype] += other.maps[kind][mtype]
+                self._module_block_counts[kind][mtype].extend(
+                    other._module_block_counts[kind][mtype])
+            for key in self.keys[kind]:
+                self.block_counts[kind][key].extend(
+                    other.block_counts[kind][key])
+        self.time_intervals.extend(other.time_intervals)
+
+    def get_map(self, kind: str,
+                type_of_module: int) -> npt.NDArray[numpy.int64]:
+        """Return the counts of a module-type as [module, element, energy bin]"""
+        self._flush()
+        return self.maps[kind][type_of_module].reshape(
+            self.num_modules[type_of_module],
+            self.num_elements[type_of_module],
+            self.num_energy_bins[type_of_module])
+
+    def get_element_map(self, kind: str,
+                        type_of_module: int) -> npt.NDArray[numpy.int64]:
+        """Return the counts of a module-type as [module, element]"""
+        return self.get_map(kind, type_of_module).sum(axis=2)
+
+    def get_block_counts(
+            self, kind: str,
+            key: typing.Union[int, tuple[int,
+                                         int]]) -> npt.NDArray[numpy.int64]:
+        """Return the counts per time block of a module-type (pair)"""
+        return numpy.array(self.block_counts[kind][key], dtype=numpy.int64)
+
+    def get_module_block_counts(
+            self, kind: str, type_of_module: int) -> npt.NDArray[numpy.int64]:
+        """Return the counts per time block of all modules of a module-type
+
+        The shape is (num_blocks, num_modules).
+        """
+        counts = self._module_block_counts[kind][type_of_module]
+        if len(counts) != 1:
+            counts[:] = [
+                numpy.concatenate(counts) if counts else numpy.zeros(
+                    (0, self.num_modules[type_of_module]), dtype=numpy.int64)
+            ]
+        return counts[0]
+
+    def get_durations(self) -> npt.NDArray[numpy.float64]:
+        """Return the duration of every time block (in s)"""
+        return get_durations(get_time_intervals(self.time_intervals))
+
+    def to_dict(self, maps: bool = False) -> dict:
+        """Return a JSON-serialisable summary (with the maps if `maps`)
+
+        Keys and rates are as in `petsird.helpers.summary.Summary.to_dict`.
+        Elements (or modules) without any counts (in all energy bins) are
+        reported as zero elements (or modules).
+        """
+        durations = self.get_durations()
+        result = {
+            "scanner": self.scanner.model_name,
+            "num_modules": self.num_modules.tolist(),
+            "num_elements": self.num_elements.tolist(),
+            "num_energy_bins": self.num_energy_bins.tolist(),
+            "num_time_blocks": len(durations),
+            "duration_s": float(durations.sum()),
+        }
+        for kind in KINDS:
+            per_type = {}
+            for mtype in self.types:
+                counts = self.get_map(kind, mtype)
+                element_counts = counts.sum(axis=2)
+                module_counts = element_counts.sum(axis=1)
+                per_type[format_key(mtype)] = {
+                    "total":
+                    int(module_counts.sum()),
+                    "module_counts":
+                    module_counts.tolist(),
+                    "num_zero_modules":
+                    int(numpy.count_nonzero(module_counts == 0)),
+                    "num_zero_elements":
+                    int(numpy.count_nonzero(element_counts == 0)),
+                    "module_rates":
+                    get_rates(self.get_module_block_counts(kind, mtype),
+                              durations).tolist(),
+                }
+                if maps:
+                    per_type[format_key(mtype)]["map"] = counts.tolist()
+            result[kind] = {
+                "per_module_type": per_type,
+                "time_blocks": {},
+            }
+            for key in self.keys[kind]:
+                counts = self.get_block_counts(kind, key)
+                result[kind]["time_blocks"][format_key(key)] = {
+                    "counts": counts.tolist(),
+                    "rates": get_rates(counts, durations).tolist(),
+                }
+        intervals = get_time_intervals(self.time_intervals)
+        result["time_blocks"] = {
+            "start": intervals[:, 0].tolist(),
+            "stop": intervals[:, 1].tolist(),
+        }
+        return result
+
+    def save(self, directory: str) -> None:
+        """Save as `.npy` files, the header and a JSON summary
+
+        Maps are saved as `counts_<kind>_<type>.npy` with shape [module,
+        element, energy bin], counts per time block as
+        `block_counts_<kind>_<key>.npy`, and counts of modules per time block as
+        `module_block_counts_<kind>_<type>.npy`. See `load_count_maps`.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with petsird.BinaryPETSIRDWriter(
+                os.path.join(directory, HEADER_FILENAME)) as writer:
+            writer.write_header(petsird.Header(scanner=self.scanner))
+            writer.write_time_blocks(())
+        numpy.save(os.path.join(directory, INTERVALS_FILENAME),
+                   get_time_intervals(self.time_intervals))
+        for kind in KINDS:
+            for mtype in self.types:
+                numpy.save(
+                    os.path.join(directory, f"counts_{kind}_{mtype}.npy"),
+                    self.get_map(kind, mtype))
+                numpy.save(
+                    os.path.join(directory,
+                                 f"module_block_counts_{kind}_{mtype}.npy"),
+                    self.get_module_block_counts(kind, mtype))
+            for key in self.keys[kind]:
+                numpy.save(
+                    os.path.join(directory,
+                                 f"block_counts_{kind}_{format_key(key)}.npy"),
+                    self.get_block_counts(kind, key))
+        with open(os.path.join(directory, SUMMARY_FILENAME), "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+def load_count_maps(directory: str) -> CountMaps:
+    """Load a directory written by `CountMaps.save`"""
+    with petsird.BinaryPETSIRDReader(os.path.join(directory, HEADER_FILENAME),
+                                     skip_completed_check=True) as reader:
+        count_maps = CountMaps(reader.read_header().scanner)
+    count_maps.time_intervals = [
+        tuple(interval) for interval in numpy.load(
+            os.path.join(directory, INTERVALS_FILENAME)).tolist()
+    ]
+    for kind in KINDS:
+        for mtype in count_maps.types:
+            count_maps.maps[kind][mtype] += numpy.load(
+                os.path.join(directory,
+                             f"counts_{kind}_{mtype}.npy")).reshape(-1)
+            count_maps._module_block_counts[kind][mtype].append(
+                numpy.load(
+                    os.path.join(directory,
+                                 f"module_block_counts_{kind}_{mtype}.npy")))
+        for key in count_maps.keys[kind]:
+            count_maps.block_counts[kind][key].extend(
+                numpy.load(
+                    os.path.join(
+                        directory, f"block_counts_{kind}_"
+                        f"{format_key(key)}.npy")).tolist())
+    return count_maps
+
+
+def get_count_maps(input: typing.Optional[str]) -> CountMaps:
+    """Count a PETSIRD file (or stdin if `None`) or a columnar export"""
+    if input is not None and os.path.isdir(input):
+        columnar = load_columnar(input)
+        count_maps = CountMaps(columnar.header.scanner)
+        count_maps.add_columnar(columnar)
+        return count_maps
+    with petsird.BinaryPETSIRDReader(sys.stdin.buffer if input is
+                                     None else input) as reader:
+        count_maps = CountMaps(reader.read_header().scanner)
+        count_maps.accumulate(reader.read_time_blocks())
+    return count_maps
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_qc',
+        description='Count maps per detection bin and count rates per time '
+        'block for quality control')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        nargs="+",
+        default=[None],
+        help="Files (or columnar exports) to count, in time order, or stdin if "
+        "omitted")
+    parser.add_argument("--merge",
+                        type=str,
+                        nargs="+",
+                        default=None,
+                        help="Directories written by -o to merge (instead of "
+                        "--input)")
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="Directory to save the count maps in")
+    parser.add_argument("--json",
+                        type=str,
+                        default=None,
+                        help="JSON file (or - for stdout) for the summary "
+                        "including the maps")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    count_maps = None
+    for input in args.input if args.merge is None else args.merge:
+        other = (get_count_maps(input)
+                 if args.merge is None else load_count_maps(input))
+        if count_maps is None:
+            count_maps = other
+        else:
+            count_maps.merge(other)
+    if args.output is not None:
+        count_maps.save(args.output)
+    if args.json == "-" or (args.json is None and args.output is None):
+        json.dump(count_maps.to_dict(maps=True), sys.stdout, indent=1)
+        print()
+    elif args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(count_maps.to_dict(maps=True), f, indent=1)
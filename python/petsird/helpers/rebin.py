@@ -0,0 +1,379 @@
+"""
+Preliminary helpers for rebinning energy and TOF bins of PETSIRD data
+
+The new bin edges have to be a subset of the original ones. Events are remapped
+with lookup tables on columnar arrays: the energy index inside every
+`DetectionBin`, and `tof_idx` of coincidences. Events in energy or TOF bins
+outside the range of the new edges are discarded.
+
+The header is updated consistently:
+- `event_energy_bin_edges` and `tof_bin_edges`
+- `detection_bin_efficiencies` are summed over the merged energy bins
+- `ModulePairEfficiencies` are averaged over the merged energy bins, weighted
+  with the detection bin efficiencies (averaged over all modules), such that
+  their product equals the sum of the original products when the detection
+  bin efficiencies are the same for all modules. They are summed instead over
+  the energy bins of a module-type without detection bin efficiencies (or with
+  efficiencies of size 0).
+
+Triples and quadruples are not supported.
+
+Usage:
+    python -m petsird.helpers.rebin -i test.petsird -o out.petsird --tof-factor 2
+    python -m petsird.helpers.rebin -i test.petsird -o out.petsird --energy-edges 450,650
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import copy
+import sys
+import typing
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import get_num_det_els
+from petsird.helpers.columnar import (COINCIDENCE_KINDS, CoincidenceArrays,
+                                      SingleArrays,
+                                      arrays_to_coincidence_events,
+                                      arrays_to_single_events,
+                                      get_coincidence_arrays,
+                                      get_module_type_pairs, get_single_arrays)
+
+
+def get_bin_map(edges: npt.ArrayLike,
+                new_edges: npt.ArrayLike) -> npt.NDArray[numpy.int64]:
+    """Find the new bin of every original bin (-1 if outside the new edges)
+
+    Raises a `ValueError` if `new_edges` is not a subset of `edges`.
+    """
+    edges = numpy.asarray(edges, dtype=numpy.float64)
+    new_edges = numpy.asarray(new_edges, dtype=numpy.float64)
+    if len(new_edges) < 2 or numpy.any(numpy.diff(new_edges) <= 0):
+        raise ValueError("New bin edges have to be increasing")
+    positions = numpy.abs(edges[:, numpy.newaxis] -
+                          new_edges[numpy.newaxis, :]).argmin(axis=0)
+    if not numpy.allclose(edges[positions], new_edges, rtol=1e-6, atol=0):
+        raise ValueError(f"New bin edges {new_edges.tolist()} are not a "
+                         f"subset of {edges.tolist()}")
+    bin_map = numpy.full(len(edges) - 1, -1, dtype=numpy.int64)
+    for new_bin, (start, stop) in enumerate(zip(positions[:-1],
+                                                positions[1:])):
+        bin_map[start:stop] = new_bin
+    return bin_map
+
+
+def coarsen_edges(edges: npt.ArrayLike,
+                  factor: int) -> npt.NDArray[numpy.float32]:
+    """Merge every `factor` consecutive bins (the last bin can be smaller)"""
+    edges = numpy.asarray(edges)
+    new_edges = edges[::factor]
+    if (len(edges) - 1) % factor:
+        new_edges = numpy.append(new_edges, edges[-1])
+    return new_edges
+
+
+def _get_merge_matrix(bin_map: npt.NDArray[numpy.int64],
+                      num_new_bins: int) -> npt.NDArray[numpy.float64]:
+    """Matrix that sums original bins into new bins (by multiplication)"""
+    matrix = numpy.zeros((len(bin_map), num_new_bins))
+    inside = bin_map >= 0
+    matrix[numpy.flatnonzero(inside), bin_map[inside]] = 1
+    return matrix
+
+
+@dataclass
+class Rebinning:
+    """New energy and TOF bin edges, and the maps from the original bins
+
+    Edges and maps are indexed by module-type (energy) or module-type pair
+    (TOF).
+    """
+    energy_edges: dict[int, npt.NDArray[numpy.float32]]
+    energy_maps: dict[int, npt.NDArray[numpy.int64]]
+    tof_edges: dict[tuple[int, int], npt.NDArray[numpy.float32]]
+    tof_maps: dict[tuple[int, int], npt.NDArray[numpy.int64]]
+
+    def get_num_energy_bins(self, type_of_module: int) -> int:
+        return len(self.energy_edges[type_of_module]) - 1
+
+
+def get_rebinning(scanner: petsird.ScannerInformation,
+                  energy_edges: typing.Optional[npt.ArrayLike] = None,
+                  tof_edges: typing.Optional[npt.ArrayLike] = None,
+                  energy_factor: int = 1,
+                  tof_factor: int = 1) -> Rebinning:
+    """Set up a rebinning with the same new edges for all module-types (pairs)
+
+    Bins are kept if no new edges are given, or merged by `energy_factor` or
+    `tof_factor`.
+    """
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    rebinning = Rebinning({}, {}, {}, {})
+
+    def set_up(edges: npt.ArrayLike, new_edges: typing.Optional[npt.ArrayLike],
+               factor: int) -> tuple[npt.NDArray, npt.NDArray]:
+        edges = numpy.asarray(edges)
+        if new_edges is None:
+            new_edges = coarsen_edges(edges, factor)
+        new_edges = numpy.asarray(new_edges, dtype=edges.dtype)
+        return new_edges, get_bin_map(edges, new_edges)
+
+    for mtype in range(num_module_types):
+        (rebinning.energy_edges[mtype], rebinning.energy_maps[mtype]) = set_up(
+            scanner.event_energy_bin_edges[mtype].edges, energy_edges,
+            energy_factor)
+    for pair in get_module_type_pairs(num_module_types):
+        (rebinning.tof_edges[pair], rebinning.tof_maps[pair]) = set_up(
+            scanner.tof_bin_edges[pair[0]][pair[1]].edges, tof_edges,
+            tof_factor)
+    return rebinning
+
+
+def rebin_detection_bins(
+    rebinning: Rebinning, type_of_module: int, detection_bins: npt.ArrayLike
+) -> tuple[npt.NDArray[numpy.uint32], npt.NDArray[numpy.bool_]]:
+    """Remap the energy index of detection bins
+
+    Returns the new detection bins, and which of them are inside the new edges.
+    """
+    bin_map = rebinning.energy_maps[type_of_module]
+    detection_bins = numpy.asarray(detection_bins, dtype=numpy.int64)
+    energy_index = bin_map[detection_bins % len(bin_map)]
+    new_bins = (energy_index + (detection_bins // len(bin_map)) *
+                rebinning.get_num_energy_bins(type_of_module))
+    return new_bins.astype(numpy.uint32), energy_index >= 0
+
+
+def rebin_coincidence_arrays(rebinning: Rebinning, pair: tuple[int, int],
+                             arrays: CoincidenceArrays) -> CoincidenceArrays:
+    """Remap coincidences, and discard those outside the new bins
+
+    As the mapping of detection bins is monotonic, events stay ordered.
+    """
+    det_bin0, inside0 = rebin_detection_bins(rebinning, pair[0],
+                                             arrays.det_bin0)
+    det_bin1, inside1 = rebin_detection_bins(rebinning, pair[1],
+                                             arrays.det_bin1)
+    tof_idx = rebinning.tof_maps[pair][numpy.asarray(arrays.tof_idx)]
+    keep = inside0 & inside1 & (tof_idx >= 0)
+    return CoincidenceArrays(
+        det_bin0=det_bin0[keep],
+        det_bin1=det_bin1[keep],
+        tof_idx=tof_idx[keep].astype(numpy.uint32),
+        block=None if arrays.block is None else arrays.block[keep])
+
+
+def rebin_single_arrays(rebinning: Rebinning, type_of_module: int,
+                        arrays: SingleArrays) -> SingleArrays:
+    """Remap singles, and discard those outside the new energy bins"""
+    det_bin, keep = rebin_detection_bins(rebinning, type_of_module,
+                                         arrays.det_bin)
+    return SingleArrays(
+        det_bin=det_bin[keep],
+        time_offset=arrays.time_offset[keep],
+        block=None if arrays.block is None else arrays.block[keep])
+
+
+def rebin_event_time_block(
+        scanner: petsird.ScannerInformation, rebinning: Rebinning,
+        event_time_block: petsird.EventTimeBlock) -> petsird.EventTimeBlock:
+    """Return a rebinned copy of an `EventTimeBlock` (`scanner` is the original)"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    result = petsird.EventTimeBlock(
+        time_interval=event_time_block.time_interval)
+    for kind in COINCIDENCE_KINDS:
+        coincidences = get_coincidence_arrays(scanner, event_time_block, kind)
+        if not coincidences:
+            continue
+        setattr(result, f"{kind[:-1]}_events", [[
+            arrays_to_coincidence_events(
+                rebin_coincidence_arrays(rebinning, (mtype0, mtype1),
+                                         coincidences[mtype0, mtype1]))
+            for mtype1 in range(mtype0 + 1)
+        ] for mtype0 in range(num_module_types)])
+    singles = get_single_arrays(scanner, event_time_block)
+    if singles:
+        result.single_events = [
+            arrays_to_single_events(
+                rebin_single_arrays(rebinning, mtype, singles[mtype]))
+            for mtype in range(num_module_types)
+        ]
+    return result
+
+
+def _rebin_efficiencies(scanner: petsird.ScannerInformation,
+                        rebinning: Rebinning,
+                        efficiencies: petsird.DetectionEfficiencies) -> None:
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    rep_modules = scanner.scanner_geometry.replicated_modules
+    merge = [
+        _get_merge_matrix(rebinning.energy_maps[mtype],
+                          rebinning.get_num_energy_bins(mtype))
+        for mtype in range(num_module_types)
+    ]
+    # efficiencies with shape (num_modules, num_elements_per_module, num_bins),
+    # or None for efficiencies of size 0 (which are considered to be 1 and are
+    # left empty)
+    weights = [None] * num_module_types
+    if efficiencies.detection_bin_efficiencies:
+        new_efficiencies = []
+        for mtype in range(num_module_types):
+            values = efficiencies.detection_bin_efficiencies[mtype]
+            if len(values) == 0:
+                new_efficiencies.append(values)
+                continue
+            shape = (
+                len(rep_modules[mtype].transforms),
+                len(rep_modules[mtype].object.detecting_elements.transforms),
+                len(rebinning.energy_maps[mtype]))
+            values = numpy.asarray(values, dtype=numpy.float64).reshape(shape)
+            weights[mtype] = values.mean(axis=0)
+            new_efficiencies.append(
+                (values @ merge[mtype]).reshape(-1).astype(numpy.float32))
+        efficiencies.detection_bin_efficiencies = new_efficiencies
+    if not efficiencies.module_pair_efficiencies_vectors:
+        return
+    for mtype0, mtype1 in get_module_type_pairs(num_module_types):
+        num_el = [
+            get_num_det_els(scanner, mtype) //
+            len(rep_modules[mtype].transforms) for mtype in (mtype0, mtype1)
+        ]
+        num_en = [len(rebinning.energy_maps[m]) for m in (mtype0, mtype1)]
+        w0, w1 = tuple(
+            numpy.ones((n_el, n_en)) if weights[m] is None else weights[m]
+            for m, n_el, n_en in zip((mtype0, mtype1), num_el, num_en))
+        m0, m1 = merge[mtype0], merge[mtype1]
+        # weighted average over the merged bins of a module-type with detection
+        # bin efficiencies, sum otherwise
+        norms = []
+        for mtype, w, m in ((mtype0, w0, m0), (mtype1, w1, m1)):
+            norm = w @ m
+            if weights[mtype] is None:
+                norm = numpy.ones_like(norm)
+            norms.append(norm)
+        norm = numpy.einsum("aE,bF->aEbF", *norms)
+        for pair_efficiencies in efficiencies.module_pair_efficiencies_vectors[
+                mtype0][mtype1]:
+            values = numpy.asarray(pair_efficiencies.values,
+                                   dtype=numpy.float64).reshape(
+                                       num_el[0], num_en[0], num_el[1],
+                                       num_en[1])
+            summed = numpy.einsum("aebf,ae,eE,bf,fF->aEbF", values, w0, m0, w1,
+                                  m1)
+            new_values = numpy.divide(summed,
+                                      norm,
+                                      out=numpy.zeros_like(summed),
+                                      where=norm > 0)
+            pair_efficiencies.values = new_values.reshape(
+                num_el[0] * m0.shape[1],
+                num_el[1] * m1.shape[1]).astype(numpy.float32)
+
+
+def rebin_scanner(scanner: petsird.ScannerInformation,
+                  rebinning: Rebinning) -> petsird.ScannerInformation:
+    """Return a copy of `scanner` with new bin edges and efficiencies"""
+    result = copy.deepcopy(scanner)
+    for mtype, edges in rebinning.energy_edges.items():
+        result.event_energy_bin_edges[mtype] = petsird.BinEdges(edges=edges)
+    for (mtype0, mtype1), edges in rebinning.tof_edges.items():
+        result.tof_bin_edges[mtype0][mtype1] = petsird.BinEdges(edges=edges)
+    if result.detection_efficiencies is not None:
+        _rebin_efficiencies(scanner, rebinning, result.detection_efficiencies)
+    return result
+
+
+def rebin_time_blocks(
+        scanner: petsird.ScannerInformation, rebinning: Rebinning,
+        time_blocks: Iterable[petsird.TimeBlock]
+) -> Iterator[petsird.TimeBlock]:
+    """Rebin all event time blocks (other time blocks are passed on)"""
+    for time_block in time_blocks:
+        if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            yield petsird.TimeBlock.EventTimeBlock(
+                rebin_event_time_block(scanner, rebinning, time_block.value))
+        else:
+            yield time_block
+
+
+def rebin(reader: petsird.PETSIRDReaderBase,
+          writer: petsird.PETSIRDWriterBase,
+          energy_edges: typing.Optional[npt.ArrayLike] = None,
+          tof_edges: typing.Optional[npt.ArrayLike] = None,
+          energy_factor: int = 1,
+          tof_factor: int = 1) -> None:
+    """Write a rebinned copy of a PETSIRD stream"""
+    header = reader.read_header()
+    scanner = header.scanner
+    if (scanner.triple_event_policy != petsird.TripleEventPolicy.NONE
+            or scanner.quadruple_event_policy
+            != petsird.QuadrupleEventPolicy.NONE):
+        raise ValueError(
+            "Rebinning of triples and quadruples is not supported")
+    rebinning = get_rebinning(scanner, energy_edges, tof_edges, energy_factor,
+                              tof_factor)
+    new_header = copy.copy(header)
+    new_header.scanner = rebin_scanner(scanner, rebinning)
+    writer.write_header(new_header)
+    writer.write_time_blocks(
+        rebin_time_blocks(scanner, rebinning, reader.read_time_blocks()))
+
+
+def _parse_edges(text: typing.Optional[str]) -> typing.Optional[list[float]]:
+    if text is None:
+        return None
+    return [float(edge) for edge in text.split(",")]
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_rebin',
+        description='Rebin energy and/or TOF bins of a PETSIRD file')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="File to write to, or stdout if omitted",
+    )
+    parser.add_argument("--energy-edges",
+                        type=str,
+                        default=None,
+                        help="Comma-separated new energy bin edges")
+    parser.add_argument("--energy-factor",
+                        type=int,
+                        default=1,
+                        help="Number of energy bins to merge")
+    parser.add_argument("--tof-edges",
+                        type=str,
+                        default=None,
+                        help="Comma-separated new TOF bin edges")
+    parser.add_argument("--tof-factor",
+                        type=int,
+                        default=1,
+                        help="Number of TOF bins to merge")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    input_file = sys.stdin.buffer if args.input is None else args.input
+    output_file = sys.stdout.buffer if args.output is None else args.output
+    with petsird.BinaryPETSIRDReader(input_file) as reader:
+        with petsird.BinaryPETSIRDWriter(output_file) as writer:
+            rebin(reader, writer, _parse_edges(args.energy_edges),
+                  _parse_edges(args.tof_edges), args.energy_factor,
+                  args.tof_factor)
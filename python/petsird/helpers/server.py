@@ -0,0 +1,415 @@
+"""
+Preliminary helpers for receiving PETSIRD streams over sockets with asyncio
+
+`PETSIRDServer` accepts concurrent PETSIRD streams on TCP or Unix sockets. Bytes
+are received on the event loop, while headers and time blocks are decoded by a
+`BinaryPETSIRDReader` in an executor (yardl decoding is synchronous). Decoded
+items are fanned out to registered `Consumer`s, each with its own bounded queue.
+A slow consumer therefore eventually blocks decoding, which stops reading from
+the socket, such that backpressure propagates to the sender.
+
+Consumers provided here write every stream to a file (`WriterConsumer`) or keep
+sliding-window rates (`MonitorConsumer`, see `petsird.helpers.follow`).
+
+`send` is a (blocking) client based on `BinaryPETSIRDWriter`.
+
+Usage:
+    python -m petsird.helpers.server serve --port 5000 -o received
+    python -m petsird.helpers.server send --port 5000 -i test.petsird
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import queue
+import socket
+import sys
+import typing
+from collections.abc import Callable, Iterable
+
+import petsird
+from petsird.helpers.follow import RateMonitor
+
+# suffix of files of streams that are not (yet) complete
+PARTIAL_SUFFIX = ".partial"
+# size of the chunks read from a socket
+CHUNK_SIZE = 1 << 16
+
+
+class _ChunkStream(io.BufferedIOBase):
+    """Blocking stream fed with chunks of bytes from the event loop
+
+    Reads only return less data than requested at the end of the stream (see
+    `FollowStream`). At most `max_chunks` chunks are waiting to be read; `feed`
+    waits (asynchronously) for a free slot. `finish` (called by the reading
+    side) and `abort` (called by the event loop) end the exchange.
+    """
+
+    def __init__(self, max_chunks: int, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._chunks = queue.Queue()
+        self._slots = asyncio.Semaphore(max_chunks)
+        self._max_chunks = max_chunks
+        self._loop = loop
+        self._current = memoryview(b"")
+        self._at_end = False
+        self.finished = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        num_read = 0
+        while num_read < len(view):
+            if not self._current:
+                if self._at_end:
+                    break
+                chunk = self._chunks.get()
+                self._loop.call_soon_threadsafe(self._slots.release)
+                if chunk is None:
+                    self._at_end = True
+                    break
+                if self.finished:
+                    raise EOFError("Stream was aborted")
+                self._current = memoryview(chunk)
+            n = min(len(self._current), len(view) - num_read)
+            view[num_read:num_read + n] = self._current[:n]
+            self._current = self._current[n:]
+            num_read += n
+        return num_read
+
+    async def feed(self, chunk: typing.Optional[bytes]) -> None:
+        """Add a chunk (`None` for the end)"""
+        await self._slots.acquire()
+        self._chunks.put_nowait(chunk)
+
+    def _release_all(self) -> None:
+        for _ in range(self._max_chunks):
+            self._slots.release()
+
+    def finish(self) -> None:
+        """Signal (from the reading thread) that the stream is not read anymore"""
+        self.finished = True
+        self._loop.call_soon_threadsafe(self._release_all)
+
+    def abort(self) -> None:
+        """Make reads fail (from the event loop)"""
+        self.finished = True
+        self._chunks.put_nowait(b"")
+
+
+class Consumer:
+    """Base class for consumers of decoded streams
+
+    Streams are identified by an integer, in order of connection. `error` is
+    `None` if the stream was complete.
+    """
+
+    async def on_header(self, stream_id: int, header: petsird.Header) -> None:
+        pass
+
+    async def on_time_block(self, stream_id: int,
+                            time_block: petsird.TimeBlock) -> None:
+        pass
+
+    async def on_end(self, stream_id: int,
+                     error: typing.Optional[BaseException]) -> None:
+        pass
+
+
+class WriterConsumer(Consumer):
+    """Write every stream to `<directory>/stream_<stream_id>.petsird`
+
+    Writing is done in the default executor, to a file with `PARTIAL_SUFFIX`
+    that is renamed when the stream is complete. If a stream ends with an
+    error, the time blocks received up to then are kept in the file with
+    `PARTIAL_SUFFIX`, such that it cannot be mistaken for a complete stream.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._writers = {}
+
+    def get_filename(self, stream_id: int) -> str:
+        return os.path.join(self.directory, f"stream_{stream_id}.petsird")
+
+    async def _run(self, function: Callable, *args) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    async def on_header(self, stream_id: int, header: petsird.Header) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        writer = petsird.BinaryPETSIRDWriter(
+            self.get_filename(stream_id) + PARTIAL_SUFFIX)
+        self._writers[stream_id] = writer
+        await self._run(writer.write_header, header)
+
+    async def on_time_block(self, stream_id: int,
+                            time_block: petsird.TimeBlock) -> None:
+        await self._run(self._writers[stream_id].write_time_blocks,
+                        (time_block, ))
+
+    async def on_end(self, stream_id: int,
+                     error: typing.Optional[BaseException]) -> None:
+        writer = self._writers.pop(stream_id, None)
+        if writer is None:
+            return
+        # end the file, such that the time blocks received up to an error can
+        # still be read
+        await self._run(writer.write_time_blocks, ())
+        await self._run(writer.close)
+        if error is None:
+            filename = self.get_filename(stream_id)
+            os.replace(filename + PARTIAL_SUFFIX, filename)
+
+
+class MonitorConsumer(Consumer):
+    """Keep a `RateMonitor` per stream, and `emit` its statistics at the end"""
+
+    def __init__(self,
+                 window: int = 1000,
+                 emit: typing.Optional[Callable[[int, dict], None]] = None):
+        self.window = window
+        self.emit = emit
+        self.monitors = {}
+
+    async def on_header(self, stream_id: int, header: petsird.Header) -> None:
+        self.monitors[stream_id] = RateMonitor(header.scanner, self.window)
+
+    async def on_time_block(self, stream_id: int,
+                            time_block: petsird.TimeBlock) -> None:
+        self.monitors[stream_id].add_time_block(time_block)
+
+    async def on_end(self, stream_id: int,
+                     error: typing.Optional[BaseException]) -> None:
+        if self.emit is not None and stream_id in self.monitors:
+            statistics = self.monitors[stream_id].get_statistics()
+            statistics["stream_id"] = stream_id
+            statistics["error"] = None if error is None else repr(error)
+            self.emit(stream_id, statistics)
+
+
+class PETSIRDServer:
+    """Receive PETSIRD streams, and fan out decoded items to consumers
+
+    `executor` is used for decoding (one task per connection, blocking while
+    consumers are busy), and defaults to a dedicated thread pool for at most
+    `max_streams` concurrent streams. It cannot be a process pool, as time
+    blocks are not picklable. `queue_size` bounds the number of items waiting for every
+    consumer, and the number of received chunks waiting to be decoded.
+    """
+
+    def __init__(self,
+                 consumers: Iterable[Consumer] = (),
+                 executor: typing.Optional[concurrent.futures.Executor] = None,
+                 queue_size: int = 64,
+                 max_streams: int = 32):
+        self._consumers = list(consumers)
+        self._owns_executor = executor is None
+        self._executor = (concurrent.futures.ThreadPoolExecutor(max_streams)
+                          if executor is None else executor)
+        self._queue_size = queue_size
+        self._queues = []
+        self._tasks = []
+        self._connections = set()
+        self._servers = []
+        self._num_streams = 0
+        self.consumer_errors = []
+
+    def add_consumer(self, consumer: Consumer) -> None:
+        self._consumers.append(consumer)
+        if self._tasks:
+            self._start_consumer(consumer)
+
+    def _start_consumer(self, consumer: Consumer) -> None:
+        items = asyncio.Queue(self._queue_size)
+        self._queues.append(items)
+        self._tasks.append(asyncio.get_running_loop().create_task(
+            self._consume(consumer, items)))
+
+    async def _consume(self, consumer: Consumer, items: asyncio.Queue) -> None:
+        while (item := await items.get()) is not None:
+            method, stream_id, value = item
+            try:
+                await getattr(consumer, method)(stream_id, value)
+            except Exception as error:
+                self.consumer_errors.append((consumer, stream_id, error))
+
+    async def _dispatch(self, method: str, stream_id: int,
+                        value: typing.Any) -> None:
+        for items in self._queues:
+            await items.put((method, stream_id, value))
+
+    def _decode(self, stream: _ChunkStream, stream_id: int,
+                loop: asyncio.AbstractEventLoop) -> None:
+        """Decode a stream (in the executor), waiting for the consumer queues"""
+
+        def dispatch(method: str, value: typing.Any) -> None:
+            asyncio.run_coroutine_threadsafe(
+                self._dispatch(method, stream_id, value), loop).result()
+
+        try:
+            reader = petsird.BinaryPETSIRDReader(stream)
+            dispatch("on_header", reader.read_header())
+            for time_block in reader.read_time_blocks():
+                dispatch("on_time_block", time_block)
+            reader.close()
+        except BufferError as e:
+            # see petsird.helpers.follow.follow
+            raise EOFError("Unexpected EOF") from e
+        finally:
+            stream.finish()
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """Receive and decode one stream (callback for `asyncio` servers)"""
+        loop = asyncio.get_running_loop()
+        stream_id = self._num_streams
+        self._num_streams += 1
+        self._connections.add(asyncio.current_task())
+        stream = _ChunkStream(self._queue_size, loop)
+        decoding = loop.run_in_executor(self._executor, self._decode, stream,
+                                        stream_id, loop)
+        error = None
+        try:
+            while not stream.finished and (data := await
+                                           reader.read(CHUNK_SIZE)):
+                await stream.feed(data)
+            await stream.feed(None)
+            await decoding
+        except Exception as e:
+            error = e
+            stream.abort()
+            await asyncio.gather(decoding, return_exceptions=True)
+        finally:
+            writer.close()
+            await self._dispatch("on_end", stream_id, error)
+            self._connections.discard(asyncio.current_task())
+
+    def _start(self) -> None:
+        if not self._tasks:
+            for consumer in self._consumers:
+                self._start_consumer(consumer)
+
+    async def start_tcp(self,
+                        host: str = "localhost",
+                        port: int = 0) -> asyncio.AbstractServer:
+        """Listen on a TCP port (0 for a free port)"""
+        self._start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """Listen on a Unix socket"""
+        self._start()
+        server = await asyncio.start_unix_server(self.handle_connection, path)
+        self._servers.append(server)
+        return server
+
+    async def close(self) -> None:
+        """Stop listening, and wait for all streams and consumers to finish"""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        for items in self._queues:
+            await items.put(None)
+        await asyncio.gather(*self._tasks)
+        if self._owns_executor:
+            self._executor.shutdown()
+
+
+def connect(address: typing.Union[str, tuple[str, int]]) -> socket.socket:
+    """Connect to a Unix socket (path) or TCP socket ((host, port))"""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address)
+        return sock
+    return socket.create_connection(address)
+
+
+def send(address: typing.Union[str, tuple[str, int]], header: petsird.Header,
+         time_blocks: Iterable[petsird.TimeBlock]) -> None:
+    """Send a PETSIRD stream to a server (blocking)"""
+    with connect(address) as sock, sock.makefile("wb") as file:
+        writer = petsird.BinaryPETSIRDWriter(file)
+        writer.write_header(header)
+        writer.write_time_blocks(time_blocks)
+        writer.close()
+
+
+async def serve(address: typing.Union[str, tuple[str, int]],
+                consumers: Iterable[Consumer]) -> None:
+    """Run a server until cancelled"""
+    server = PETSIRDServer(consumers)
+    if isinstance(address, str):
+        listener = await server.start_unix(address)
+    else:
+        listener = await server.start_tcp(*address)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_server',
+        description='Receive (or send) PETSIRD streams over sockets')
+    parser.add_argument("command", choices=("serve", "send"))
+    parser.add_argument("--host", type=str, default="localhost")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--unix",
+                        type=str,
+                        default=None,
+                        help="Path of a Unix socket (instead of TCP)")
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to send, or stdin if omitted",
+    )
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        default=None,
+                        help="Directory to write received streams to")
+    parser.add_argument("--window",
+                        type=int,
+                        default=1000,
+                        help="Window (in ms) for the rates of every stream")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    if args.unix is None and args.port is None:
+        sys.exit("Specify --port or --unix")
+    address = args.unix if args.unix is not None else (args.host, args.port)
+    if args.command == "send":
+        file = sys.stdin.buffer if args.input is None else args.input
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            send(address, reader.read_header(), reader.read_time_blocks())
+    else:
+        consumers = [
+            MonitorConsumer(
+                args.window,
+                lambda stream_id, statistics: print(json.dumps(statistics),
+                                                    flush=True))
+        ]
+        if args.output is not None:
+            consumers.append(WriterConsumer(args.output))
+        try:
+            asyncio.run(serve(address, consumers))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,275 @@
+"""
+Preliminary helpers to share derived scanner tables between processes
+
+Sending a `ScannerInformation` (or objects derived from it) to the workers of a
+process pool pickles it for every worker, including the nested lists of
+efficiencies and all transformations. Instead, the arrays that workers need (see
+`get_scanner_tables`) can be published once in a `multiprocessing.shared_memory`
+segment. Workers attach to it by name, and use the arrays without copying.
+
+The segment is removed when the publishing `SharedTables` is closed (or garbage
+collected, or the process exits). If the publishing process crashes, the resource
+tracker of `multiprocessing` removes it. Workers should be started (directly or
+indirectly) by the publishing process, such that they share its resource tracker.
+
+Usage:
+    with publish_tables(get_scanner_tables(scanner)) as tables:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            4, initializer=attach_in_worker, initargs=(tables.handle, ))
+        # functions running in the workers use get_worker_tables()
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import sys
+import typing
+import weakref
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import get_module_pair_sgid_lut_as_array
+from petsird.helpers.columnar import get_module_type_pairs
+from petsird.helpers.geometry import get_detecting_element_centres
+
+# offsets of the tables in the segment are multiples of this (in bytes)
+_ALIGNMENT = 64
+
+
+def table_name(name: str, *types: int) -> str:
+    """Name of the table of a module-type (pair), e.g. `centres_0`"""
+    return "_".join([name] + [str(t) for t in types])
+
+
+def get_layout_tables(
+        scanner: petsird.ScannerInformation) -> dict[str, npt.NDArray]:
+    """Numbers of modules, elements per module and energy bins of all module-types
+
+    Together, these give the strides of a `DetectionBin`.
+    """
+    geometry = scanner.scanner_geometry
+    return {
+        "num_modules":
+        numpy.array([len(m.transforms) for m in geometry.replicated_modules],
+                    dtype=numpy.int64),
+        "num_elements":
+        numpy.array([
+            len(m.object.detecting_elements.transforms)
+            for m in geometry.replicated_modules
+        ],
+                    dtype=numpy.int64),
+        "num_energy_bins":
+        numpy.array(
+            [e.number_of_bins() for e in scanner.event_energy_bin_edges],
+            dtype=numpy.int64),
+    }
+
+
+def get_centre_tables(
+        scanner: petsird.ScannerInformation) -> dict[str, npt.NDArray]:
+    """Centres of all detecting elements, `centres_<type>` of shape (N, 3)"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    return {
+        table_name("centres", mtype):
+        get_detecting_element_centres(scanner, mtype).reshape(-1, 3)
+        for mtype in range(num_module_types)
+    }
+
+
+def get_module_pair_efficiency_values(
+        scanner: petsird.ScannerInformation,
+        type_of_module_pair: petsird.TypeOfModulePair) -> npt.NDArray:
+    """Return the module-pair efficiencies of a module-type pair as a dense array
+
+    The array is indexed by SGID and the detection bins (within their module) of
+    both detections.
+    """
+    mtype0, mtype1 = type_of_module_pair
+    efficiencies = scanner.detection_efficiencies
+    vectors = efficiencies.module_pair_efficiencies_vectors[mtype0][mtype1]
+    layout = get_layout_tables(scanner)
+    num_bins_in_module = layout["num_elements"] * layout["num_energy_bins"]
+    values = numpy.zeros(
+        (len(vectors), num_bins_in_module[mtype0], num_bins_in_module[mtype1]),
+        dtype=numpy.float32)
+    for vector in vectors:
+        values[vector.sgid] = vector.values
+    return values
+
+
+def get_efficiency_tables(
+        scanner: petsird.ScannerInformation) -> dict[str, npt.NDArray]:
+    """Detection efficiencies as dense arrays
+
+    The tables are `calibration_factor`, `detection_bin_efficiencies_<type>`,
+    `sgid_lut_<type0>_<type1>` (see `get_module_pair_sgid_lut_as_array`) and
+    `module_pair_efficiencies_<type0>_<type1>` (see
+    `get_module_pair_efficiency_values`). Efficiencies that are not stored (or
+    have size 0), and are therefore considered to be 1, are omitted.
+    """
+    efficiencies = scanner.detection_efficiencies
+    if efficiencies is None:
+        return {}
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    tables = {
+        "calibration_factor":
+        numpy.array(efficiencies.calibration_factor, dtype=numpy.float64)
+    }
+    if efficiencies.detection_bin_efficiencies is not None:
+        for mtype, values in enumerate(
+                efficiencies.detection_bin_efficiencies):
+            if len(values) > 0:
+                tables[table_name("detection_bin_efficiencies",
+                                  mtype)] = numpy.asarray(values)
+    if efficiencies.module_pair_efficiencies_vectors:
+        for pair in get_module_type_pairs(num_module_types):
+            tables[table_name("sgid_lut",
+                              *pair)] = get_module_pair_sgid_lut_as_array(
+                                  scanner, pair)
+            tables[table_name("module_pair_efficiencies",
+                              *pair)] = get_module_pair_efficiency_values(
+                                  scanner, pair)
+    return tables
+
+
+def get_tof_tables(
+        scanner: petsird.ScannerInformation) -> dict[str, npt.NDArray]:
+    """`tof_bin_edges_<type0>_<type1>` and `tof_resolution_<type0>_<type1>` (in mm)"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    tables = {}
+    for mtype0, mtype1 in get_module_type_pairs(num_module_types):
+        tables[table_name("tof_bin_edges", mtype0, mtype1)] = numpy.asarray(
+            scanner.tof_bin_edges[mtype0][mtype1].edges)
+        tables[table_name("tof_resolution", mtype0, mtype1)] = numpy.array(
+            scanner.tof_resolution[mtype0][mtype1], dtype=numpy.float32)
+    return tables
+
+
+def get_scanner_tables(
+        scanner: petsird.ScannerInformation) -> dict[str, npt.NDArray]:
+    """Return all derived tables of a scanner
+
+    See `get_layout_tables`, `get_centre_tables`, `get_efficiency_tables` and
+    `get_tof_tables`.
+    """
+    return {
+        **get_layout_tables(scanner),
+        **get_centre_tables(scanner),
+        **get_efficiency_tables(scanner),
+        **get_tof_tables(scanner)
+    }
+
+
+@dataclass(frozen=True)
+class SharedTablesHandle:
+    """Name and layout of a shared memory segment with tables (picklable)
+
+    `tables` lists the name, offset (in bytes), shape and dtype of every table.
+    """
+    segment: str
+    tables: tuple[tuple[str, int, tuple[int, ...], str], ...]
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # with a shared resource tracker, registering again has no effect
+    return shared_memory.SharedMemory(name=name)
+
+
+def _release(segment: shared_memory.SharedMemory, unlink: bool) -> None:
+    try:
+        segment.close()
+    except BufferError:
+        # arrays still refer to the segment, it is unmapped when they are freed
+        pass
+    if unlink:
+        segment.unlink()
+
+
+class SharedTables(Mapping):
+    """Read-only tables (NumPy arrays) in a shared memory segment
+
+    Use `publish_tables` or `attach_tables` to create instances. The arrays cannot
+    be used after `close`.
+    """
+
+    def __init__(self, handle: SharedTablesHandle,
+                 segment: shared_memory.SharedMemory, owner: bool):
+        self.handle = handle
+        self.owner = owner
+        self._tables = {}
+        for name, offset, shape, dtype in handle.tables:
+            array = numpy.ndarray(shape,
+                                  dtype=dtype,
+                                  buffer=segment.buf,
+                                  offset=offset)
+            array.flags.writeable = False
+            self._tables[name] = array
+        # also runs at exit of the interpreter
+        self._finalizer = weakref.finalize(self, _release, segment, owner)
+
+    def __getitem__(self, name: str) -> npt.NDArray:
+        return self._tables[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def close(self) -> None:
+        """Detach from the segment, and remove it if it was published here"""
+        self._tables = {}
+        self._finalizer()
+
+    def __enter__(self) -> "SharedTables":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def publish_tables(tables: Mapping[str, npt.ArrayLike]) -> SharedTables:
+    """Copy tables into a new shared memory segment"""
+    arrays = {name: numpy.asarray(table) for name, table in tables.items()}
+    layout = []
+    size = 0
+    for name, array in arrays.items():
+        layout.append((name, size, array.shape, array.dtype.str))
+        size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (_, offset, shape, dtype), array in zip(layout, arrays.values()):
+        numpy.ndarray(shape, dtype=dtype, buffer=segment.buf,
+                      offset=offset)[...] = array
+    return SharedTables(SharedTablesHandle(segment.name, tuple(layout)),
+                        segment,
+                        owner=True)
+
+
+def attach_tables(handle: SharedTablesHandle) -> SharedTables:
+    """Attach to tables published (by another process) with `publish_tables`"""
+    return SharedTables(handle, _attach_segment(handle.segment), owner=False)
+
+
+# tables of a worker process, see attach_in_worker
+_worker_tables: typing.Optional[SharedTables] = None
+
+
+def attach_in_worker(handle: SharedTablesHandle) -> None:
+    """Attach to tables in a worker process (e.g. as `initializer` of a pool)"""
+    global _worker_tables
+    _worker_tables = attach_tables(handle)
+
+
+def get_worker_tables() -> SharedTables:
+    """Return the tables attached with `attach_in_worker`"""
+    if _worker_tables is None:
+        raise RuntimeError("No tables attached in this process")
+    return _worker_tables
@@ -0,0 +1,424 @@
+"""
+Preliminary helpers for sorting singles into prompt and delayed coincidences
+
+Singles (see `SingleEventPolicy.ALL`) of consecutive event time blocks are merged
+into one time-ordered stream (of all module-types). Coincidences are formed with
+a non-extending coincidence window: a window opens at a single that is not
+inside the window of the previous opening, and contains all singles within
+`window` ps of it (also across time block boundaries). Openings are found
+without a Python loop over singles, with `searchsorted` and (for clusters of
+more than 2 singles) pointer doubling.
+
+Windows with more than 2 singles are handled according to the `CoincidencePolicy`:
+- `REJECT_HIGHER_MULTIPLES`: discarded
+- `MULTIPLES_AS_ALL_COINCIDENCES`: all pairs
+- `MULTIPLES_AS_SEQUENTIAL_COINCIDENCES`: consecutive pairs
+
+Delayed coincidences pair every opening single with the singles in a window of
+the same width, delayed by `delayed_offset` ps. If that window contains more
+than one single, the policy decides again: discarded, all pairs with the opening
+single, or only the pair with the first single.
+
+Coincidences are assigned to the time block of the opening single, detections
+are ordered, and the arrival time difference is binned with `tof_bin_edges` (see
+`petsird.helpers.encoder.group_coincidences`). Coincidences in module pairs
+that are not in coincidence (negative SGID) are discarded. By default, the
+coincidence window is the largest time difference allowed by the TOF bin edges.
+
+Usage:
+    python -m petsird.helpers.sorter -i singles.petsird -o coincidences.petsird
+    python -m petsird.helpers.sorter -i singles.petsird -o coincidences.petsird \\
+        --policy all --window 4000 --delayed-offset 100000
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import collections
+import copy
+import math
+import typing
+from collections.abc import Iterable, Iterator
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import (get_module_pair_sgid_lut_as_array,
+                             get_num_detection_bins)
+from petsird.helpers.columnar import (BLOCK_DTYPE, CoincidenceArrays,
+                                      ColumnarPETSIRD, get_module_type_pairs,
+                                      get_single_arrays)
+from petsird.helpers.encoder import SPEED_OF_LIGHT, group_coincidences
+from petsird.helpers.multiples import get_detection_pairs
+
+# time_offset_in_time_block is in ps, time intervals in ms
+_MS_TO_PS = 10**9
+
+POLICIES = {
+    "reject": petsird.CoincidencePolicy.REJECT_HIGHER_MULTIPLES,
+    "all": petsird.CoincidencePolicy.MULTIPLES_AS_ALL_COINCIDENCES,
+    "sequential":
+    petsird.CoincidencePolicy.MULTIPLES_AS_SEQUENTIAL_COINCIDENCES,
+}
+
+
+def get_coincidence_window(scanner: petsird.ScannerInformation) -> float:
+    """Return the largest arrival time difference (in ps) allowed by the TOF bin edges"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    max_distance = max(
+        numpy.max(numpy.abs(scanner.tof_bin_edges[mtype0][mtype1].edges))
+        for mtype0, mtype1 in get_module_type_pairs(num_module_types))
+    return float(max_distance) * 2 / SPEED_OF_LIGHT
+
+
+def get_window_ends(times: npt.NDArray[numpy.int64],
+                    window: float) -> npt.NDArray[numpy.int64]:
+    """Return the index after the last single in the window of every single"""
+    # integer arithmetic avoids rounding for large times
+    return numpy.searchsorted(times, times + math.floor(window), side="right")
+
+
+def get_window_openings(
+        window_ends: npt.NDArray[numpy.int64]) -> npt.NDArray[numpy.int64]:
+    """Find the singles that open a coincidence window
+
+    The first single opens a window, and every next opening is the first single
+    after the window of the previous one. Singles separated by more than the
+    window from the previous single always open a window. In between, the
+    chain of openings is followed for all clusters at once by pointer doubling.
+    """
+    num_singles = len(window_ends)
+    if num_singles == 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+    indices = numpy.arange(num_singles)
+    # first single of every cluster, i.e. not in the window of its predecessor
+    starts = indices[numpy.concatenate(
+        ([True], window_ends[:-1] == indices[1:]))]
+    # clusters of 1 or 2 singles only have one opening
+    stops = numpy.append(starts[1:], num_singles)
+    long_starts = starts[stops - starts > 2]
+    long_stops = stops[stops - starts > 2]
+    # jumps[k][i] is the opening 2**k windows after single i
+    jumps = [numpy.append(window_ends, num_singles)]
+    while numpy.any(jumps[-1][long_starts] < long_stops):
+        jumps.append(jumps[-1][jumps[-1]])
+    is_opening = numpy.zeros(num_singles + 1, dtype=bool)
+    is_opening[long_starts] = True
+    for jump in reversed(jumps):
+        is_opening[jump[numpy.flatnonzero(is_opening)]] = True
+    is_opening[starts] = True
+    return numpy.flatnonzero(is_opening[:num_singles])
+
+
+def get_prompt_pairs(
+    openings: npt.NDArray[numpy.int64], window_ends: npt.NDArray[numpy.int64],
+    policy: petsird.CoincidencePolicy
+) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64],
+           npt.NDArray[numpy.int64]]:
+    """Form prompt coincidences in the windows of `openings`
+
+    Returns the indices of the opening single and of both singles of every
+    coincidence, sorted by opening.
+    """
+    multiplicities = window_ends[openings] - openings
+    if policy == petsird.CoincidencePolicy.REJECT_HIGHER_MULTIPLES:
+        triggers = openings[multiplicities == 2]
+        return triggers, triggers, triggers + 1
+    triggers = []
+    firsts = []
+    seconds = []
+    # numpy.unique is slow for large arrays
+    present = numpy.flatnonzero(numpy.bincount(multiplicities))
+    for multiplicity in present[present >= 2]:
+        these_openings = openings[multiplicities == multiplicity]
+        for first, second in get_detection_pairs(int(multiplicity), policy):
+            triggers.append(these_openings)
+            firsts.append(these_openings + first)
+            seconds.append(these_openings + second)
+    if not triggers:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return empty, empty, empty
+    triggers = numpy.concatenate(triggers)
+    order = numpy.argsort(triggers, kind="stable")
+    return (triggers[order], numpy.concatenate(firsts)[order],
+            numpy.concatenate(seconds)[order])
+
+
+def get_delayed_pairs(
+    times: npt.NDArray[numpy.int64], openings: npt.NDArray[numpy.int64],
+    window: float, delayed_offset: float, policy: petsird.CoincidencePolicy
+) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64]]:
+    """Form delayed coincidences of `openings` with singles in the delayed window
+
+    Returns the indices of the opening single and of the delayed single of every
+    coincidence, sorted by opening.
+    """
+    delayed_times = times[openings] + math.ceil(delayed_offset)
+    starts = numpy.searchsorted(times, delayed_times, side="left")
+    counts = numpy.searchsorted(
+        times, delayed_times + math.floor(window), side="right") - starts
+    if policy == petsird.CoincidencePolicy.REJECT_HIGHER_MULTIPLES:
+        return openings[counts == 1], starts[counts == 1]
+    if policy == petsird.CoincidencePolicy.MULTIPLES_AS_SEQUENTIAL_COINCIDENCES:
+        return openings[counts >= 1], starts[counts >= 1]
+    if policy != petsird.CoincidencePolicy.MULTIPLES_AS_ALL_COINCIDENCES:
+        raise ValueError(f"Cannot form coincidences for {policy}")
+    triggers = numpy.repeat(openings, counts)
+    # position of every delayed single within the window of its opening
+    positions = numpy.arange(len(triggers)) - numpy.repeat(
+        numpy.cumsum(counts) - counts, counts)
+    return triggers, numpy.repeat(starts, counts) + positions
+
+
+class CoincidenceSorter:
+    """Sort the singles of consecutive event time blocks into coincidences
+
+    Event time blocks are added in time order, and returned (with prompts and
+    delayeds, but without singles) once all their coincidences are known. Singles
+    are processed in chunks of at least `chunk_size` singles.
+    """
+
+    def __init__(self,
+                 scanner: petsird.ScannerInformation,
+                 policy: petsird.CoincidencePolicy = petsird.CoincidencePolicy.
+                 REJECT_HIGHER_MULTIPLES,
+                 window: typing.Optional[float] = None,
+                 delayed_offset: typing.Optional[float] = None,
+                 chunk_size: int = 1 << 20):
+        if scanner.single_event_policy == petsird.SingleEventPolicy.NONE:
+            raise ValueError("Singles are not stored")
+        if policy == petsird.CoincidencePolicy.NONE:
+            raise ValueError(f"Cannot form coincidences for {policy}")
+        self.scanner = scanner
+        self.policy = policy
+        self.window = get_coincidence_window(
+            scanner) if window is None else window
+        self.delayed_offset = delayed_offset
+        self.chunk_size = chunk_size
+        # how far after an opening single we need to know all singles
+        self._reach = self.window + (delayed_offset or 0)
+        self._intervals = collections.deque()
+        self._columns = {"time": [], "det_bin": [], "type": [], "block": []}
+        self._num_singles = 0
+        self._num_blocks = 0
+        self._sgid_luts = {}
+        efficiencies = scanner.detection_efficiencies
+        if efficiencies.module_pair_sgidlut:
+            num_module_types = scanner.scanner_geometry.number_of_module_types(
+            )
+            num_bins_in_module = [
+                get_num_detection_bins(scanner, mtype) //
+                len(replicated_module.transforms)
+                for mtype, replicated_module in enumerate(
+                    scanner.scanner_geometry.replicated_modules)
+            ]
+            for pair in get_module_type_pairs(num_module_types):
+                self._sgid_luts[pair] = (get_module_pair_sgid_lut_as_array(
+                    scanner, pair), num_bins_in_module[pair[0]],
+                                         num_bins_in_module[pair[1]])
+
+    def add_event_time_block(
+        self, event_time_block: petsird.EventTimeBlock
+    ) -> list[petsird.EventTimeBlock]:
+        """Add the singles of a time block, and return all completed time blocks"""
+        time_interval = event_time_block.time_interval
+        self._intervals.append((self._num_blocks, time_interval))
+        for mtype, arrays in get_single_arrays(self.scanner,
+                                               event_time_block).items():
+            times = (time_interval.start * _MS_TO_PS +
+                     arrays.time_offset.astype(numpy.int64))
+            self._columns["time"].append(times)
+            self._columns["det_bin"].append(arrays.det_bin.astype(numpy.int64))
+            self._columns["type"].append(
+                numpy.full(len(arrays), mtype, dtype=numpy.int64))
+            self._columns["block"].append(
+                numpy.full(len(arrays), self._num_blocks, dtype=numpy.int64))
+            self._num_singles += len(arrays)
+        self._num_blocks += 1
+        if self._num_singles < self.chunk_size:
+            return []
+        # the windows of all singles before the cutoff are complete
+        stop = time_interval.stop * _MS_TO_PS
+        num_complete = sum(1 for _, interval in self._intervals
+                           if interval.stop * _MS_TO_PS + self._reach <= stop)
+        if num_complete == 0:
+            return []
+        return self._sort(num_complete)
+
+    def _remove_not_in_coincidence(
+            self, pair: tuple[int, int],
+            arrays: CoincidenceArrays) -> CoincidenceArrays:
+        """Discard events in module pairs with a negative SGID"""
+        if pair not in self._sgid_luts:
+            return arrays
+        lut, num_bins_in_module0, num_bins_in_module1 = self._sgid_luts[pair]
+        sgids = lut[arrays.det_bin0 // num_bins_in_module0,
+                    arrays.det_bin1 // num_bins_in_module1]
+        return arrays[sgids >= 0]
+
+    def flush(self) -> list[petsird.EventTimeBlock]:
+        """Return all remaining time blocks"""
+        return self._sort(len(self._intervals))
+
+    def _sort(self, num_blocks: int) -> list[petsird.EventTimeBlock]:
+        """Form all coincidences opening in the first `num_blocks` time blocks"""
+        if num_blocks == 0:
+            return []
+        columns = {
+            name:
+            numpy.concatenate(values)
+            if values else numpy.zeros(0, dtype=numpy.int64)
+            for name, values in self._columns.items()
+        }
+        # singles within a time block are not necessarily sorted, and singles
+        # with equal times are ordered by module-type and detection bin
+        order = numpy.lexsort((columns["det_bin"], columns["type"],
+                               columns["time"], columns["block"]))
+        columns = {name: values[order] for name, values in columns.items()}
+        times = columns["time"]
+
+        blocks = [self._intervals.popleft() for _ in range(num_blocks)]
+        last_block = blocks[-1][0]
+        window_ends = get_window_ends(times, self.window)
+        openings = get_window_openings(window_ends)
+        num_openings = numpy.searchsorted(columns["block"][openings],
+                                          last_block,
+                                          side="right")
+        # keep all singles from the next opening onwards
+        next_start = (openings[num_openings]
+                      if num_openings < len(openings) else len(times))
+        openings = openings[:num_openings]
+
+        def group(triggers, firsts, seconds, offset=0):
+            coincidences = group_coincidences(
+                self.scanner, columns["type"][firsts],
+                columns["det_bin"][firsts], columns["type"][seconds],
+                columns["det_bin"][seconds],
+                times[firsts] - (times[seconds] - offset),
+                columns["block"][triggers] - blocks[0][0])
+            return {
+                pair: self._remove_not_in_coincidence(pair, arrays)
+                for pair, arrays in coincidences.items()
+            }
+
+        prompts = group(*get_prompt_pairs(openings, window_ends, self.policy))
+        delayeds = {}
+        if self.delayed_offset is not None:
+            triggers, seconds = get_delayed_pairs(times, openings, self.window,
+                                                  self.delayed_offset,
+                                                  self.policy)
+            delayeds = group(triggers, triggers, seconds, self.delayed_offset)
+
+        self._columns = {
+            name: [values[next_start:]]
+            for name, values in columns.items()
+        }
+        self._num_singles = len(times) - next_start
+        block_array = numpy.zeros(len(blocks), dtype=BLOCK_DTYPE)
+        block_array["start"] = [interval.start for _, interval in blocks]
+        block_array["stop"] = [interval.stop for _, interval in blocks]
+        columnar = ColumnarPETSIRD(header=petsird.Header(scanner=self.scanner),
+                                   blocks=block_array,
+                                   prompts=prompts,
+                                   delayeds=delayeds,
+                                   singles={})
+        return [
+            columnar.get_event_time_block(index)
+            for index in range(len(blocks))
+        ]
+
+
+def sort_time_blocks(
+        sorter: CoincidenceSorter, time_blocks: Iterable[petsird.TimeBlock]
+) -> Iterator[petsird.TimeBlock]:
+    """Replace singles by coincidences in all event time blocks
+
+    Other time blocks are passed on in the same order.
+    """
+    # None for event time blocks that are not sorted yet
+    pending = collections.deque()
+    completed = collections.deque()
+
+    def ready() -> Iterator[petsird.TimeBlock]:
+        while pending and (pending[0] is not None or completed):
+            time_block = pending.popleft()
+            yield (petsird.TimeBlock.EventTimeBlock(completed.popleft())
+                   if time_block is None else time_block)
+
+    for time_block in time_blocks:
+        if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            pending.append(None)
+            completed.extend(sorter.add_event_time_block(time_block.value))
+        else:
+            pending.append(time_block)
+        yield from ready()
+    completed.extend(sorter.flush())
+    yield from ready()
+
+
+def sort(reader: petsird.PETSIRDReaderBase,
+         writer: petsird.PETSIRDWriterBase,
+         policy: petsird.CoincidencePolicy = petsird.CoincidencePolicy.
+         REJECT_HIGHER_MULTIPLES,
+         window: typing.Optional[float] = None,
+         delayed_offset: typing.Optional[float] = None,
+         chunk_size: int = 1 << 20) -> None:
+    """Write a copy of a PETSIRD stream with singles sorted into coincidences"""
+    header = reader.read_header()
+    sorter = CoincidenceSorter(header.scanner, policy, window, delayed_offset,
+                               chunk_size)
+    new_header = copy.copy(header)
+    new_header.scanner = copy.copy(header.scanner)
+    new_header.scanner.single_event_policy = petsird.SingleEventPolicy.NONE
+    new_header.scanner.prompt_event_policy = policy
+    new_header.scanner.delayed_event_policy = (
+        petsird.CoincidencePolicy.NONE if delayed_offset is None else policy)
+    writer.write_header(new_header)
+    writer.write_time_blocks(
+        sort_time_blocks(sorter, reader.read_time_blocks()))
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_sorter',
+        description='Sort singles of a PETSIRD file into coincidences')
+    parser.add_argument("-i",
+                        "--input",
+                        type=str,
+                        required=True,
+                        help="File to read from")
+    parser.add_argument("-o",
+                        "--output",
+                        type=str,
+                        required=True,
+                        help="File to write to")
+    parser.add_argument("--policy",
+                        choices=list(POLICIES),
+                        default="reject",
+                        help="Handling of windows with more than 2 singles")
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=None,
+        help="Coincidence window in ps (default: from the TOF bin edges)")
+    parser.add_argument(
+        "--delayed-offset",
+        type=float,
+        default=None,
+        help="Offset of the delayed window in ps (no delayeds if omitted)")
+    parser.add_argument("--chunk-size",
+                        type=int,
+                        default=1 << 20,
+                        help="Minimum number of singles sorted at once")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    with petsird.BinaryPETSIRDReader(args.input) as reader:
+        with petsird.BinaryPETSIRDWriter(args.output) as writer:
+            sort(reader, writer, POLICIES[args.policy], args.window,
+                 args.delayed_offset, args.chunk_size)
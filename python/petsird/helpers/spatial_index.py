@@ -0,0 +1,364 @@
+"""
+Preliminary helpers to find the volume (e.g. detecting element) containing a point
+
+This is the inverse of `petsird.helpers.geometry.get_detecting_box`, and can be
+used to convert (Monte Carlo) interaction positions to a `DetectionBin`.
+All volumes are put in a uniform grid of cells (stored sparsely), such that only a
+few volumes need to be tested for every point. Tests are vectorized over points.
+
+Example:
+    index = DetectingElementIndex(scanner)
+    type_of_module, module_index, element_index = index.query(positions)
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import math
+import typing
+from collections.abc import Sequence
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import make_detection_bins_from_arrays
+from petsird.helpers.geometry import (BOX_SHAPE_FACES,
+                                      get_detecting_box_corners,
+                                      mult_transforms, transform_coords,
+                                      transform_to_mat44)
+
+
+def get_box_planes(
+    corners: npt.NDArray[numpy.float32]
+) -> tuple[npt.NDArray[numpy.float64], npt.NDArray[numpy.float64]]:
+    """Find the face planes of (convex) boxes given their corners
+
+    `corners` has shape (N, 8, 3). Returns unit normals of shape (N, 6, 3) and
+    offsets of shape (N, 6), such that a point `p` is inside box `n` if
+    `normals[n] @ p <= offsets[n]`.
+    """
+    corners = numpy.asarray(corners, dtype=numpy.float64)
+    faces = corners[:, numpy.array(BOX_SHAPE_FACES)]  # (N, 6, 4, 3)
+    # cross product of the diagonals is robust for (planar) quadrilaterals
+    normals = numpy.cross(faces[:, :, 2] - faces[:, :, 0],
+                          faces[:, :, 3] - faces[:, :, 1])
+    normals /= numpy.linalg.norm(normals, axis=-1, keepdims=True)
+    offsets = numpy.einsum("nfi,nfi->nf", normals, faces.mean(axis=2))
+    # orient such that the centre of the box is inside
+    centres = corners.mean(axis=1)
+    outside = numpy.einsum("nfi,ni->nf", normals, centres) > offsets
+    normals[outside] *= -1
+    offsets[outside] *= -1
+    return normals, offsets
+
+
+def _get_annulus_mask(shape: petsird.AnnulusShape, mat44: npt.NDArray,
+                      points: npt.NDArray[numpy.float64]) -> npt.NDArray:
+    """Test if points are inside a (transformed) annulus"""
+    local = transform_coords(numpy.linalg.inv(mat44), points)
+    radius = numpy.hypot(local[:, 0], local[:, 1])
+    mask = ((radius >= shape.inner_radius) & (radius <= shape.outer_radius)
+            & (numpy.abs(local[:, 2]) <= shape.thickness / 2))
+    start, stop = shape.angular_range
+    span = stop - start
+    if span < 2 * math.pi:
+        angle = numpy.mod(
+            numpy.arctan2(local[:, 1], local[:, 0]) - start, 2 * math.pi)
+        mask &= angle <= span
+    return mask
+
+
+def _get_annulus_bounds(shape: petsird.AnnulusShape,
+                        mat44: npt.NDArray) -> npt.NDArray[numpy.float64]:
+    """Find an axis-aligned bounding box of a (transformed) annulus"""
+    r = shape.outer_radius
+    h = shape.thickness / 2
+    corners = numpy.array([(x, y, z) for x in (-r, r) for y in (-r, r)
+                           for z in (-h, h)])
+    coords = transform_coords(mat44, corners)
+    return numpy.stack((coords.min(axis=0), coords.max(axis=0)))
+
+
+class VolumeIndex:
+    """Spatial index over boxes and annuli
+
+    Volumes are numbered in the order given, boxes first, unless `labels` are given.
+    """
+
+    def __init__(self,
+                 box_corners: npt.ArrayLike,
+                 annuli: Sequence[tuple[petsird.AnnulusShape,
+                                        npt.NDArray[numpy.float32]]] = (),
+                 cell_size: typing.Optional[float] = None,
+                 tolerance: float = 1e-4,
+                 labels: typing.Optional[npt.ArrayLike] = None):
+        """Create the index
+
+        `box_corners` has shape (num_boxes, 8, 3). `annuli` is a list of shapes with
+        their 4x4 transformation. If `cell_size` (in mm) is not given, cells get
+        the median volume of the bounding boxes. `tolerance` (in mm) is used to
+        include points on the boundary of a box. `labels` (one for each volume)
+        are returned by `query` instead of the volume index.
+        """
+        box_corners = numpy.asarray(box_corners,
+                                    dtype=numpy.float64).reshape(-1, 8, 3)
+        self.num_boxes = len(box_corners)
+        self.annuli = list(annuli)
+        self.tolerance = tolerance
+        self._normals, self._offsets = get_box_planes(box_corners)
+        self.labels = (None if labels is None else numpy.asarray(
+            labels, dtype=numpy.int64))
+
+        box_bounds = numpy.stack(
+            (box_corners.min(axis=1), box_corners.max(axis=1)), axis=1)
+        annulus_bounds = [
+            _get_annulus_bounds(shape, mat44) for shape, mat44 in self.annuli
+        ]
+        bounds = numpy.concatenate(
+            (box_bounds, numpy.reshape(annulus_bounds, (-1, 2, 3))))
+        if len(bounds) == 0:
+            raise ValueError("Cannot create an index without volumes")
+        self.num_volumes = len(bounds)
+        if cell_size is None:
+            # cubic cells with the median volume of the bounding boxes
+            cell_size = float(
+                numpy.median(numpy.prod(bounds[:, 1] - bounds[:, 0],
+                                        axis=1)))**(1 / 3)
+        self.cell_size = max(cell_size, tolerance)
+        self._origin = bounds[:, 0].min(axis=0) - tolerance
+        lo = self._get_cells(bounds[:, 0] - tolerance)
+        hi = self._get_cells(bounds[:, 1] + tolerance)
+        self._dims = hi.max(axis=0) + 1
+        self._build_cells(lo, hi)
+
+    def _get_cells(
+            self,
+            points: npt.NDArray[numpy.float64]) -> npt.NDArray[numpy.int64]:
+        return numpy.floor(
+            (points - self._origin) / self.cell_size).astype(numpy.int64)
+
+    def _ravel(self,
+               cells: npt.NDArray[numpy.int64]) -> npt.NDArray[numpy.int64]:
+        return (cells[:, 0] * self._dims[1] +
+                cells[:, 1]) * self._dims[2] + cells[:, 2]
+
+    def _build_cells(self, lo: npt.NDArray[numpy.int64],
+                     hi: npt.NDArray[numpy.int64]) -> None:
+        """Enumerate all (cell, volume) pairs and sort them by cell"""
+        sizes = hi - lo + 1
+        counts = sizes.prod(axis=1)
+        volume_ids = numpy.repeat(numpy.arange(len(counts)), counts)
+        # index of the cell within the range of cells of its volume
+        local = (numpy.arange(counts.sum()) -
+                 numpy.repeat(numpy.cumsum(counts) - counts, counts))
+        vol_sizes = sizes[volume_ids]
+        offsets = numpy.stack((local // (vol_sizes[:, 1] * vol_sizes[:, 2]),
+                               (local // vol_sizes[:, 2]) % vol_sizes[:, 1],
+                               local % vol_sizes[:, 2]),
+                              axis=1)
+        cell_ids = self._ravel(lo[volume_ids] + offsets)
+        order = numpy.lexsort((volume_ids, cell_ids))
+        cell_ids = cell_ids[order]
+        self._volume_ids = volume_ids[order]
+        self._cell_ids, self._cell_starts = numpy.unique(cell_ids,
+                                                         return_index=True)
+        self._cell_starts = numpy.append(self._cell_starts, len(cell_ids))
+
+    def get_candidates(
+        self, points: npt.NDArray[numpy.float64]
+    ) -> tuple[npt.NDArray[numpy.intp], npt.NDArray[numpy.int64]]:
+        """Find all (point, volume) pairs where the point is in a cell of the volume
+
+        Returns arrays of point and volume indices.
+        """
+        cells = self._get_cells(points)
+        in_grid = numpy.all((cells >= 0) & (cells < self._dims), axis=1)
+        cell_ids = self._ravel(numpy.where(in_grid[:, None], cells, 0))
+        pos = numpy.searchsorted(self._cell_ids, cell_ids)
+        pos = numpy.minimum(pos, len(self._cell_ids) - 1)
+        found = in_grid & (self._cell_ids[pos] == cell_ids)
+        starts = self._cell_starts[pos]
+        counts = numpy.where(found, self._cell_starts[pos + 1] - starts, 0)
+        point_ids = numpy.repeat(numpy.arange(len(points)), counts)
+        local = (numpy.arange(counts.sum()) -
+                 numpy.repeat(numpy.cumsum(counts) - counts, counts))
+        return point_ids, self._volume_ids[numpy.repeat(starts, counts) +
+                                           local]
+
+    def get_overlap_candidates(
+            self) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64]]:
+        """Find all pairs of volumes that share at least one cell
+
+        Returns arrays `first < second` of volume indices, sorted and without
+        duplicates. Volumes that do not share a cell cannot overlap.
+        """
+        counts = numpy.diff(self._cell_starts)
+        # pair every entry with the later entries in the same cell
+        cell_of_entry = numpy.repeat(numpy.arange(len(counts)), counts)
+        later = self._cell_starts[cell_of_entry + 1] - numpy.arange(
+            len(self._volume_ids)) - 1
+        entries = numpy.repeat(numpy.arange(len(self._volume_ids)), later)
+        local = (numpy.arange(later.sum()) -
+                 numpy.repeat(numpy.cumsum(later) - later, later))
+        first = self._volume_ids[entries]
+        second = self._volume_ids[entries + 1 + local]
+        # volumes are sorted within a cell, such that first < second
+        keys = first * self.num_volumes + second
+        keys.sort()
+        keys = keys[numpy.diff(keys, prepend=-1) != 0]
+        return keys // self.num_volumes, keys % self.num_volumes
+
+    def _contains(self, point_ids: npt.NDArray[numpy.intp],
+                  volume_ids: npt.NDArray[numpy.int64],
+                  points: npt.NDArray[numpy.float64]) -> npt.NDArray:
+        """Test if points are inside volumes (pairwise)"""
+        inside = numpy.zeros(len(point_ids), dtype=bool)
+        is_box = volume_ids < self.num_boxes
+        box_ids = volume_ids[is_box]
+        distances = numpy.einsum("nfi,ni->nf", self._normals[box_ids],
+                                 points[point_ids[is_box]])
+        inside[is_box] = numpy.all(distances
+                                   <= self._offsets[box_ids] + self.tolerance,
+                                   axis=1)
+        for annulus in numpy.unique(volume_ids[~is_box]):
+            shape, mat44 = self.annuli[annulus - self.num_boxes]
+            sel = volume_ids == annulus
+            inside[sel] = _get_annulus_mask(shape, mat44,
+                                            points[point_ids[sel]])
+        return inside
+
+    def query(self,
+              points: npt.ArrayLike,
+              chunk_size: int = 1000000) -> npt.NDArray[numpy.int64]:
+        """Find the (first) volume containing every point
+
+        `points` has shape (N, 3). Returns volume indices or labels (-1 if outside
+        all volumes). Points are processed in chunks to limit memory usage.
+        """
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+        result = numpy.full(len(points), -1, dtype=numpy.int64)
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            point_ids, volume_ids = self.get_candidates(chunk)
+            inside = self._contains(point_ids, volume_ids, chunk)
+            # candidates are sorted by volume for every point, keep the first
+            hit_points, first = numpy.unique(point_ids[inside],
+                                             return_index=True)
+            result[start + hit_points] = volume_ids[inside][first]
+        if self.labels is not None:
+            result[result >= 0] = self.labels[result[result >= 0]]
+        return result
+
+
+class DetectingElementIndex:
+    """Find the detecting elements containing given points"""
+
+    def __init__(self,
+                 scanner: petsird.ScannerInformation,
+                 cell_size: typing.Optional[float] = None,
+                 tolerance: float = 1e-4):
+        self.scanner = scanner
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        corners = [
+            get_detecting_box_corners(scanner, mtype)
+            for mtype in range(num_module_types)
+        ]
+        self._num_elements = numpy.array([c.shape[1] for c in corners])
+        sizes = numpy.array([c.shape[0] * c.shape[1] for c in corners])
+        self._type_starts = numpy.concatenate(([0], numpy.cumsum(sizes)))
+        self.volume_index = VolumeIndex(numpy.concatenate(
+            [c.reshape(-1, 8, 3) for c in corners]),
+                                        cell_size=cell_size,
+                                        tolerance=tolerance)
+
+    def query(
+        self, points: npt.ArrayLike
+    ) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64],
+               npt.NDArray[numpy.int64]]:
+        """Find type_of_module, module_index and element_index for every point
+
+        All are -1 for points outside all detecting elements.
+        """
+        volume_ids = self.volume_index.query(points)
+        hit = volume_ids >= 0
+        type_of_module = numpy.full(len(volume_ids), -1, dtype=numpy.int64)
+        type_of_module[hit] = numpy.searchsorted(
+            self._type_starts, volume_ids[hit], side="right") - 1
+        local = volume_ids - self._type_starts[numpy.maximum(
+            type_of_module, 0)]
+        num_elements = self._num_elements[numpy.maximum(type_of_module, 0)]
+        module_index = numpy.where(hit, local // num_elements, -1)
+        element_index = numpy.where(hit, local % num_elements, -1)
+        return type_of_module, module_index, element_index
+
+    def get_detection_bins(
+        self,
+        points: npt.ArrayLike,
+        energy_index: npt.ArrayLike = 0
+    ) -> tuple[npt.NDArray[numpy.int64], npt.NDArray[numpy.int64]]:
+        """Find type_of_module and DetectionBin for every point
+
+        Both are -1 for points outside all detecting elements.
+        """
+        type_of_module, module_index, element_index = self.query(points)
+        energy_index = numpy.broadcast_to(energy_index, type_of_module.shape)
+        detection_bins = numpy.full(len(type_of_module), -1, dtype=numpy.int64)
+        for mtype in numpy.unique(type_of_module[type_of_module >= 0]):
+            sel = type_of_module == mtype
+            detection_bins[sel] = make_detection_bins_from_arrays(
+                self.scanner, int(mtype), module_index[sel],
+                element_index[sel], energy_index[sel])
+        return type_of_module, detection_bins
+
+
+def get_non_detecting_volumes(
+    scanner: petsird.ScannerInformation
+) -> list[tuple[petsird.GenericSolidVolume, npt.NDArray[numpy.float32]]]:
+    """List all non-detecting volumes with their 4x4 transformation
+
+    This includes the `ScannerGeometry.non_detecting_volumes` and the
+    non-detecting elements of all modules.
+    """
+    identity = numpy.eye(4, dtype=numpy.float32)
+    volumes = [
+        (volume, identity)
+        for volume in (scanner.scanner_geometry.non_detecting_volumes or [])
+    ]
+    for rep_module in scanner.scanner_geometry.replicated_modules:
+        for mod_transform in rep_module.transforms:
+            for rep_volume in rep_module.object.non_detecting_elements:
+                for transform in rep_volume.transforms:
+                    volumes.append(
+                        (rep_volume.object,
+                         transform_to_mat44(
+                             mult_transforms([mod_transform, transform]))))
+    return volumes
+
+
+def get_generic_volume_index(
+        volumes: Sequence[tuple[petsird.GenericSolidVolume,
+                                npt.NDArray[numpy.float32]]],
+        cell_size: typing.Optional[float] = None) -> VolumeIndex:
+    """Create an index for generic volumes (e.g. from get_non_detecting_volumes)
+
+    `VolumeIndex.query` will return indices into the `volumes` list.
+    """
+    is_box = [
+        isinstance(v.shape, petsird.GeometricShape.BoxShape)
+        for v, _ in volumes
+    ]
+    box_corners = [
+        transform_coords(mat44,
+                         numpy.array([c.c for c in v.shape.value.corners]))
+        for (v, mat44), box in zip(volumes, is_box) if box
+    ]
+    annuli = [(v.shape.value, mat44)
+              for (v, mat44), box in zip(volumes, is_box) if not box]
+    labels = ([i for i, box in enumerate(is_box) if box] +
+              [i for i, box in enumerate(is_box) if not box])
+    return VolumeIndex(numpy.array(box_corners).reshape(-1, 8, 3),
+                       annuli,
+                       cell_size=cell_size,
+                       labels=labels)
@@ -0,0 +1,221 @@
+"""
+Preliminary helpers for random subsampling ("thinning") of PETSIRD list-mode data
+
+Every event (prompt, delayed, single, triple or quadruple) is kept independently
+with probability `fraction`. This is statistically equivalent to an acquisition
+with a detection efficiency that is `fraction` times lower. Therefore, by default
+the `calibration_factor` in the header is scaled accordingly.
+When asking for several subsets, every event is assigned to at most one of them,
+such that the subsets are disjoint (e.g. for bootstrap replicates).
+
+Usage:
+    python -m petsird.helpers.subsample -i test.petsird -o test_1pct.petsird -f 0.01
+    python -m petsird.helpers.subsample -i test.petsird -o test.petsird -f 0.1 -k 5
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import contextlib
+import os
+import sys
+import typing
+from collections.abc import Callable, Sequence
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers.columnar import (arrays_to_coincidence_events,
+                                      arrays_to_multiple_events,
+                                      arrays_to_single_events,
+                                      get_coincidence_arrays,
+                                      get_multiple_arrays, get_single_arrays,
+                                      nest_by_module_types)
+
+
+def count_prompts(reader: petsird.PETSIRDReaderBase) -> int:
+    """Count all prompt events in a PETSIRD stream"""
+    header = reader.read_header()
+    num_module_types = header.scanner.scanner_geometry.number_of_module_types()
+    if header.scanner.prompt_event_policy == petsird.CoincidencePolicy.NONE:
+        num_module_types = 0
+    num_prompts = 0
+    for time_block in reader.read_time_blocks():
+        if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            prompt_events = time_block.value.prompt_events
+            num_prompts += sum(
+                len(prompt_events[mtype0][mtype1])
+                for mtype0 in range(num_module_types)
+                for mtype1 in range(mtype0 + 1))
+    return num_prompts
+
+
+def _split_event_time_block(
+    scanner: petsird.ScannerInformation,
+    event_time_block: petsird.EventTimeBlock, num_subsets: int,
+    get_subsets: Callable[[int], npt.NDArray[numpy.int64]]
+) -> list[petsird.EventTimeBlock]:
+    """Split the events of a time block over `num_subsets` time blocks
+
+    `get_subsets` returns the subset of every event in a list of a given length,
+    where events with a subset >= `num_subsets` are dropped.
+    """
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    subsets = [
+        petsird.EventTimeBlock(time_interval=event_time_block.time_interval)
+        for _ in range(num_subsets)
+    ]
+    for kind, num_detections in (("prompts", 2), ("delayeds", 2),
+                                 ("triples", 3), ("quadruples", 4)):
+        if num_detections == 2:
+            arrays = get_coincidence_arrays(scanner, event_time_block, kind)
+            to_events = arrays_to_coincidence_events
+        else:
+            arrays = get_multiple_arrays(scanner, event_time_block, kind)
+            to_events = arrays_to_multiple_events
+        if not arrays:
+            continue
+        assigned = {types: get_subsets(len(a)) for types, a in arrays.items()}
+        for k, subset in enumerate(subsets):
+            events = {
+                types: to_events(a[assigned[types] == k])
+                for types, a in arrays.items()
+            }
+            setattr(
+                subset, f"{kind[:-1]}_events",
+                nest_by_module_types(num_module_types, num_detections,
+                                     events.__getitem__))
+    singles = get_single_arrays(scanner, event_time_block)
+    if singles:
+        assigned = {mtype: get_subsets(len(a)) for mtype, a in singles.items()}
+        for k, subset in enumerate(subsets):
+            subset.single_events = [
+                arrays_to_single_events(singles[mtype][assigned[mtype] == k])
+                for mtype in range(num_module_types)
+            ]
+    return subsets
+
+
+def subsample(reader: petsird.PETSIRDReaderBase,
+              writers: Sequence[petsird.PETSIRDWriterBase],
+              fraction: float,
+              seed: typing.Optional[int] = None,
+              scale_calibration_factor: bool = True) -> None:
+    """Write disjoint random subsets of a PETSIRD stream (one per writer)
+
+    Each event is assigned to subset `k` with probability `fraction`, and to
+    none of them with probability `1 - len(writers) * fraction`.
+    Time blocks that do not contain events are copied to all writers.
+    """
+    num_subsets = len(writers)
+    if not (fraction > 0 and num_subsets * fraction <= 1):
+        raise ValueError(
+            f"Cannot draw {num_subsets} disjoint subsets with fraction {fraction}"
+        )
+    rng = numpy.random.default_rng(seed)
+
+    def get_subsets(num_events: int) -> npt.NDArray[numpy.int64]:
+        return (rng.random(num_events) / fraction).astype(numpy.int64)
+
+    header = reader.read_header()
+    if scale_calibration_factor:
+        header.scanner.detection_efficiencies.calibration_factor *= fraction
+    for writer in writers:
+        writer.write_header(header)
+    for time_block in reader.read_time_blocks():
+        if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            subsets = [
+                petsird.TimeBlock.EventTimeBlock(b)
+                for b in _split_event_time_block(
+                    header.scanner, time_block.value, num_subsets, get_subsets)
+            ]
+        else:
+            subsets = [time_block] * num_subsets
+        for writer, subset in zip(writers, subsets):
+            writer.write_time_blocks((subset, ))
+    for writer in writers:
+        # an input without time blocks gives (valid) empty subsets
+        writer.write_time_blocks(())
+
+
+def get_subset_filename(filename: str, subset: int, num_subsets: int) -> str:
+    """Insert the subset number before the extension (if there is more than 1)"""
+    if num_subsets == 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{subset}{ext}"
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_subsample',
+        description='Write random subsets of the events in a PETSIRD file')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File to read from, or stdin if omitted",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        required=True,
+        help="File to write to (_<subset> is appended for several subsets)",
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("-f",
+                       "--fraction",
+                       type=float,
+                       help="Probability to keep an event")
+    group.add_argument(
+        "-c",
+        "--count",
+        type=int,
+        help="Expected number of prompts to keep (needs an extra pass)")
+    parser.add_argument("-k",
+                        "--subsets",
+                        type=int,
+                        default=1,
+                        help="Number of disjoint subsets")
+    parser.add_argument("-s",
+                        "--seed",
+                        type=int,
+                        default=None,
+                        help="Seed for the random number generator")
+    parser.add_argument("--keep-calibration-factor",
+                        action='store_true',
+                        help="Do not scale the calibration factor")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    fraction = args.fraction
+    if args.count is not None:
+        if args.input is None:
+            sys.exit("--count needs an input file")
+        with petsird.BinaryPETSIRDReader(args.input) as reader:
+            num_prompts = count_prompts(reader)
+        if num_prompts == 0:
+            sys.exit("Input file does not contain any prompts")
+        fraction = args.count / num_prompts
+    file = sys.stdin.buffer if args.input is None else args.input
+    with contextlib.ExitStack() as stack:
+        writers = [
+            stack.enter_context(
+                petsird.BinaryPETSIRDWriter(
+                    get_subset_filename(args.output, k, args.subsets)))
+            for k in range(args.subsets)
+        ]
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            subsample(
+                reader,
+                writers,
+                fraction,
+                seed=args.seed,
+                scale_calibration_factor=not args.keep_calibration_factor)
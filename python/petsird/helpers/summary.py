@@ -0,0 +1,358 @@
+"""
+Preliminary helpers for a fast (vectorized) summary of a PETSIRD stream
+
+A `Summary` accumulates, from columnar event arrays (see
+`petsird.helpers.columnar`),
+- counts per module-type pair (prompts and delayeds) and module-type (singles)
+- energy histograms and per-module count maps per module-type
+- TOF histograms per module-type pair
+- counts per time block
+- the average detection-bin efficiency of the events
+Summaries are mergeable, and can be written as JSON (see `Summary.to_dict`),
+together with statistics of the detection efficiencies in the header.
+
+Usage:
+    python -m petsird.helpers.analysis --summary -i test.petsird
+    python -m petsird.helpers.analysis --summary -i test_columns -o summary.json
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import typing
+from collections.abc import Iterable, Sequence
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import expand_detection_bins_as_arrays
+from petsird.helpers.columnar import (COINCIDENCE_KINDS, CoincidenceArrays,
+                                      ColumnarPETSIRD, SingleArrays,
+                                      get_coincidence_arrays,
+                                      get_module_type_pairs, get_single_arrays)
+
+KINDS = COINCIDENCE_KINDS + ("singles", )
+# number of events processed at once for (memory-mapped) columnar data
+CHUNK_SIZE = 1 << 22
+
+
+def format_key(key: typing.Union[int, tuple]) -> str:
+    """Format a module-type (pair) as "<type>" (or "<type0>_<type1>")"""
+    return "_".join(
+        str(k) for k in (key if isinstance(key, tuple) else (key, )))
+
+
+def get_time_intervals(
+        time_intervals: Sequence[tuple[int, int]]) -> npt.NDArray[numpy.int64]:
+    """Return (start, stop) of time blocks (in ms) with shape (num_blocks, 2)"""
+    return numpy.array(time_intervals, dtype=numpy.int64).reshape(-1, 2)
+
+
+def get_durations(
+        intervals: npt.NDArray[numpy.int64]) -> npt.NDArray[numpy.float64]:
+    """Return the durations (in s) of time intervals from `get_time_intervals`"""
+    return (intervals[:, 1] - intervals[:, 0]) / 1000
+
+
+def get_rates(counts: npt.NDArray[numpy.int64],
+              durations: npt.NDArray[numpy.float64]) -> npt.NDArray:
+    """Divide counts per time block (first axis) by the durations (in s)
+
+    Rates are in counts per second (and 0 for time blocks without duration).
+    """
+    durations = durations.reshape((-1, ) + (1, ) * (counts.ndim - 1))
+    return numpy.divide(counts,
+                        durations,
+                        out=numpy.zeros(counts.shape),
+                        where=durations > 0)
+
+
+def _statistics(values: npt.ArrayLike) -> dict[str, float]:
+    values = numpy.asarray(values, dtype=numpy.float64).reshape(-1)
+    if len(values) == 0:
+        return {"size": 0}
+    return {
+        "size": len(values),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "num_zeros": int(numpy.count_nonzero(values == 0)),
+    }
+
+
+def get_efficiency_statistics(scanner: petsird.ScannerInformation) -> dict:
+    """Summarise the detection efficiencies in the header"""
+    efficiencies = scanner.detection_efficiencies
+    if efficiencies is None:
+        return {}
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    result = {"calibration_factor": efficiencies.calibration_factor}
+    # empty lists (the yardl default) mean that efficiencies are absent, and
+    # per-type lists of size 0 are skipped
+    if efficiencies.detection_bin_efficiencies:
+        result["detection_bin_efficiencies"] = {
+            format_key(mtype):
+            _statistics(efficiencies.detection_bin_efficiencies[mtype])
+            for mtype in range(num_module_types)
+            if len(efficiencies.detection_bin_efficiencies[mtype]) > 0
+        }
+    if efficiencies.module_pair_efficiencies_vectors:
+        result["module_pair_efficiencies"] = {
+            format_key(pair):
+            _statistics(
+                numpy.concatenate([
+                    numpy.asarray(e.values).reshape(-1)
+                    for e in efficiencies.module_pair_efficiencies_vectors[
+                        pair[0]][pair[1]]
+                ] or [numpy.zeros(0)]))
+            for pair in get_module_type_pairs(num_module_types)
+        }
+    return result
+
+
+class Summary:
+    """Accumulator for the summary of a PETSIRD stream
+
+    Histograms are NumPy arrays indexed by kind ("prompts", "delayeds" or
+    "singles") and then module-type pair (coincidences) or module-type (energy
+    histograms, module counts and singles).
+    """
+
+    def __init__(self, scanner: petsird.ScannerInformation):
+        self.scanner = scanner
+        num_module_types = scanner.scanner_geometry.number_of_module_types()
+        rep_modules = scanner.scanner_geometry.replicated_modules
+        self.pairs = get_module_type_pairs(num_module_types)
+        self.types = list(range(num_module_types))
+        self.num_events = {kind: {} for kind in KINDS}
+        self.tof_histograms = {kind: {} for kind in COINCIDENCE_KINDS}
+        self.efficiency_sums = {kind: {} for kind in COINCIDENCE_KINDS}
+        for kind in COINCIDENCE_KINDS:
+            for pair in self.pairs:
+                self.num_events[kind][pair] = 0
+                self.tof_histograms[kind][pair] = numpy.zeros(
+                    scanner.tof_bin_edges[pair[0]][pair[1]].number_of_bins(),
+                    dtype=numpy.int64)
+                self.efficiency_sums[kind][pair] = 0.0
+        self.num_events["singles"] = dict.fromkeys(self.types, 0)
+        self.energy_histograms = {
+            kind: {
+                mtype:
+                numpy.zeros(
+                    scanner.event_energy_bin_edges[mtype].number_of_bins(),
+                    dtype=numpy.int64)
+                for mtype in self.types
+            }
+            for kind in KINDS
+        }
+        self.module_counts = {
+            kind: {
+                mtype:
+                numpy.zeros(len(rep_modules[mtype].transforms),
+                            dtype=numpy.int64)
+                for mtype in self.types
+            }
+            for kind in KINDS
+        }
+        # time interval (in ms) and number of events of every time block
+        self.time_intervals = []
+        self.block_counts = {kind: [] for kind in KINDS}
+        efficiencies = scanner.detection_efficiencies
+        # efficiencies of size 0 are considered to be 1 (and stored as None)
+        self._detection_bin_efficiencies = (
+            None if efficiencies is None
+            or not efficiencies.detection_bin_efficiencies else [
+                numpy.asarray(e, dtype=numpy.float64) if len(e) > 0 else None
+                for e in efficiencies.detection_bin_efficiencies
+            ])
+
+    def _add_detections(self, kind: str, mtype: int,
+                        det_bins: npt.NDArray) -> None:
+        modules, _, energies = expand_detection_bins_as_arrays(
+            self.scanner, mtype, det_bins)
+        histogram = self.energy_histograms[kind][mtype]
+        histogram += numpy.bincount(energies, minlength=len(histogram))
+        counts = self.module_counts[kind][mtype]
+        counts += numpy.bincount(modules, minlength=len(counts))
+
+    def add_coincidences(self, kind: str, pair: tuple[int, int],
+                         arrays: CoincidenceArrays) -> None:
+        """Add coincidences (ignoring the `block` column)"""
+        self.num_events[kind][pair] += len(arrays)
+        histogram = self.tof_histograms[kind][pair]
+        histogram += numpy.bincount(arrays.tof_idx, minlength=len(histogram))
+        self._add_detections(kind, pair[0], arrays.det_bin0)
+        self._add_detections(kind, pair[1], arrays.det_bin1)
+        if self._detection_bin_efficiencies is None:
+            return
+        factors = [
+            efficiencies[det_bins] for efficiencies, det_bins in (
+                (self._detection_bin_efficiencies[pair[0]], arrays.det_bin0),
+                (self._detection_bin_efficiencies[pair[1]], arrays.det_bin1))
+            if efficiencies is not None
+        ]
+        if len(factors) == 2:
+            efficiency_sum = numpy.dot(*factors)
+        elif factors:
+            efficiency_sum = factors[0].sum()
+        else:
+            efficiency_sum = len(arrays)
+        self.efficiency_sums[kind][pair] += float(efficiency_sum)
+
+    def add_singles(self, type_of_module: int, arrays: SingleArrays) -> None:
+        """Add singles (ignoring the `block` column)"""
+        self.num_events["singles"][type_of_module] += len(arrays)
+        self._add_detections("singles", type_of_module, arrays.det_bin)
+
+    def add_event_time_block(self,
+                             event_time_block: petsird.EventTimeBlock) -> None:
+        time_interval = event_time_block.time_interval
+        self.time_intervals.append((time_interval.start, time_interval.stop))
+        for kind in COINCIDENCE_KINDS:
+            num_events = 0
+            for pair, arrays in get_coincidence_arrays(self.scanner,
+                                                       event_time_block,
+                                                       kind).items():
+                self.add_coincidences(kind, pair, arrays)
+                num_events += len(arrays)
+            self.block_counts[kind].append(num_events)
+        num_events = 0
+        for mtype, arrays in get_single_arrays(self.scanner,
+                                               event_time_block).items():
+            self.add_singles(mtype, arrays)
+            num_events += len(arrays)
+        self.block_counts["singles"].append(num_events)
+
+    def accumulate(self, time_blocks: Iterable[petsird.TimeBlock]) -> None:
+        """Add all event time blocks"""
+        for time_block in time_blocks:
+            if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+                self.add_event_time_block(time_block.value)
+
+    def add_columnar(self,
+                     columnar: ColumnarPETSIRD,
+                     chunk_size: int = CHUNK_SIZE) -> None:
+        """Add all events of a columnar export (in chunks of `chunk_size`)"""
+        num_blocks = len(columnar.blocks)
+        self.time_intervals.extend(
+            zip(columnar.blocks["start"].tolist(),
+                columnar.blocks["stop"].tolist()))
+        block_counts = {
+            kind: numpy.zeros(num_blocks, dtype=numpy.int64)
+            for kind in KINDS
+        }
+        for kind, events in (("prompts", columnar.prompts),
+                             ("delayeds", columnar.delayeds),
+                             ("singles", columnar.singles)):
+            for key, arrays in events.items():
+                for start in range(0, len(arrays), chunk_size):
+                    chunk = arrays[start:start + chunk_size]
+                    if kind == "singles":
+                        self.add_singles(key, chunk)
+                    else:
+                        self.add_coincidences(kind, key, chunk)
+                    block_counts[kind] += numpy.bincount(chunk.block,
+                                                         minlength=num_blocks)
+        for kind in KINDS:
+            self.block_counts[kind].extend(block_counts[kind].tolist())
+
+    def merge(self, other: "Summary") -> None:
+        """Add the results of another `Summary` (of subsequent time blocks)"""
+        for kind in KINDS:
+            for key in self.num_events[kind]:
+                self.num_events[kind][key] += other.num_events[kind][key]
+            for mtype in self.types:
+                self.energy_histograms[kind][mtype] += (
+                    other.energy_histograms[kind][mtype])
+                self.module_counts[kind][mtype] += (
+                    other.module_counts[kind][mtype])
+            self.block_counts[kind].extend(other.block_counts[kind])
+        for kind in COINCIDENCE_KINDS:
+            for pair in self.pairs:
+                self.tof_histograms[kind][pair] += (
+                    other.tof_histograms[kind][pair])
+                self.efficiency_sums[kind][pair] += (
+                    other.efficiency_sums[kind][pair])
+        self.time_intervals.extend(other.time_intervals)
+
+    def _get_mean_energy(self, kind: str,
+                         mtype: int) -> typing.Optional[float]:
+        histogram = self.energy_histograms[kind][mtype]
+        if histogram.sum() == 0:
+            return None
+        edges = numpy.asarray(self.scanner.event_energy_bin_edges[mtype].edges)
+        return float(
+            numpy.dot(histogram,
+                      (edges[1:] + edges[:-1]) / 2) / histogram.sum())
+
+    def to_dict(self) -> dict:
+        """Return the summary as a JSON-serialisable dictionary
+
+        Keys are formatted with `format_key`, and rates are computed with
+        `get_rates`.
+        """
+        intervals = get_time_intervals(self.time_intervals)
+        durations = get_durations(intervals)
+        result = {
+            "scanner": self.scanner.model_name,
+            "num_time_blocks": len(intervals),
+            "duration_s": float(durations.sum()),
+            "efficiencies": get_efficiency_statistics(self.scanner),
+        }
+        for kind in KINDS:
+            per_type = {}
+            for mtype in self.types:
+                per_type[format_key(mtype)] = {
+                    "energy_histogram":
+                    self.energy_histograms[kind][mtype].tolist(),
+                    "mean_energy":
+                    self._get_mean_energy(kind, mtype),
+                    "module_counts":
+                    self.module_counts[kind][mtype].tolist(),
+                }
+            counts = numpy.array(self.block_counts[kind], dtype=numpy.int64)
+            result[kind] = {
+                "total": sum(self.num_events[kind].values()),
+                "counts": {
+                    format_key(key): value
+                    for key, value in self.num_events[kind].items()
+                },
+                "per_module_type": per_type,
+                "time_blocks": {
+                    "counts": counts.tolist(),
+                    "rates": get_rates(counts, durations).tolist(),
+                },
+            }
+        for kind in COINCIDENCE_KINDS:
+            result[kind]["tof_histograms"] = {
+                format_key(pair): histogram.tolist()
+                for pair, histogram in self.tof_histograms[kind].items()
+            }
+            if self._detection_bin_efficiencies is not None:
+                result[kind]["mean_detection_bin_efficiency"] = {
+                    format_key(pair): (self.efficiency_sums[kind][pair] /
+                                       num_events if num_events > 0 else None)
+                    for pair, num_events in self.num_events[kind].items()
+                }
+        result["time_blocks"] = {
+            "start": intervals[:, 0].tolist(),
+            "stop": intervals[:, 1].tolist(),
+        }
+        return result
+
+
+def summarise(reader: petsird.PETSIRDReaderBase) -> Summary:
+    """Summarise a PETSIRD stream"""
+    summary = Summary(reader.read_header().scanner)
+    summary.accumulate(reader.read_time_blocks())
+    return summary
+
+
+def summarise_columnar(columnar: ColumnarPETSIRD) -> Summary:
+    """Summarise a columnar export (see `petsird.helpers.columnar`)"""
+    summary = Summary(columnar.header.scanner)
+    summary.add_columnar(columnar)
+    return summary
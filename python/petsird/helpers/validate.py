@@ -0,0 +1,631 @@
+"""
+Preliminary helpers for checking conformance of PETSIRD files
+
+The checks cover the constraints documented in the model that are not enforced
+by the yardl types:
+- the header: sizes of the detection efficiencies and consistency of the SGID LUTs
+  with `ModulePairEfficiencies.sgid`
+- time blocks: start <= stop, and non-decreasing start for every kind of time block
+- event time blocks: sizes of the nested event lists (and their absence if the
+  corresponding policy is `NONE`), detection bins below `get_num_detection_bins`,
+  ordering of detections, TOF indices below the number of TOF bins, and
+  coincidences between module pairs with a negative SGID.
+Event checks are vectorized over the events of a "shard" of time blocks. For a
+columnar export (see `petsird.helpers.columnar`), shards can be checked in
+parallel, as every process memory-maps the columns itself. (For a stream, the
+decoding takes much longer than the checks, such that these are not parallelised.)
+
+Usage:
+    python -m petsird.helpers.validate -i test.petsird
+    python -m petsird.helpers.validate -i test_columns -j 4
+"""
+
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import collections
+import concurrent.futures
+import functools
+import itertools
+import os
+import sys
+import typing
+from dataclasses import dataclass, field
+
+import numpy
+import numpy.typing as npt
+
+import petsird
+from petsird.helpers import (get_module_pair_sgid_lut_as_array,
+                             get_num_detection_bins)
+from petsird.helpers.columnar import (BLOCKS_FILENAME, HEADER_FILENAME,
+                                      CoincidenceArrays, ColumnarPETSIRD,
+                                      coincidence_events_to_arrays,
+                                      get_module_type_pairs, load_columnar,
+                                      multiple_events_to_arrays)
+
+CHECKS = {
+    "policy": "events are stored while the policy is NONE",
+    "structure": "nested event lists have the wrong size",
+    "time_interval": "time interval with start > stop",
+    "time_order": "time block starts before the previous one of its kind",
+    "detection_bin_range": "detection bin >= number of detection bins",
+    "detection_order": "detections are not ordered",
+    "tof_idx_range": "TOF index >= number of TOF bins",
+    "not_in_coincidence": "event in a module pair with negative SGID",
+    "sgid": "SGID LUT and ModulePairEfficiencies are inconsistent",
+    "efficiencies_shape": "efficiencies have the wrong size",
+    "transform_not_rigid": "transformation is not a rotation and translation",
+    "duplicate_transform": "transformations are (nearly) identical",
+    "degenerate_shape": "detecting box is too thin or not convex",
+    "overlap": "detecting elements overlap",
+}
+# default number of event time blocks per shard for streams and columnar exports
+SHARD_SIZE = 64
+COLUMNAR_SHARD_SIZE = 4096
+
+
+@dataclass
+class Violations:
+    """Number of violations of one check, and where the first one occurred
+
+    `block` is the index of the time block in the stream (None for the header).
+    """
+    count: int = 0
+    block: typing.Optional[int] = None
+    location: str = ""
+
+    def add(self, count: int, block: typing.Optional[int],
+            location: str) -> None:
+        if count == 0:
+            return
+        if self.count == 0 or _block_key(block) < _block_key(self.block):
+            self.block = block
+            self.location = location
+        self.count += count
+
+
+def _block_key(block: typing.Optional[int]) -> int:
+    return -1 if block is None else block
+
+
+@dataclass
+class ValidationReport:
+    """Violations (indexed by check, see `CHECKS`) found in a PETSIRD stream"""
+    num_time_blocks: int = 0
+    num_events: int = 0
+    violations: dict[str, Violations] = field(default_factory=dict)
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.violations
+
+    def add(self,
+            check: str,
+            count: int,
+            block: typing.Optional[int] = None,
+            location: str = "") -> None:
+        if count > 0:
+            self.violations.setdefault(check, Violations()).add(
+                count, block, location)
+
+    def merge(self, other: "ValidationReport") -> None:
+        """Add the results of another (part of the) stream"""
+        self.num_time_blocks += other.num_time_blocks
+        self.num_events += other.num_events
+        for check, violations in other.violations.items():
+            self.add(check, violations.count, violations.block,
+                     violations.location)
+
+    def format(self, summary: bool = True) -> str:
+        """Describe the violations, after the number of checked events if `summary`"""
+        lines = [
+            f"Checked {self.num_time_blocks} time blocks with {self.num_events} events"
+        ] if summary else []
+        for check, v in sorted(self.violations.items(),
+                               key=lambda item: _block_key(item[1].block)):
+            where = "header" if v.block is None else f"time block {v.block}"
+            lines.append(f"{check}: {v.count} ({CHECKS[check]})")
+            lines.append(f"    first in {where}: {v.location}")
+        if self.is_valid:
+            lines.append("No violations found")
+        return "\n".join(lines)
+
+
+def _is_lower_triangular(nested: list, num_module_types: int,
+                         depth: int) -> bool:
+    """Check sizes of a nested list of event lists, see EventTimeBlock docs"""
+    if len(nested) != num_module_types:
+        return False
+
+    def check(sub: list, level: int) -> bool:
+        if level == depth:
+            return True
+        return all(
+            len(s) == k + 1 and check(s, level + 1) for k, s in enumerate(sub))
+
+    return check(nested, 1)
+
+
+def _has_sgid_lut_shape(scanner: petsird.ScannerInformation,
+                        pair: tuple[int, int]) -> bool:
+    """Check the row sizes of the ModulePairSGIDLUT of a module-type pair"""
+    mtype0, mtype1 = pair
+    lut = scanner.detection_efficiencies.module_pair_sgidlut[mtype0][mtype1]
+    num_modules = [
+        len(m.transforms) for m in scanner.scanner_geometry.replicated_modules
+    ]
+    expected_sizes = [
+        mod0 + 1 if mtype0 == mtype1 else num_modules[mtype1]
+        for mod0 in range(num_modules[mtype0])
+    ]
+    return [len(row) for row in lut] == expected_sizes
+
+
+def check_header(scanner: petsird.ScannerInformation) -> ValidationReport:
+    """Check sizes of the detection efficiencies and the SGID LUTs
+
+    Efficiencies that are absent (or of size 0) are considered to be 1.
+    """
+    report = ValidationReport()
+    geometry = scanner.scanner_geometry
+    num_module_types = geometry.number_of_module_types()
+    num_bins_in_module = [
+        len(m.object.detecting_elements.transforms) *
+        scanner.event_energy_bin_edges[mtype].number_of_bins()
+        for mtype, m in enumerate(geometry.replicated_modules)
+    ]
+    efficiencies = scanner.detection_efficiencies
+
+    bin_efficiencies = efficiencies.detection_bin_efficiencies
+    if bin_efficiencies:
+        report.add(
+            "efficiencies_shape",
+            int(len(bin_efficiencies) != num_module_types), None,
+            f"detection_bin_efficiencies has size {len(bin_efficiencies)}"
+            f" instead of {num_module_types}")
+        for mtype, values in enumerate(bin_efficiencies[:num_module_types]):
+            size = len(values)
+            expected = get_num_detection_bins(scanner, mtype)
+            report.add(
+                "efficiencies_shape", int(size not in (0, expected)), None,
+                f"detection_bin_efficiencies[{mtype}] has size {size}"
+                f" instead of {expected}")
+
+    luts = efficiencies.module_pair_sgidlut
+    vectors = efficiencies.module_pair_efficiencies_vectors
+    for name, nested in (("module_pair_sgidlut", luts),
+                         ("module_pair_efficiencies_vectors", vectors)):
+        if nested and not _is_lower_triangular(nested, num_module_types, 2):
+            report.add("efficiencies_shape", 1, None,
+                       f"{name} does not have one entry per module-type pair")
+            return report
+    if not luts:
+        report.add("sgid", int(bool(vectors)), None,
+                   "module_pair_efficiencies_vectors without SGID LUT")
+        return report
+    for mtype0, mtype1 in get_module_type_pairs(num_module_types):
+        pair = f"[{mtype0}][{mtype1}]"
+        lut = luts[mtype0][mtype1]
+        if not _has_sgid_lut_shape(scanner, (mtype0, mtype1)):
+            report.add("sgid", 1, None,
+                       f"module_pair_sgidlut{pair} has the wrong size")
+            continue
+        sgids = numpy.array(list(itertools.chain.from_iterable(lut)),
+                            dtype=numpy.int64)
+        report.add("sgid", int(numpy.count_nonzero(sgids < -1)), None,
+                   f"module_pair_sgidlut{pair} has values < -1")
+        if not vectors:
+            continue
+        vector = vectors[mtype0][mtype1]
+        num_sgids = int(sgids.max(initial=-1)) + 1
+        report.add(
+            "sgid", int(len(vector) != num_sgids), None,
+            f"module_pair_efficiencies_vectors{pair} has size {len(vector)}"
+            f" instead of {num_sgids}")
+        unused = numpy.setdiff1d(numpy.arange(num_sgids), sgids)
+        report.add("sgid", len(unused), None,
+                   f"module_pair_sgidlut{pair} does not use SGID(s) {unused}")
+        wrong = [k for k, e in enumerate(vector) if e.sgid != k]
+        if wrong:
+            report.add(
+                "sgid", len(wrong), None,
+                f"module_pair_efficiencies_vectors{pair}[{wrong[0]}].sgid"
+                f" is {vector[wrong[0]].sgid}")
+        shape = (num_bins_in_module[mtype0], num_bins_in_module[mtype1])
+        wrong = [
+            k for k, e in enumerate(vector)
+            if len(e.values) != shape[0] or any(
+                len(row) != shape[1] for row in e.values)
+        ]
+        if wrong:
+            report.add(
+                "efficiencies_shape", len(wrong), None,
+                f"module_pair_efficiencies_vectors{pair}[{wrong[0]}].values"
+                f" is not {shape}")
+    return report
+
+
+class _Batch:
+    """Concatenation of event arrays of several time blocks"""
+
+    def __init__(self):
+        self.arrays = []
+        self.blocks = []
+        self.offsets = [0]
+
+    @classmethod
+    def from_block_column(cls, block: npt.NDArray,
+                          stream_indices: npt.NDArray) -> "_Batch":
+        """Locate events with a (sorted) `block` column of a columnar export"""
+        batch = cls()
+        starts = numpy.concatenate(
+            ([0], numpy.flatnonzero(block[1:] != block[:-1]) + 1))
+        batch.blocks = stream_indices[block[starts]].tolist()
+        batch.offsets = starts.tolist() + [len(block)]
+        return batch
+
+    def append(self, arrays, block: int, num_events: int) -> None:
+        self.arrays.append(arrays)
+        self.blocks.append(block)
+        self.offsets.append(self.offsets[-1] + num_events)
+
+    def locate(self, mask: npt.NDArray[numpy.bool_]) -> tuple[int, int, int]:
+        """Return the number of violations, and block and event of the first"""
+        bad = numpy.flatnonzero(mask)
+        if len(bad) == 0:
+            return 0, 0, 0
+        segment = numpy.searchsorted(self.offsets, bad[0], side="right") - 1
+        return len(bad), self.blocks[segment], int(bad[0] -
+                                                   self.offsets[segment])
+
+
+class EventTimeBlockChecker:
+    """Check events in (shards of) `EventTimeBlock`s
+
+    Calling an instance with a list of (time block index, `EventTimeBlock`)
+    returns a `ValidationReport`. Events of a columnar export are checked with
+    `check_columnar`.
+    """
+
+    def __init__(self, scanner: petsird.ScannerInformation):
+        geometry = scanner.scanner_geometry
+        self.num_module_types = geometry.number_of_module_types()
+        self.num_detection_bins = [
+            get_num_detection_bins(scanner, mtype)
+            for mtype in range(self.num_module_types)
+        ]
+        num_modules = [len(m.transforms) for m in geometry.replicated_modules]
+        self.num_bins_in_module = [
+            n // m for n, m in zip(self.num_detection_bins, num_modules)
+        ]
+        self.num_tof_bins = {
+            pair: scanner.tof_bin_edges[pair[0]][pair[1]].number_of_bins()
+            for pair in get_module_type_pairs(self.num_module_types)
+        }
+        self.policies = {
+            "single_events":
+            scanner.single_event_policy != petsird.SingleEventPolicy.NONE,
+            "prompt_events":
+            scanner.prompt_event_policy != petsird.CoincidencePolicy.NONE,
+            "delayed_events":
+            scanner.delayed_event_policy != petsird.CoincidencePolicy.NONE,
+            "triple_events":
+            scanner.triple_event_policy != petsird.TripleEventPolicy.NONE,
+            "quadruple_events":
+            scanner.quadruple_event_policy
+            != petsird.QuadrupleEventPolicy.NONE,
+        }
+        # LUTs of the wrong size are reported by check_header
+        self.sgid_luts = {}
+        luts = scanner.detection_efficiencies.module_pair_sgidlut
+        if luts and _is_lower_triangular(luts, self.num_module_types, 2):
+            for pair in self.num_tof_bins:
+                if _has_sgid_lut_shape(scanner, pair):
+                    self.sgid_luts[pair] = get_module_pair_sgid_lut_as_array(
+                        scanner, pair)
+
+    def __call__(
+        self, shard: typing.Sequence[tuple[int, petsird.EventTimeBlock]]
+    ) -> ValidationReport:
+        report = ValidationReport()
+        depths = {
+            "single_events": 1,
+            "prompt_events": 2,
+            "delayed_events": 2,
+            "triple_events": 3,
+            "quadruple_events": 4
+        }
+        batches = collections.defaultdict(_Batch)
+        for block, event_time_block in shard:
+            for name, depth in depths.items():
+                nested = getattr(event_time_block, name)
+                if not self.policies[name]:
+                    report.add("policy", int(len(nested) > 0), block, name)
+                    continue
+                if not _is_lower_triangular(nested, self.num_module_types,
+                                            depth):
+                    report.add("structure", 1, block, name)
+                    continue
+                for types in itertools.product(range(self.num_module_types),
+                                               repeat=depth):
+                    if list(types) != sorted(types, reverse=True):
+                        continue
+                    events = nested
+                    for mtype in types:
+                        events = events[mtype]
+                    report.num_events += len(events)
+                    if not events:
+                        continue
+                    if depth == 1:
+                        arrays = numpy.fromiter(
+                            (e.detection_bin for e in events),
+                            dtype=numpy.uint32,
+                            count=len(events))[:, None]
+                    elif depth == 2:
+                        arrays = coincidence_events_to_arrays(events)
+                    else:
+                        arrays = multiple_events_to_arrays(events, depth)
+                    batches[name, types].append(arrays, block, len(events))
+        for (name, types), batch in batches.items():
+            if name == "prompt_events" or name == "delayed_events":
+                arrays = CoincidenceArrays(det_bin0=numpy.concatenate(
+                    [a.det_bin0 for a in batch.arrays]),
+                                           det_bin1=numpy.concatenate([
+                                               a.det_bin1 for a in batch.arrays
+                                           ]),
+                                           tof_idx=numpy.concatenate([
+                                               a.tof_idx for a in batch.arrays
+                                           ]))
+                self._check_coincidences(report, name, types, arrays, batch)
+            elif name == "single_events":
+                self._check_detections(report, name, types,
+                                       numpy.concatenate(batch.arrays), None,
+                                       batch)
+            else:
+                self._check_detections(
+                    report, name, types,
+                    numpy.concatenate([a.det_bins for a in batch.arrays]),
+                    numpy.concatenate([a.tof_indices for a in batch.arrays]),
+                    batch)
+        report.num_time_blocks = len(shard)
+        return report
+
+    def check_columnar(self, columnar: ColumnarPETSIRD, start: int,
+                       stop: int) -> ValidationReport:
+        """Check the events of event time blocks `start` to `stop` (exclusive)
+
+        Blocks are indices into `columnar.blocks`. Violations are reported with
+        the index of the time block in the original stream.
+        """
+        report = ValidationReport(num_time_blocks=stop - start)
+        stream_indices = columnar.blocks["stream_index"]
+        for name, events in (("prompt_events", columnar.prompts),
+                             ("delayed_events", columnar.delayeds),
+                             ("single_events", columnar.singles)):
+            for key, arrays in events.items():
+                first, last = numpy.searchsorted(arrays.block, [start, stop])
+                arrays = arrays[first:last]
+                report.num_events += len(arrays)
+                if len(arrays) == 0:
+                    continue
+                batch = _Batch.from_block_column(arrays.block, stream_indices)
+                if name == "single_events":
+                    self._check_detections(report, name, (key, ),
+                                           arrays.det_bin[:,
+                                                          None], None, batch)
+                else:
+                    self._check_coincidences(report, name, key, arrays, batch)
+        return report
+
+    def _add(self, report: ValidationReport, check: str, batch: _Batch,
+             mask: npt.NDArray[numpy.bool_], location: str) -> None:
+        count, block, event = batch.locate(mask)
+        report.add(check, count, block, f"{location} event {event}")
+
+    def _check_coincidences(self, report: ValidationReport, name: str,
+                            pair: tuple[int, int], arrays: CoincidenceArrays,
+                            batch: _Batch) -> None:
+        location = f"{name}[{pair[0]}][{pair[1]}]"
+        det_bin0 = arrays.det_bin0
+        det_bin1 = arrays.det_bin1
+        tof_idx = arrays.tof_idx
+        out_of_range = ((det_bin0 >= self.num_detection_bins[pair[0]]) |
+                        (det_bin1 >= self.num_detection_bins[pair[1]]))
+        self._add(report, "detection_bin_range", batch, out_of_range, location)
+        if pair[0] == pair[1]:
+            self._add(report, "detection_order", batch, det_bin0 < det_bin1,
+                      location)
+        self._add(report, "tof_idx_range", batch, tof_idx
+                  >= self.num_tof_bins[pair], location)
+        lut = self.sgid_luts.get(pair)
+        if lut is not None:
+            in_range = ~out_of_range
+            sgids = numpy.full(len(det_bin0), 0, dtype=numpy.int64)
+            sgids[in_range] = lut[det_bin0[in_range] //
+                                  self.num_bins_in_module[pair[0]],
+                                  det_bin1[in_range] //
+                                  self.num_bins_in_module[pair[1]]]
+            self._add(report, "not_in_coincidence", batch, sgids < 0, location)
+
+    def _check_detections(self, report: ValidationReport, name: str,
+                          types: tuple[int, ...], det_bins: npt.NDArray,
+                          tof_indices: typing.Optional[npt.NDArray],
+                          batch: _Batch) -> None:
+        """Checks for singles (without `tof_indices`), triples and quadruples"""
+        location = f"{name}{''.join(f'[{t}]' for t in types)}"
+        num_bins = numpy.array([self.num_detection_bins[t] for t in types])
+        self._add(report, "detection_bin_range", batch,
+                  (det_bins >= num_bins).any(axis=1), location)
+        if tof_indices is None:
+            return
+        # lexicographical ordering in (type_of_module, detection_bin)
+        same_type = numpy.array(types[:-1]) == numpy.array(types[1:])
+        unordered = same_type & (det_bins[:, :-1] < det_bins[:, 1:])
+        self._add(report, "detection_order", batch, unordered.any(axis=1),
+                  location)
+        # TOF indices are w.r.t. the first detection
+        num_tof_bins = numpy.array(
+            [self.num_tof_bins[types[0], t] for t in types[1:]])
+        self._add(report, "tof_idx_range", batch,
+                  (tof_indices >= num_tof_bins).any(axis=1), location)
+
+
+def validate(reader: petsird.PETSIRDReaderBase,
+             shard_size: int = SHARD_SIZE) -> ValidationReport:
+    """Check a whole PETSIRD stream
+
+    Events are checked in shards of `shard_size` event time blocks.
+    """
+    header = reader.read_header()
+    report = check_header(header.scanner)
+    checker = EventTimeBlockChecker(header.scanner)
+    last_starts = {}
+    shard = []
+    for block, time_block in enumerate(reader.read_time_blocks()):
+        time_interval = time_block.value.time_interval
+        report.add("time_interval",
+                   int(time_interval.start > time_interval.stop), block,
+                   type(time_block).__name__)
+        kind = type(time_block)
+        report.add("time_order",
+                   int(time_interval.start < last_starts.get(kind, 0)), block,
+                   kind.__name__)
+        last_starts[kind] = time_interval.start
+        if isinstance(time_block, petsird.TimeBlock.EventTimeBlock):
+            shard.append((block, time_block.value))
+            if len(shard) == shard_size:
+                report.merge(checker(shard))
+                shard = []
+        else:
+            report.num_time_blocks += 1
+    if shard:
+        report.merge(checker(shard))
+    return report
+
+
+def _check_time_intervals(report: ValidationReport, kind: str,
+                          stream_indices: npt.NDArray, starts: npt.NDArray,
+                          stops: npt.NDArray) -> None:
+    """Check the time intervals of all time blocks of one kind (in stream order)"""
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    stops = numpy.asarray(stops, dtype=numpy.int64)
+    for check, bad in (("time_interval", numpy.flatnonzero(starts > stops)),
+                       ("time_order",
+                        numpy.flatnonzero(starts[1:] < starts[:-1]) + 1)):
+        if len(bad) > 0:
+            report.add(check, len(bad), int(stream_indices[bad[0]]), kind)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_columnar_checker(
+        directory: str) -> tuple[ColumnarPETSIRD, EventTimeBlockChecker]:
+    columnar = load_columnar(directory)
+    return columnar, EventTimeBlockChecker(columnar.header.scanner)
+
+
+def check_columnar_shard(directory: str, start: int,
+                         stop: int) -> ValidationReport:
+    """Check the events of event time blocks `start` to `stop` of a columnar export
+
+    The export is memory-mapped (once per process), such that shards can be
+    checked in other processes.
+    """
+    columnar, checker = _load_columnar_checker(directory)
+    return checker.check_columnar(columnar, start, stop)
+
+
+def validate_columnar(directory: str,
+                      executor: typing.Optional[
+                          concurrent.futures.Executor] = None,
+                      shard_size: int = COLUMNAR_SHARD_SIZE,
+                      max_pending_shards: int = 16) -> ValidationReport:
+    """Check a columnar export (see `petsird.helpers.columnar`)
+
+    Events are checked in shards of `shard_size` event time blocks, in parallel
+    if an `executor` (e.g. a process pool) is given. At most
+    `max_pending_shards` shards are pending.
+    """
+    with petsird.BinaryPETSIRDReader(os.path.join(directory,
+                                                  HEADER_FILENAME)) as reader:
+        header = reader.read_header()
+        other_time_blocks = list(reader.read_time_blocks())
+    report = check_header(header.scanner)
+    report.num_time_blocks = len(other_time_blocks)
+    blocks = numpy.load(os.path.join(directory, BLOCKS_FILENAME))
+    _check_time_intervals(report, petsird.TimeBlock.EventTimeBlock.__name__,
+                          blocks["stream_index"], blocks["start"],
+                          blocks["stop"])
+    # other time blocks fill the remaining positions in the stream
+    is_event = numpy.zeros(len(blocks) + len(other_time_blocks), dtype=bool)
+    is_event[blocks["stream_index"]] = True
+    other_indices = numpy.flatnonzero(~is_event)
+    by_kind = collections.defaultdict(list)
+    for stream_index, time_block in zip(other_indices, other_time_blocks):
+        time_interval = time_block.value.time_interval
+        by_kind[type(time_block).__name__].append(
+            (stream_index, time_interval.start, time_interval.stop))
+    for kind, intervals in by_kind.items():
+        _check_time_intervals(report, kind, *numpy.array(intervals).T)
+
+    shards = [(start, min(start + shard_size, len(blocks)))
+              for start in range(0, len(blocks), shard_size)]
+    if executor is None:
+        for start, stop in shards:
+            report.merge(check_columnar_shard(directory, start, stop))
+        return report
+    pending = collections.deque()
+    for start, stop in shards:
+        pending.append(
+            executor.submit(check_columnar_shard, directory, start, stop))
+        while len(pending) > max_pending_shards:
+            report.merge(pending.popleft().result())
+    while pending:
+        report.merge(pending.popleft().result())
+    return report
+
+
+def parserCreator():
+    parser = argparse.ArgumentParser(
+        prog='petsird_validate',
+        description='Check a PETSIRD file for conformance')
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default=None,
+        help="File (or columnar export) to read from, or stdin if omitted",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes to check events of a columnar export with")
+    parser.add_argument("--shard-size",
+                        type=int,
+                        default=None,
+                        help="Number of event time blocks per shard")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parserCreator()
+    if args.input is not None and os.path.isdir(args.input):
+        executor = (concurrent.futures.ProcessPoolExecutor(args.jobs)
+                    if args.jobs > 1 else None)
+        report = validate_columnar(args.input, executor, args.shard_size
+                                   or COLUMNAR_SHARD_SIZE)
+        if executor is not None:
+            executor.shutdown()
+    else:
+        if args.jobs > 1:
+            sys.exit(
+                "-j needs a columnar export (see petsird.helpers.columnar)")
+        file = sys.stdin.buffer if args.input is None else args.input
+        with petsird.BinaryPETSIRDReader(file) as reader:
+            report = validate(reader, args.shard_size or SHARD_SIZE)
+    print(report.format())
+    sys.exit(0 if report.is_valid else 1)
@@ -0,0 +1,138 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import collections
+import io
+import unittest
+
+import numpy
+
+import petsird
+from petsird.helpers.diff import diff, get_unmatched
+from test_validate import get_scanner
+
+
+def get_table(rows: list[tuple[int, ...]],
+              num_columns: int = 2) -> list[numpy.ndarray]:
+    """Columns of a table with the given rows"""
+    values = numpy.array(rows, dtype=numpy.uint32).reshape(-1, num_columns)
+    return list(values.T)
+
+
+def get_unmatched_rows(rows0: list[tuple[int, ...]],
+                       rows1: list[tuple[int, ...]]) -> tuple[list, list]:
+    unmatched0, unmatched1 = get_unmatched(get_table(rows0), get_table(rows1))
+    return ([row for row, u in zip(rows0, unmatched0)
+             if u], [row for row, u in zip(rows1, unmatched1) if u])
+
+
+class GetUnmatchedTest(unittest.TestCase):
+
+    def test_reordered_rows(self):
+        rows = [(1, 2), (2, 1), (1, 1), (2, 2), (0, 5)]
+        self.assertEqual(get_unmatched_rows(rows, rows[::-1]), ([], []))
+        self.assertEqual(get_unmatched_rows(rows, rows[2:] + rows[:2]),
+                         ([], []))
+
+    def test_extra_rows(self):
+        rows = [(1, 2), (2, 1), (1, 1)]
+        self.assertEqual(get_unmatched_rows(rows + [(3, 3)], rows[::-1]),
+                         ([(3, 3)], []))
+        self.assertEqual(get_unmatched_rows(rows, [(0, 1)] + rows),
+                         ([], [(0, 1)]))
+        self.assertEqual(
+            get_unmatched_rows([(1, 2), (5, 5)], [(6, 6), (1, 2)]),
+            ([(5, 5)], [(6, 6)]))
+        # rows that only match in a single column
+        self.assertEqual(get_unmatched_rows([(1, 2)], [(2, 1)]),
+                         ([(1, 2)], [(2, 1)]))
+
+    def test_duplicated_rows(self):
+        self.assertEqual(
+            get_unmatched_rows([(1, 2), (1, 2), (3, 4)], [(3, 4), (1, 2)]),
+            ([(1, 2)], []))
+        # the first duplicates are matched
+        unmatched = get_unmatched(get_table([(1, 2)]),
+                                  get_table([(1, 2), (3, 4), (1, 2), (1, 2)]))
+        self.assertEqual([mask.tolist() for mask in unmatched],
+                         [[False], [False, True, True, True]])
+        self.assertEqual(
+            get_unmatched_rows([(1, 2), (1, 2)], [(1, 2), (1, 2)]), ([], []))
+
+    def test_empty_tables(self):
+        self.assertEqual(get_unmatched_rows([], []), ([], []))
+        self.assertEqual(get_unmatched_rows([(1, 2)], []), ([(1, 2)], []))
+        self.assertEqual(get_unmatched_rows([], [(1, 2)]), ([], [(1, 2)]))
+
+    def test_random_rows(self):
+        # many duplicates, compared with multisets
+        rng = numpy.random.default_rng(0)
+        for _ in range(20):
+            rows0 = [
+                tuple(row) for row in rng.integers(0, 3, (rng.integers(50), 3))
+            ]
+            rows1 = [
+                tuple(row) for row in rng.integers(0, 3, (rng.integers(50), 3))
+            ]
+            unmatched0, unmatched1 = get_unmatched(get_table(rows0, 3),
+                                                   get_table(rows1, 3))
+            counts0 = collections.Counter(rows0)
+            counts1 = collections.Counter(rows1)
+            self.assertEqual(
+                collections.Counter(row for row, u in zip(rows0, unmatched0)
+                                    if u), counts0 - counts1)
+            self.assertEqual(
+                collections.Counter(row for row, u in zip(rows1, unmatched1)
+                                    if u), counts1 - counts0)
+
+
+def write_stream(header: petsird.Header,
+                 events: list[tuple[int, int, int]]) -> io.BytesIO:
+    """Stream with a single time block with prompts of module-types (0, 0)"""
+    prompts = [[[
+        petsird.CoincidenceEvent(detection_bins=[bin0, bin1], tof_idx=tof_idx)
+        for bin0, bin1, tof_idx in events
+    ]], [[], []]]
+    stream = io.BytesIO()
+    writer = petsird.BinaryPETSIRDWriter(stream)
+    writer.write_header(header)
+    writer.write_time_blocks((petsird.TimeBlock.EventTimeBlock(
+        petsird.EventTimeBlock(time_interval=petsird.TimeInterval(start=0,
+                                                                  stop=1),
+                               prompt_events=prompts)), ))
+    writer.close()
+    stream.seek(0)
+    return stream
+
+
+class DiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.header = petsird.Header(scanner=get_scanner())
+        self.events = [(40, 1, 0), (40, 1, 0), (50, 3, 2), (60, 5, 4)]
+
+    def diff(self, events0, events1) -> "petsird.helpers.diff.DiffReport":
+        with petsird.BinaryPETSIRDReader(write_stream(self.header,
+                                                      events0)) as reader0:
+            with petsird.BinaryPETSIRDReader(write_stream(
+                    self.header, events1)) as reader1:
+                return diff(reader0, reader1)
+
+    def test_reordered_events(self):
+        report = self.diff(self.events, self.events[::-1])
+        self.assertTrue(report.is_equal, report.format())
+        self.assertEqual(report.num_events["prompts"], [4, 4])
+
+    def test_different_events(self):
+        # a duplicate less in the first stream, and an extra event in the second
+        report = self.diff(self.events[1:], self.events + [(70, 7, 6)])
+        self.assertFalse(report.is_equal)
+        self.assertEqual(report.differences["prompts"].count, 2)
+        self.assertIn(
+            "prompts[0][0]: 0 event(s) only in the first and 2 only in the"
+            " second stream", report.first_differences[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
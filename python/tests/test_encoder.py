@@ -0,0 +1,142 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import unittest
+
+import numpy
+
+import petsird
+from petsird.helpers import (are_detections_ordered, get_detection_efficiency,
+                             get_num_det_els, make_detection_bin)
+from petsird.helpers.encoder import (RawCoincidences, encode_coincidences,
+                                     get_block_edges, make_event_time_blocks)
+from test_validate import get_scanner
+
+# both module-types have 6 detecting elements per module
+NUM_ELEMENTS = 6
+
+
+def get_detection_bin(scanner: petsird.ScannerInformation, type_of_module: int,
+                      module: int, element: int, energy_index: int) -> int:
+    return make_detection_bin(
+        scanner, type_of_module,
+        petsird.ExpandedDetectionBin(module_index=module,
+                                     element_index=element,
+                                     energy_index=energy_index))
+
+
+def get_events(event_time_block: petsird.EventTimeBlock,
+               pair: tuple[int, int]) -> list[tuple[int, int, int]]:
+    return [(event.detection_bins[0], event.detection_bins[1], event.tof_idx)
+            for event in event_time_block.prompt_events[pair[0]][pair[1]]]
+
+
+class EncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = get_scanner()
+        self.header = petsird.Header(scanner=self.scanner)
+
+    def encode(self, raw: RawCoincidences) -> list[petsird.EventTimeBlock]:
+        block_edges = get_block_edges(1, float(numpy.max(raw.time)))
+        prompts = encode_coincidences(self.scanner, raw, block_edges)
+        event_time_blocks = list(
+            make_event_time_blocks(self.header, block_edges, prompts))
+        # all events are ordered, and can be used with the efficiency helpers
+        for event_time_block in event_time_blocks:
+            for mtype0, lists in enumerate(event_time_block.prompt_events):
+                for mtype1, events in enumerate(lists):
+                    for event in events:
+                        self.assertTrue(
+                            are_detections_ordered((mtype0, mtype1),
+                                                   *event.detection_bins))
+                        self.assertGreaterEqual(
+                            get_detection_efficiency(self.scanner,
+                                                     (mtype0, mtype1), event),
+                            0)
+        return event_time_blocks
+
+    def test_hand_computed_events(self):
+        # energy bins of module-type 0 are [450, 516.7, 583.3, 650] keV, and
+        # of module-type 1 [460, 640] keV
+        raw = RawCoincidences(
+            crystal0=numpy.array([1, 18, 1, 1, 2 * NUM_ELEMENTS + 3]),
+            crystal1=numpy.array([2 * NUM_ELEMENTS + 3, 8, 15, 15, 1]),
+            energy0=numpy.array([500., 520., 700., 500., 600.]),
+            energy1=numpy.array([600., 500., 600., 600., 500.]),
+            tof=numpy.array([1000., 200., 0., 10000., -1000.]),
+            time=numpy.array([0.2, 1.5, 0.5, 0.5, 1.2]),
+            type_of_module0=numpy.array([0, 0, 0, 0, 0]),
+            type_of_module1=numpy.array([0, 1, 0, 0, 0]))
+        event_time_blocks = self.encode(raw)
+        self.assertEqual(len(event_time_blocks), 2)
+
+        # module 2, element 3, energy bin 2 and module 0, element 1, energy
+        # bin 0 (swapped for the first event)
+        bin0 = get_detection_bin(self.scanner, 0, 2, 3, 2)
+        bin1 = get_detection_bin(self.scanner, 0, 0, 1, 0)
+        self.assertEqual((bin0, bin1), (47, 3))
+        # -1000 ps is -149.9 mm, in [-218.2, -72.7) mm
+        tof_idx = 4
+        self.assertEqual(get_events(event_time_blocks[0], (0, 0)),
+                         [(bin0, bin1, tof_idx)])
+        self.assertEqual(get_events(event_time_blocks[1], (0, 0)),
+                         [(bin0, bin1, tof_idx)])
+
+        # module-types are swapped as well: module 1, element 2 of module-type
+        # 1 and module 3, element 0, energy bin 1 of module-type 0, in the only
+        # TOF bin [-550, 550] mm
+        self.assertEqual(get_events(event_time_blocks[1], (1, 0)),
+                         [(get_detection_bin(self.scanner, 1, 1, 2, 0),
+                           get_detection_bin(self.scanner, 0, 3, 0, 1), 0)])
+        self.assertEqual(get_events(event_time_blocks[0], (1, 0)), [])
+        # all detections are in modules that are in coincidence
+        for pair in ((0, 0), (1, 0)):
+            for event in event_time_blocks[1].prompt_events[pair[0]][pair[1]]:
+                self.assertGreater(
+                    get_detection_efficiency(self.scanner, pair, event), 0)
+        # events with an energy or TOF outside the bin edges are dropped
+        self.assertEqual(
+            sum(
+                len(events) for event_time_block in event_time_blocks
+                for lists in event_time_block.prompt_events
+                for events in lists), 3)
+
+    def test_random_events(self):
+        rng = numpy.random.default_rng(0)
+        num_events = 1000
+        types0 = rng.integers(0, 2, num_events)
+        types1 = rng.integers(0, 2, num_events)
+        num_det_els = numpy.array(
+            [get_num_det_els(self.scanner, mtype) for mtype in range(2)])
+        raw = RawCoincidences(crystal0=rng.integers(0, num_det_els[types0]),
+                              crystal1=rng.integers(0, num_det_els[types1]),
+                              energy0=rng.uniform(470, 630, num_events),
+                              energy1=rng.uniform(470, 630, num_events),
+                              tof=rng.uniform(-1500, 1500, num_events),
+                              time=rng.uniform(0, 3, num_events),
+                              type_of_module0=types0,
+                              type_of_module1=types1)
+        # the order of detections in the same crystal is not defined
+        raw = raw[(raw.crystal0 != raw.crystal1) | (types0 != types1)]
+        types0, types1 = raw.type_of_module0, raw.type_of_module1
+        event_time_blocks = self.encode(raw)
+        self.assertEqual(len(event_time_blocks), 3)
+        # events with swapped detections give the same event
+        swapped = RawCoincidences(crystal0=raw.crystal1,
+                                  crystal1=raw.crystal0,
+                                  energy0=raw.energy1,
+                                  energy1=raw.energy0,
+                                  tof=-raw.tof,
+                                  time=raw.time,
+                                  type_of_module0=types1,
+                                  type_of_module1=types0)
+        for event_time_block, swapped_event_time_block in zip(
+                event_time_blocks, self.encode(swapped)):
+            self.assertEqual(event_time_block.prompt_events,
+                             swapped_event_time_block.prompt_events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import io
+import os
+import tempfile
+import unittest
+
+import numpy
+
+import petsird
+from petsird.helpers import get_num_detection_bins
+from petsird.helpers.columnar import (export_columnar, import_columnar,
+                                      load_columnar)
+from petsird.helpers.packed import (columns_to_records, get_coincidence_dtype,
+                                    pack_event_time_block,
+                                    unpack_event_time_block)
+from test_validate import get_scanner
+
+
+def get_packed_scanner() -> petsird.ScannerInformation:
+    """Scanner of the generator, with prompts, delayeds and all singles"""
+    scanner = get_scanner()
+    scanner.delayed_event_policy = petsird.CoincidencePolicy.REJECT_HIGHER_MULTIPLES
+    scanner.single_event_policy = petsird.SingleEventPolicy.ALL
+    return scanner
+
+
+def get_coincidence_events(scanner: petsird.ScannerInformation,
+                           rng: numpy.random.Generator,
+                           num_events: int) -> list[list[list]]:
+    """Random coincidences for every module-type pair"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    events = []
+    for mtype0 in range(num_module_types):
+        events.append([])
+        for mtype1 in range(mtype0 + 1):
+            num_tof_bins = scanner.tof_bin_edges[mtype0][
+                mtype1].number_of_bins()
+            bins0 = rng.integers(get_num_detection_bins(scanner, mtype0),
+                                 size=num_events)
+            bins1 = rng.integers(get_num_detection_bins(scanner, mtype1),
+                                 size=num_events)
+            tof_indices = rng.integers(num_tof_bins, size=num_events)
+            events[mtype0].append([
+                petsird.CoincidenceEvent(detection_bins=[int(b0),
+                                                         int(b1)],
+                                         tof_idx=int(tof_idx))
+                for b0, b1, tof_idx in zip(bins0, bins1, tof_indices)
+            ])
+    return events
+
+
+def get_event_time_block(scanner: petsird.ScannerInformation,
+                         rng: numpy.random.Generator, t: int,
+                         num_events: int) -> petsird.EventTimeBlock:
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    single_events = [[
+        petsird.SingleEvent(detection_bin=int(det_bin),
+                            time_offset_in_time_block=int(time_offset))
+        for det_bin, time_offset in zip(
+            rng.integers(get_num_detection_bins(scanner, mtype),
+                         size=num_events),
+            rng.integers(1 << 32, size=num_events))
+    ] for mtype in range(num_module_types)]
+    return petsird.EventTimeBlock(
+        time_interval=petsird.TimeInterval(start=t, stop=t + 1),
+        prompt_events=get_coincidence_events(scanner, rng, num_events),
+        delayed_events=get_coincidence_events(scanner, rng, num_events),
+        single_events=single_events)
+
+
+def get_time_blocks(scanner: petsird.ScannerInformation,
+                    rng: numpy.random.Generator) -> list[petsird.TimeBlock]:
+    """Event time blocks (one of them empty), with external signals in between"""
+    time_blocks = []
+    for t, num_events in enumerate((10, 0, 25)):
+        time_blocks.append(
+            petsird.TimeBlock.ExternalSignalTimeBlock(
+                petsird.ExternalSignalTimeBlock(
+                    time_interval=petsird.TimeInterval(start=t, stop=t),
+                    signal_id=0,
+                    signal_values=[float(t)])))
+        time_blocks.append(
+            petsird.TimeBlock.EventTimeBlock(
+                get_event_time_block(scanner, rng, t, num_events)))
+    return time_blocks
+
+
+def write_stream(header: petsird.Header,
+                 time_blocks: list[petsird.TimeBlock]) -> io.BytesIO:
+    stream = io.BytesIO()
+    writer = petsird.BinaryPETSIRDWriter(stream)
+    writer.write_header(header)
+    writer.write_time_blocks(time_blocks)
+    writer.close()
+    stream.seek(0)
+    return stream
+
+
+def read_stream(
+        stream: io.BytesIO) -> tuple[petsird.Header, list[petsird.TimeBlock]]:
+    stream.seek(0)
+    with petsird.BinaryPETSIRDReader(stream) as reader:
+        return reader.read_header(), list(reader.read_time_blocks())
+
+
+class PackedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = get_packed_scanner()
+        self.rng = numpy.random.default_rng(0)
+
+    def test_round_trip(self):
+        for num_events in (0, 1, 100):
+            with self.subTest(num_events=num_events):
+                event_time_block = get_event_time_block(
+                    self.scanner, self.rng, 1, num_events)
+                packed = pack_event_time_block(self.scanner, event_time_block)
+                self.assertEqual(set(packed.prompts), {(0, 0), (1, 0), (1, 1)})
+                self.assertEqual(set(packed.singles), {0, 1})
+                self.assertEqual(unpack_event_time_block(self.scanner, packed),
+                                 event_time_block)
+
+    def test_policy_none(self):
+        self.scanner.delayed_event_policy = petsird.CoincidencePolicy.NONE
+        self.scanner.single_event_policy = petsird.SingleEventPolicy.NONE
+        event_time_block = get_event_time_block(self.scanner, self.rng, 1, 10)
+        event_time_block.delayed_events = []
+        event_time_block.single_events = []
+        packed = pack_event_time_block(self.scanner, event_time_block)
+        self.assertEqual((packed.delayeds, packed.singles), ({}, {}))
+        self.assertEqual(unpack_event_time_block(self.scanner, packed),
+                         event_time_block)
+
+    def test_overflow(self):
+        # 288 detection bins of module-type 0 fit in 16 bits
+        dtype = get_coincidence_dtype(self.scanner, (0, 0))
+        self.assertEqual(dtype["det_bin0"], numpy.uint16)
+        event_time_block = get_event_time_block(self.scanner, self.rng, 1, 10)
+        event_time_block.prompt_events[0][0][3].detection_bins[1] = 1 << 16
+        with self.assertRaisesRegex(OverflowError, "det_bin1 65536"):
+            pack_event_time_block(self.scanner, event_time_block)
+        with self.assertRaisesRegex(OverflowError, "tof_idx -1"):
+            columns_to_records([[0], [0], [-1]], dtype)
+
+    def test_triples_are_not_supported(self):
+        self.scanner.triple_event_policy = petsird.TripleEventPolicy.REJECT_HIGHER_MULTIPLES
+        with self.assertRaises(ValueError):
+            pack_event_time_block(
+                self.scanner,
+                get_event_time_block(self.scanner, self.rng, 1, 10))
+
+
+class ColumnarTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.header = petsird.Header(scanner=get_packed_scanner())
+        self.time_blocks = get_time_blocks(self.header.scanner,
+                                           numpy.random.default_rng(0))
+
+    def export(self, name: str, packed: bool) -> str:
+        directory = os.path.join(self.directory, name)
+        with petsird.BinaryPETSIRDReader(
+                write_stream(self.header, self.time_blocks)) as reader:
+            export_columnar(reader, directory, packed=packed)
+        return directory
+
+    def test_round_trip(self):
+        # compare with the stream, as reading converts types of the header
+        expected = read_stream(write_stream(self.header, self.time_blocks))
+        for packed in (False, True):
+            with self.subTest(packed=packed):
+                directory = self.export(f"packed_{packed}", packed)
+                stream = io.BytesIO()
+                writer = petsird.BinaryPETSIRDWriter(stream)
+                import_columnar(directory, writer)
+                writer.close()
+                self.assertEqual(read_stream(stream), expected)
+
+    def test_packed_columns(self):
+        columnar = load_columnar(self.export("columns", packed=False))
+        packed = load_columnar(self.export("packed", packed=True))
+        self.assertEqual(columnar.blocks.tolist(), [(0, 1, 1), (1, 2, 3),
+                                                    (2, 3, 5)])
+        numpy.testing.assert_array_equal(packed.blocks, columnar.blocks)
+        # narrower types in the packed export, but the same values
+        self.assertEqual(packed.prompts[(1, 1)].det_bin0.dtype, numpy.uint8)
+        for kind in ("prompts", "delayeds", "singles"):
+            arrays = getattr(columnar, kind)
+            packed_arrays = getattr(packed, kind)
+            self.assertEqual(set(packed_arrays), set(arrays))
+            for key, columns in arrays.items():
+                self.assertEqual(len(columns), 35)
+                for name, values in vars(columns).items():
+                    numpy.testing.assert_array_equal(
+                        getattr(packed_arrays[key], name), values)
+
+    def test_packed_export_overflow(self):
+        event_time_block = self.time_blocks[-1].value
+        event_time_block.single_events[1][0].detection_bin = 1 << 8
+        with self.assertRaisesRegex(OverflowError, "det_bin 256"):
+            self.export("packed", packed=True)
+        # columns without packing are 32 bit
+        columnar = load_columnar(self.export("columns", packed=False))
+        self.assertEqual(columnar.singles[1].det_bin[10], 1 << 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
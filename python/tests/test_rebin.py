@@ -0,0 +1,162 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import unittest
+
+import numpy
+
+import petsird
+from petsird.helpers import get_num_detection_bins
+from petsird.helpers.columnar import get_module_type_pairs
+from petsird.helpers.generator import get_scanner_info, mtype0_def
+from petsird.helpers.rebin import (get_rebinning, rebin_event_time_block,
+                                   rebin_scanner)
+from test_validate import get_scanner
+
+
+def get_shape(scanner: petsird.ScannerInformation,
+              type_of_module: int) -> tuple[int, int, int]:
+    """(num_modules, num_elements_per_module, num_energy_bins)"""
+    rep_module = scanner.scanner_geometry.replicated_modules[type_of_module]
+    return (len(rep_module.transforms),
+            len(rep_module.object.detecting_elements.transforms),
+            scanner.event_energy_bin_edges[type_of_module].number_of_bins())
+
+
+def get_merge_matrix(edges, new_edges) -> numpy.ndarray:
+    """Matrix with 1 where an original energy bin is inside a new bin"""
+    centres = (edges[1:] + edges[:-1]) / 2
+    new_bins = numpy.searchsorted(new_edges, centres) - 1
+    num_new_bins = len(new_edges) - 1
+    return (new_bins[:, numpy.newaxis] == numpy.arange(num_new_bins)).astype(
+        numpy.float64)
+
+
+class RebinEfficienciesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = get_scanner()
+        self.num_module_types = 2
+        # module-type 0 has 3 energy bins (merged into 2), module-type 1 only 1
+        self.rebinning = get_rebinning(self.scanner, energy_factor=2)
+        self.new_scanner = rebin_scanner(self.scanner, self.rebinning)
+        self.merge = [
+            get_merge_matrix(
+                numpy.asarray(self.scanner.event_energy_bin_edges[mtype].edges,
+                              dtype=numpy.float64),
+                numpy.asarray(
+                    self.new_scanner.event_energy_bin_edges[mtype].edges,
+                    dtype=numpy.float64))
+            for mtype in range(self.num_module_types)
+        ]
+
+    def get_detection_bin_efficiencies(self, scanner, mtype):
+        efficiencies = scanner.detection_efficiencies.detection_bin_efficiencies
+        return numpy.asarray(efficiencies[mtype], dtype=numpy.float64).reshape(
+            get_shape(scanner, mtype))
+
+    def test_edges(self):
+        numpy.testing.assert_allclose(
+            self.new_scanner.event_energy_bin_edges[0].edges,
+            [450, 583.3333, 650])
+        self.assertEqual(self.merge[0].tolist(), [[1, 0], [1, 0], [0, 1]])
+
+    def test_detection_bin_efficiencies_are_summed(self):
+        for mtype in range(self.num_module_types):
+            numpy.testing.assert_allclose(
+                self.get_detection_bin_efficiencies(self.new_scanner, mtype),
+                self.get_detection_bin_efficiencies(self.scanner,
+                                                    mtype) @ self.merge[mtype],
+                rtol=1e-6)
+
+    def test_product_is_preserved(self):
+        # detection bin efficiencies that are the same for all modules
+        rng = numpy.random.default_rng(0)
+        efficiencies = self.scanner.detection_efficiencies
+        for mtype in range(self.num_module_types):
+            num_modules, num_elements, num_energy_bins = get_shape(
+                self.scanner, mtype)
+            values = rng.uniform(0.5, 1.5, (num_elements, num_energy_bins))
+            efficiencies.detection_bin_efficiencies[mtype] = numpy.tile(
+                values, (num_modules, 1)).reshape(-1).astype(numpy.float32)
+        new_scanner = rebin_scanner(self.scanner, self.rebinning)
+
+        for mtype0, mtype1 in get_module_type_pairs(self.num_module_types):
+            w0, w1 = (self.get_detection_bin_efficiencies(self.scanner,
+                                                          mtype)[0]
+                      for mtype in (mtype0, mtype1))
+            new_w0, new_w1 = (self.get_detection_bin_efficiencies(
+                new_scanner, mtype)[0] for mtype in (mtype0, mtype1))
+            m0, m1 = self.merge[mtype0], self.merge[mtype1]
+            vectors = zip(
+                efficiencies.module_pair_efficiencies_vectors[mtype0][mtype1],
+                new_scanner.detection_efficiencies.
+                module_pair_efficiencies_vectors[mtype0][mtype1])
+            for pair_efficiencies, new_pair_efficiencies in vectors:
+                values = numpy.reshape(pair_efficiencies.values,
+                                       w0.shape + w1.shape)
+                new_values = numpy.reshape(new_pair_efficiencies.values,
+                                           new_w0.shape + new_w1.shape)
+                # sum of the products of the merged bins
+                expected = numpy.einsum("ae,bf,aebf,eE,fF->aEbF", w0, w1,
+                                        values, m0, m1)
+                product = numpy.einsum("aE,bF,aEbF->aEbF", new_w0, new_w1,
+                                       new_values)
+                numpy.testing.assert_allclose(product, expected, rtol=1e-5)
+
+
+class RebinEventsTest(unittest.TestCase):
+
+    def test_events_outside_new_edges_are_dropped(self):
+        # a single module-type, such that the new edges apply to all
+        scanner = get_scanner_info([
+            dataclasses.replace(mtype0_def,
+                                num_crystals_per_module=(1, 2, 3),
+                                num_modules_along_ring=8)
+        ])
+        energy_edges = scanner.event_energy_bin_edges[0].edges
+        tof_edges = scanner.tof_bin_edges[0][0].edges
+        num_energy_bins = len(energy_edges) - 1
+        num_tof_bins = len(tof_edges) - 1
+        # drop the first energy bin, and the first and last 2 TOF bins
+        rebinning = get_rebinning(scanner,
+                                  energy_edges=energy_edges[1:],
+                                  tof_edges=tof_edges[2:-2])
+
+        # events with all energy bins for the first detection, and the first
+        # (dropped) or second (kept) energy bin of detection bin 0 for the
+        # second detection
+        events = [
+            petsird.CoincidenceEvent(detection_bins=[bin0, bin1],
+                                     tof_idx=tof_idx)
+            for bin0 in range(get_num_detection_bins(scanner, 0))
+            for bin1 in (0, 1) for tof_idx in range(num_tof_bins)
+        ]
+        time_interval = petsird.TimeInterval(start=0, stop=1)
+        result = rebin_event_time_block(
+            scanner, rebinning,
+            petsird.EventTimeBlock(time_interval=time_interval,
+                                   prompt_events=[[events]]))
+
+        def rebin_detection_bin(det_bin):
+            det_el, energy_index = divmod(det_bin, num_energy_bins)
+            return det_el * (num_energy_bins - 1) + energy_index - 1
+
+        def is_kept(event):
+            return (event.detection_bins[0] % num_energy_bins > 0
+                    and event.detection_bins[1] == 1
+                    and 2 <= event.tof_idx < num_tof_bins - 2)
+
+        expected = [(rebin_detection_bin(event.detection_bins[0]),
+                     rebin_detection_bin(event.detection_bins[1]),
+                     event.tof_idx - 2) for event in events if is_kept(event)]
+        self.assertTrue(expected)
+        self.assertEqual(
+            [(event.detection_bins[0], event.detection_bins[1], event.tof_idx)
+             for event in result.prompt_events[0][0]], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
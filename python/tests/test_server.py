@@ -0,0 +1,207 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import dataclasses
+import io
+import os
+import socket
+import tempfile
+import unittest
+
+import petsird
+from petsird.helpers import generator, server
+
+
+def get_header() -> petsird.Header:
+    """Header of the generator, with fewer crystals and modules"""
+    return petsird.Header(scanner=generator.get_scanner_info([
+        dataclasses.replace(generator.mtype0_def,
+                            num_crystals_per_module=(1, 2, 3),
+                            num_modules_along_ring=8),
+        dataclasses.replace(generator.mtype1_def,
+                            num_crystals_per_module=(1, 3, 2),
+                            num_modules_along_ring=5)
+    ]))
+
+
+def get_time_interval(t: int) -> petsird.TimeInterval:
+    return petsird.TimeInterval(start=t, stop=t + 1)
+
+
+def get_time_blocks(num_time_blocks: int,
+                    num_events: int) -> list[petsird.TimeBlock]:
+    """Event time blocks with `num_events` prompts (of type 0) each
+
+    Detection bins and TOF indices are large, such that every event takes
+    15 bytes (they are not checked by the server).
+    """
+    events = [
+        petsird.CoincidenceEvent(detection_bins=[1 << 31, (1 << 31) + 1],
+                                 tof_idx=1 << 31)
+    ] * num_events
+    return [
+        petsird.TimeBlock.EventTimeBlock(
+            petsird.EventTimeBlock(time_interval=get_time_interval(t),
+                                   prompt_events=[[events], [[], []]]))
+        for t in range(num_time_blocks)
+    ]
+
+
+def count_time_blocks(filename: str) -> int:
+    with petsird.BinaryPETSIRDReader(filename) as reader:
+        reader.read_header()
+        return sum(1 for _ in reader.read_time_blocks())
+
+
+class RecordingConsumer(server.Consumer):
+    """Count time blocks and keep the error of every stream"""
+
+    def __init__(self):
+        self.num_time_blocks = {}
+        self.errors = {}
+        self._ended = asyncio.Condition()
+
+    async def on_header(self, stream_id: int, header: petsird.Header) -> None:
+        self.num_time_blocks[stream_id] = 0
+
+    async def on_time_block(self, stream_id: int,
+                            time_block: petsird.TimeBlock) -> None:
+        self.num_time_blocks[stream_id] += 1
+
+    async def on_end(self, stream_id: int, error) -> None:
+        async with self._ended:
+            self.errors[stream_id] = error
+            self._ended.notify_all()
+
+    async def wait_for_streams(self, num_streams: int) -> None:
+        """Wait until `num_streams` streams have ended
+
+        Clients can finish sending before the server accepted the connection,
+        so this is needed before closing the server.
+        """
+        async with self._ended:
+            await asyncio.wait_for(
+                self._ended.wait_for(lambda: len(self.errors) >= num_streams),
+                timeout=60)
+
+
+class SlowConsumer(RecordingConsumer):
+    """Wait for `release` before accepting any time block
+
+    `blocked` is set when the first time block is waiting.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.blocked = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def on_time_block(self, stream_id: int,
+                            time_block: petsird.TimeBlock) -> None:
+        self.blocked.set()
+        await self.release.wait()
+        await super().on_time_block(stream_id, time_block)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix sockets")
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.address = os.path.join(self.directory, "petsird.sock")
+        self.output = os.path.join(self.directory, "received")
+
+    async def send(self, *args) -> None:
+        await asyncio.get_running_loop().run_in_executor(
+            None, server.send, self.address, *args)
+
+    async def test_concurrent_clients(self):
+        recorder = RecordingConsumer()
+        petsird_server = server.PETSIRDServer(
+            [recorder, server.WriterConsumer(self.output)])
+        await petsird_server.start_unix(self.address)
+        header = get_header()
+        await asyncio.gather(*(self.send(header, get_time_blocks(n, 100))
+                               for n in range(1, 6)))
+        await recorder.wait_for_streams(5)
+        await petsird_server.close()
+
+        self.assertEqual(petsird_server.consumer_errors, [])
+        self.assertEqual(recorder.errors, dict.fromkeys(range(5)))
+        self.assertEqual(sorted(recorder.num_time_blocks.values()),
+                         list(range(1, 6)))
+        for stream_id, num_time_blocks in recorder.num_time_blocks.items():
+            filename = os.path.join(self.output, f"stream_{stream_id}.petsird")
+            self.assertEqual(count_time_blocks(filename), num_time_blocks)
+        self.assertFalse([
+            name for name in os.listdir(self.output)
+            if name.endswith(server.PARTIAL_SUFFIX)
+        ])
+
+    async def test_slow_consumer(self):
+        consumer = SlowConsumer()
+        queue_size = 2
+        petsird_server = server.PETSIRDServer([consumer],
+                                              queue_size=queue_size)
+        await petsird_server.start_unix(self.address)
+        # about 3 MB, much more than what the queues and socket buffers hold
+        time_blocks = get_time_blocks(40, 5000)
+        sending = asyncio.ensure_future(self.send(get_header(), time_blocks))
+        await asyncio.wait_for(consumer.blocked.wait(), timeout=60)
+        # decoding continues until the queue of the consumer is full
+        items = petsird_server._queues[0]
+
+        async def wait_until_full():
+            while not items.full():
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(wait_until_full(), timeout=60)
+        await asyncio.sleep(0.1)
+        # and then blocks, such that the sender cannot finish
+        self.assertEqual(items.qsize(), queue_size)
+        self.assertFalse(sending.done())
+        self.assertEqual(consumer.num_time_blocks[0], 0)
+
+        consumer.release.set()
+        await sending
+        await consumer.wait_for_streams(1)
+        await petsird_server.close()
+        self.assertEqual(consumer.num_time_blocks, {0: len(time_blocks)})
+        self.assertEqual(consumer.errors, {0: None})
+
+    async def test_truncated_stream(self):
+        stream = io.BytesIO()
+        writer = petsird.BinaryPETSIRDWriter(stream)
+        writer.write_header(get_header())
+        writer.write_time_blocks(get_time_blocks(5, 100))
+        writer.close()
+        # cut within the last time block
+        data = stream.getvalue()[:-100]
+
+        def send_truncated():
+            with server.connect(self.address) as sock:
+                sock.sendall(data)
+
+        recorder = RecordingConsumer()
+        petsird_server = server.PETSIRDServer(
+            [recorder, server.WriterConsumer(self.output)])
+        await petsird_server.start_unix(self.address)
+        await asyncio.get_running_loop().run_in_executor(None, send_truncated)
+        await recorder.wait_for_streams(1)
+        await petsird_server.close()
+
+        self.assertIsNotNone(recorder.errors[0])
+        self.assertLess(recorder.num_time_blocks[0], 5)
+        filename = os.path.join(self.output, "stream_0.petsird")
+        self.assertFalse(os.path.exists(filename))
+        # the time blocks received before the error are kept
+        self.assertEqual(count_time_blocks(filename + server.PARTIAL_SUFFIX),
+                         recorder.num_time_blocks[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
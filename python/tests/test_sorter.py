@@ -0,0 +1,265 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import collections
+import math
+import unittest
+
+import numpy
+
+import petsird
+from petsird.helpers import (get_module_pair_sgid_lut_as_array,
+                             get_num_detection_bins)
+from petsird.helpers.encoder import SPEED_OF_LIGHT
+from petsird.helpers.sorter import CoincidenceSorter, sort_time_blocks
+from test_validate import get_scanner
+
+# time blocks of 1 ms
+BLOCK_DURATION = 10**9
+WINDOW = 4000
+POLICIES = (petsird.CoincidencePolicy.REJECT_HIGHER_MULTIPLES,
+            petsird.CoincidencePolicy.MULTIPLES_AS_ALL_COINCIDENCES,
+            petsird.CoincidencePolicy.MULTIPLES_AS_SEQUENTIAL_COINCIDENCES)
+
+
+def get_singles_scanner() -> petsird.ScannerInformation:
+    scanner = get_scanner()
+    scanner.single_event_policy = petsird.SingleEventPolicy.ALL
+    return scanner
+
+
+def make_time_blocks(
+        scanner: petsird.ScannerInformation,
+        singles: list[list[tuple[int, int, int]]]) -> list[petsird.TimeBlock]:
+    """Event time blocks of 1 ms with singles (time offset, type, detection bin)"""
+    num_module_types = scanner.scanner_geometry.number_of_module_types()
+    time_blocks = []
+    for index, block_singles in enumerate(singles):
+        single_events = [[] for _ in range(num_module_types)]
+        for time_offset, mtype, det_bin in block_singles:
+            single_events[mtype].append(
+                petsird.SingleEvent(detection_bin=det_bin,
+                                    time_offset_in_time_block=time_offset))
+        time_blocks.append(
+            petsird.TimeBlock.EventTimeBlock(
+                petsird.EventTimeBlock(time_interval=petsird.TimeInterval(
+                    start=index, stop=index + 1),
+                                       single_events=single_events)))
+    return time_blocks
+
+
+def get_random_singles(scanner: petsird.ScannerInformation,
+                       num_blocks: int,
+                       seed: int = 0) -> list[list[tuple[int, int, int]]]:
+    """Dense singles at the start and end of every time block
+
+    Singles are close enough to form clusters of many singles, and windows that
+    cross time block boundaries.
+    """
+    rng = numpy.random.default_rng(seed)
+    num_bins = [get_num_detection_bins(scanner, mtype) for mtype in range(2)]
+    singles = []
+    for _ in range(num_blocks):
+        time_offsets = numpy.concatenate(
+            (rng.integers(0, 30 * WINDOW, 40),
+             rng.integers(BLOCK_DURATION - 10 * WINDOW, BLOCK_DURATION, 15)))
+        mtypes = rng.integers(0, 2, len(time_offsets))
+        singles.append([(int(time_offset), int(mtype),
+                         int(rng.integers(num_bins[mtype])))
+                        for time_offset, mtype in zip(time_offsets, mtypes)])
+    return singles
+
+
+def reference_sort(scanner: petsird.ScannerInformation,
+                   singles: list[list[tuple[int, int, int]]],
+                   policy: petsird.CoincidencePolicy,
+                   delayed_offset=None) -> collections.Counter:
+    """Sort singles with Python loops
+
+    Returns a `Counter` of (kind, block, type0, type1, bin0, bin1, tof_idx).
+    """
+    all_singles = sorted(
+        (block * BLOCK_DURATION + time_offset, mtype, det_bin, block)
+        for block, block_singles in enumerate(singles)
+        for time_offset, mtype, det_bin in block_singles)
+    times = [single[0] for single in all_singles]
+
+    def in_window(start: int) -> list[int]:
+        return [
+            index for index, time in enumerate(times)
+            if start <= time <= start + WINDOW
+        ]
+
+    def make_event(kind, opening, first, second, offset=0):
+        _, type0, bin0, _ = all_singles[first]
+        _, type1, bin1, _ = all_singles[second]
+        tof = times[first] - (times[second] - offset)
+        if type0 < type1 or (type0 == type1 and bin0 < bin1):
+            type0, type1, bin0, bin1, tof = type1, type0, bin1, bin0, -tof
+        edges = scanner.tof_bin_edges[type0][type1].edges
+        distance = tof * (SPEED_OF_LIGHT / 2)
+        tof_indices = [
+            k for k in range(len(edges) - 1)
+            if edges[k] <= distance < edges[k + 1]
+        ]
+        num_bins_in_module = [
+            get_num_detection_bins(scanner, mtype) //
+            len(scanner.scanner_geometry.replicated_modules[mtype].transforms)
+            for mtype in (type0, type1)
+        ]
+        lut = get_module_pair_sgid_lut_as_array(scanner, (type0, type1))
+        sgid = lut[bin0 // num_bins_in_module[0],
+                   bin1 // num_bins_in_module[1]]
+        if not tof_indices or sgid < 0:
+            return None
+        return (kind, all_singles[opening][3], type0, type1, bin0, bin1,
+                tof_indices[0])
+
+    events = []
+    opening = 0
+    while opening < len(times):
+        members = [
+            index for index in in_window(times[opening]) if index >= opening
+        ]
+        if len(members) == 2:
+            pairs = [(members[0], members[1])]
+        elif len(members) > 2 and policy == POLICIES[1]:
+            pairs = [(a, b) for a in members for b in members if a < b]
+        elif len(members) > 2 and policy == POLICIES[2]:
+            pairs = list(zip(members[:-1], members[1:]))
+        else:
+            pairs = []
+        events += [
+            make_event("prompt", opening, first, second)
+            for first, second in pairs
+        ]
+        if delayed_offset is not None:
+            delayed = in_window(times[opening] + delayed_offset)
+            if policy == POLICIES[0] and len(delayed) != 1:
+                delayed = []
+            elif policy == POLICIES[2]:
+                delayed = delayed[:1]
+            events += [
+                make_event("delayed", opening, opening, second, delayed_offset)
+                for second in delayed
+            ]
+        opening = members[-1] + 1
+    return collections.Counter(event for event in events if event is not None)
+
+
+def get_events(time_blocks: list[petsird.TimeBlock]) -> collections.Counter:
+    """`Counter` of events in sorted time blocks, see `reference_sort`"""
+    events = collections.Counter()
+    for block, time_block in enumerate(time_blocks):
+        event_time_block = time_block.value
+        assert not any(event_time_block.single_events)
+        for kind, lists in (("prompt", event_time_block.prompt_events),
+                            ("delayed", event_time_block.delayed_events)):
+            for type0, lists0 in enumerate(lists):
+                for type1, coincidences in enumerate(lists0):
+                    events.update(
+                        (kind, block, type0, type1, event.detection_bins[0],
+                         event.detection_bins[1], event.tof_idx)
+                        for event in coincidences)
+    return events
+
+
+def sort_singles(scanner: petsird.ScannerInformation,
+                 singles: list[list[tuple[int, int, int]]], **kwargs) -> list:
+    sorter = CoincidenceSorter(scanner, window=WINDOW, **kwargs)
+    return list(sort_time_blocks(sorter, make_time_blocks(scanner, singles)))
+
+
+class SorterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = get_singles_scanner()
+
+    def test_isolated_pairs(self):
+        # type 0 has 18 detection bins per module, and neighbouring modules are
+        # not in coincidence
+        singles = [[(0, 0, 40), (100, 0, 1), (10 * WINDOW, 0, 30),
+                    (20 * WINDOW, 1, 10), (20 * WINDOW + 5, 0, 40)]]
+        for policy in POLICIES:
+            with self.subTest(policy=policy):
+                events = get_events(
+                    sort_singles(self.scanner, singles, policy=policy))
+                self.assertEqual(events,
+                                 reference_sort(self.scanner, singles, policy))
+                # the single at 10 * WINDOW is not in coincidence
+                self.assertEqual(
+                    {(type0, type1, bin0, bin1)
+                     for _, _, type0, type1, bin0, bin1, _ in events},
+                    {(0, 0, 40, 1), (1, 0, 10, 40)})
+
+    def test_chain_of_windows(self):
+        # every window contains 2 singles (in modules 0 and 4), and the third
+        # opens the next window
+        singles = [[(index * (WINDOW * 3 // 5), 0, index % 2 * 72 + index // 2)
+                    for index in range(21)]]
+        events = get_events(sort_singles(self.scanner, singles))
+        self.assertEqual(events,
+                         reference_sort(self.scanner, singles, POLICIES[0]))
+        self.assertEqual(sorted((bin0, bin1) for *_, bin0, bin1, _ in events),
+                         [(72 + index, index) for index in range(10)])
+
+    def test_clusters(self):
+        # clusters of 3 and 4 singles, in modules that are in coincidence
+        singles = [[(0, 0, 1), (10, 0, 37), (20, 0, 73), (10 * WINDOW, 0, 109),
+                    (10 * WINDOW + 1, 1, 5), (10 * WINDOW + 2, 0, 145),
+                    (10 * WINDOW + 3, 0, 181)]]
+        num_events = {POLICIES[0]: 0, POLICIES[1]: 9, POLICIES[2]: 5}
+        for policy in POLICIES:
+            with self.subTest(policy=policy):
+                events = get_events(
+                    sort_singles(self.scanner, singles, policy=policy))
+                self.assertEqual(events,
+                                 reference_sort(self.scanner, singles, policy))
+                self.assertEqual(sum(events.values()), num_events[policy])
+
+    def test_window_across_time_blocks(self):
+        singles = [[(BLOCK_DURATION - 10, 0, 1)], [(10, 0, 37)], []]
+        time_blocks = sort_singles(self.scanner, singles, chunk_size=1)
+        self.assertEqual(len(time_blocks), 3)
+        events = get_events(time_blocks)
+        # the coincidence is in the time block of the opening single
+        self.assertEqual([block for _, block, *_ in events], [0])
+        self.assertEqual(events,
+                         reference_sort(self.scanner, singles, POLICIES[0]))
+
+    def test_random_singles(self):
+        singles = get_random_singles(self.scanner, 4)
+        for policy in POLICIES:
+            for chunk_size in (1, 30, 1 << 20):
+                with self.subTest(policy=policy, chunk_size=chunk_size):
+                    events = get_events(
+                        sort_singles(self.scanner,
+                                     singles,
+                                     policy=policy,
+                                     chunk_size=chunk_size))
+                    self.assertEqual(
+                        events, reference_sort(self.scanner, singles, policy))
+
+    def test_delayed_windows(self):
+        singles = get_random_singles(self.scanner, 4, seed=1)
+        delayed_offset = 5 * WINDOW
+        for policy in POLICIES:
+            for chunk_size in (1, 1 << 20):
+                with self.subTest(policy=policy, chunk_size=chunk_size):
+                    events = get_events(
+                        sort_singles(self.scanner,
+                                     singles,
+                                     policy=policy,
+                                     delayed_offset=delayed_offset,
+                                     chunk_size=chunk_size))
+                    self.assertTrue(
+                        any(event[0] == "delayed" for event in events))
+                    self.assertEqual(
+                        events,
+                        reference_sort(self.scanner, singles, policy,
+                                       math.ceil(delayed_offset)))
+
+
+if __name__ == "__main__":
+    unittest.main()
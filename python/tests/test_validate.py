@@ -0,0 +1,95 @@
+#  Copyright (C) 2026 University College London
+#
+#  SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import io
+import unittest
+
+import petsird
+from petsird.helpers import generator
+from petsird.helpers.validate import check_header, validate
+
+
+def get_scanner() -> petsird.ScannerInformation:
+    """Scanner of the generator, with fewer crystals and modules"""
+    return generator.get_scanner_info([
+        dataclasses.replace(generator.mtype0_def,
+                            num_crystals_per_module=(1, 2, 3),
+                            num_modules_along_ring=8),
+        dataclasses.replace(generator.mtype1_def,
+                            num_crystals_per_module=(1, 3, 2),
+                            num_modules_along_ring=5)
+    ])
+
+
+def validate_stream(scanner: petsird.ScannerInformation):
+    """Write a header with an empty event time block, and validate it"""
+    stream = io.BytesIO()
+    writer = petsird.BinaryPETSIRDWriter(stream)
+    writer.write_header(petsird.Header(scanner=scanner))
+    event_time_block = petsird.EventTimeBlock(
+        time_interval=petsird.TimeInterval(start=0, stop=1),
+        prompt_events=[[[] for _ in range(mtype0 + 1)] for mtype0 in range(2)])
+    writer.write_time_blocks(
+        [petsird.TimeBlock.EventTimeBlock(event_time_block)])
+    writer.write_time_blocks(())
+    writer.close()
+    stream.seek(0)
+    with petsird.BinaryPETSIRDReader(stream) as reader:
+        return validate(reader)
+
+
+class CheckHeaderTest(unittest.TestCase):
+
+    def test_valid(self):
+        self.assertTrue(check_header(get_scanner()).is_valid)
+
+    def test_size_0_detection_bin_efficiencies(self):
+        scanner = get_scanner()
+        scanner.detection_efficiencies.detection_bin_efficiencies[0] = []
+        self.assertTrue(check_header(scanner).is_valid)
+        self.assertTrue(validate_stream(scanner).is_valid)
+
+    def test_absent_efficiencies(self):
+        scanner = get_scanner()
+        scanner.detection_efficiencies = petsird.DetectionEfficiencies()
+        self.assertTrue(check_header(scanner).is_valid)
+        self.assertTrue(validate_stream(scanner).is_valid)
+
+    def test_wrong_size_detection_bin_efficiencies(self):
+        scanner = get_scanner()
+        efficiencies = scanner.detection_efficiencies
+        efficiencies.detection_bin_efficiencies[1] = (
+            efficiencies.detection_bin_efficiencies[1][:-1])
+        self.assertEqual(list(check_header(scanner).violations),
+                         ["efficiencies_shape"])
+
+    def test_short_outer_lists(self):
+        for name in ("detection_bin_efficiencies", "module_pair_sgidlut",
+                     "module_pair_efficiencies_vectors"):
+            with self.subTest(name=name):
+                scanner = get_scanner()
+                efficiencies = scanner.detection_efficiencies
+                setattr(efficiencies, name, getattr(efficiencies, name)[:1])
+                self.assertEqual(list(check_header(scanner).violations),
+                                 ["efficiencies_shape"])
+                report = validate_stream(scanner)
+                self.assertEqual(list(report.violations),
+                                 ["efficiencies_shape"])
+
+    def test_short_sgid_lut(self):
+        scanner = get_scanner()
+        efficiencies = scanner.detection_efficiencies
+        efficiencies.module_pair_sgidlut[1][0] = (
+            efficiencies.module_pair_sgidlut[1][0][:-1])
+        self.assertEqual(list(validate_stream(scanner).violations), ["sgid"])
+
+    def test_missing_sgid_lut(self):
+        scanner = get_scanner()
+        scanner.detection_efficiencies.module_pair_sgidlut = []
+        self.assertEqual(list(check_header(scanner).violations), ["sgid"])
+
+
+if __name__ == "__main__":
+    unittest.main()